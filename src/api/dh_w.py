@@ -8,13 +8,15 @@ from Crypto.PublicKey.DSA import DsaKey
 from core import dh
 
 
-def construct(bit_len: int=2048) -> DsaKey:
+def construct(bit_len: int=2048, name: str | None=None) -> DsaKey:
     """
     Given the size of a prime modulus in bits (bit_len), returns a Crypto.PublicKey.DSA.DsaKey
     (see https://www.pycryptodome.org/src/public_key/dsa# for relevant documentation and examples).
+    If the optional parameter name is present, the key is constructed in the named group instead
+    (see core.dh.group_names), and bit_len is ignored.
     """
 
-    dh_parameters = dh.make_parameters(bit_len)
+    dh_parameters = dh.make_parameters(bit_len, name)
     dh_key = dh.make_key(dh_parameters)
 
     return DSA.construct((dh_key.public_key(), \
@@ -3,8 +3,12 @@ An implementation of the Diffie-Hellman key agreement protocol based on
 mulitplicative-group arithmetic.
 """
 
+import concurrent.futures
 import hashlib
+import threading
 
+from . import euclid
+from . import groups
 from . import primes
 from . import prng
 from . import util
@@ -19,6 +23,56 @@ _P_MIN_BIT_LEN = 2048
 # Maximum bit length of a prime modulus p.
 _P_MAX_BIT_LEN = 3072
 
+# Number of consecutive candidates for p examined by each pass of the sieve in _generate_p,
+# and the bound on the primes used to sieve them.
+_SIEVE_LEN = 4096
+_SIEVE_BOUND = 2**16
+
+# Default upper bound, in bytes, on the size of the table of powers of g kept by each set of
+# group parameters (see set_g_tables).
+_G_TABLE_MAX_BYTES = 2**20
+
+# Maximum window size, in bits, of a table of powers of g.
+_G_TABLE_MAX_WINDOW = 8
+
+# Whether group parameters keep tables of powers of g, and the upper bound on their size.
+_g_tables_enabled = True
+_g_table_max_bytes = _G_TABLE_MAX_BYTES
+
+# Maximum number of parameter fingerprints remembered by validate_parameters.
+_VALIDATED_CACHE_MAX = 256
+
+# Primality test used on the parameters validated by validate_parameters, which may come from
+# an untrusted party. Unlike the faster default test of primes.is_prime, Miller-Rabin has a
+# proven bound on its error probability.
+_VALIDATION_PRIMALITY_TEST = "miller-rabin"
+
+# Fingerprints of parameters that have passed validate_parameters, oldest first.
+_validated: dict[bytes, None] = {}
+_validated_lock = threading.Lock()
+
+# Number of rounds of the random subset test run by validate_pub_keys. A batch of public
+# keys that contains an invalid key passes all of the rounds with probability at most
+# 2^-_BATCH_ROUNDS.
+_BATCH_ROUNDS = 64
+
+# Batches of fewer public keys than this are validated one key at a time, which is
+# cheaper than running _BATCH_ROUNDS rounds of the random subset test.
+_BATCH_MIN_LEN = 2 * _BATCH_ROUNDS
+
+# Named groups (see make_parameters), and their fingerprints.
+_GROUPS = {
+    "modp2048q256": groups.Modp2048q256(),
+    "modp3072q256": groups.Modp3072q256(),
+}
+_GROUP_NAMES = {
+    util.digest((group.q, group.p, group.g), hashlib.sha256()): name
+    for name, group in _GROUPS.items()
+}
+
+# Parameters for named groups, built on first use and shared thereafter.
+_named_parameters: dict[str, "DHParameters"] = {}
+
 
 class DHParameters:
     """
@@ -29,9 +83,18 @@ class DHParameters:
     Do not instantiate this class directly; instead use the dh module function
     make_parameters().
     """
-    def __init__(self, size: int=_P_MIN_BIT_LEN):
-        self._q, self._p, self._g = generate_parameters(size)
-        validate_parameters(self._q, self._p, self._g)
+    def __init__(self, size: int=_P_MIN_BIT_LEN, name: str | None=None):
+        if name is None:
+            self._q, self._p, self._g = generate_parameters(size)
+        else:
+            group = _GROUPS[name]
+            self._q, self._p, self._g = group.q, group.p, group.g
+        self._name = name
+        self._ctx = util.ModContext(self._p)
+        self._g_table: util.FixedBaseTable | None = None
+        self._fingerprint = fingerprint(self._q, self._p, self._g)
+        # This returns immediately for named groups, which are known to be valid.
+        validate_parameters(self._q, self._p, self._g, self._ctx)
 
     @property
     def q(self) -> int:
@@ -48,6 +111,37 @@ class DHParameters:
         """This group's generator."""
         return self._g
 
+    @property
+    def name(self) -> str | None:
+        """This group's name, or None if it is not a named group."""
+        return self._name
+
+    @property
+    def ctx(self) -> util.ModContext:
+        """The context for arithmetic modulo this group's modulus p."""
+        return self._ctx
+
+    @property
+    def fingerprint(self) -> bytes:
+        """A digest that uniquely identifies these parameters (see fingerprint)."""
+        return self._fingerprint
+
+    @property
+    def g_table(self) -> util.FixedBaseTable | None:
+        """
+        A table of precomputed powers of this group's generator, used to compute
+        public keys without any squarings. The table is built on first use, with
+        the widest window that fits within the memory budget (see set_g_tables).
+        None if such tables are disabled, or if none fits within the budget.
+        """
+        if not _g_tables_enabled:
+            return None
+        if self._g_table is None:
+            w = _g_table_window(self._p)
+            if w > 0:
+                self._g_table = util.FixedBaseTable(self._g, self._p, _Q_BIT_LEN, w)
+        return self._g_table
+
     def __eq__(self, other):
         return self._q == other._q and\
                self._p == other._p and\
@@ -69,8 +163,11 @@ class DHKey:
     """
     def __init__(self, params: DHParameters):
         self._params = params
+        # The parameters were validated when they were built, so there is no need to
+        # validate them again, nor the public key derived from them.
         self._x, self._y = \
-            generate_keypair(self._params.q, self._params.p, self._params.g)
+            _generate_keypair(self._params.q, self._params.p, self._params.g,
+                              self._params.ctx, self._params.g_table)
 
     def public_key(self) -> int:
         """
@@ -101,7 +198,7 @@ class DHKey:
         objects specified in the Python standard library module hashlib.
         """
         return generate_session_key( \
-            y, self._x, self._params.q, self._params.p, hash_obj)
+            y, self._x, self._params.q, self._params.p, hash_obj, self._params.ctx)
 
     def __eq__(self, other):
         return self._params == other._params and\
@@ -115,13 +212,44 @@ class DHKey:
         return not self == other
 
 
-def make_parameters(size: int=_P_MIN_BIT_LEN) -> DHParameters:
+# mypy: no_implicit_optional=False
+def make_parameters(size: int=_P_MIN_BIT_LEN, name: str=None) -> DHParameters:
     """
     Returns a new DHParameters instance based on the supplied modulus size
     (the default is 2048 if none is specified). These consist of the group
     parameters required for a secure key negotiation.
+
+    If the optional parameter name is present, returns the parameters of the
+    named group instead (see group_names), and size is ignored. Named groups
+    need not be generated or validated, and the same instance (along with its
+    table of powers of g) is shared by every caller that names the group.
+    """
+    if name is None:
+        return DHParameters(size)
+
+    if name not in _GROUPS:
+        raise ValueError(f"Group {name} not supported. Supported groups are {group_names()}")
+
+    params = _named_parameters.get(name)
+    if params is None:
+        params = _named_parameters.setdefault(name, DHParameters(name=name))
+
+    return params
+
+
+def group_names() -> list[str]:
+    """
+    Returns the names of the groups that can be passed to make_parameters.
     """
-    return DHParameters(size)
+    return list(_GROUPS)
+
+
+def group_name(q: int, p: int, g: int) -> str | None:
+    """
+    Returns the name of the group with the public parameters q, p and g, or
+    None if they are not those of a named group.
+    """
+    return _GROUP_NAMES.get(fingerprint(q, p, g))
 
 
 # mypy: no_implicit_optional=False
@@ -139,65 +267,152 @@ def make_key(params: DHParameters=None) -> DHKey:
     return DHKey(params)
 
 
-def generate_parameters(p_bit_len: int) -> tuple[int, int, int]:
+def set_g_tables(enabled: bool=True, max_bytes: int=_G_TABLE_MAX_BYTES) -> None:
+    """
+    Configures the tables of powers of g kept by instances of DHParameters (see
+    DHParameters.g_table). If enabled is False, no such tables are built or used.
+    Otherwise, each table is limited to at most max_bytes bytes (the default is
+    1 MiB). Tables that have already been built are unaffected by the budget.
+    """
+    assert isinstance(enabled, bool)
+    assert isinstance(max_bytes, int) and max_bytes >= 0
+
+    global _g_tables_enabled, _g_table_max_bytes
+    _g_tables_enabled = enabled
+    _g_table_max_bytes = max_bytes
+
+
+def _g_table_window(p: int) -> int:
+    # Returns the widest window, in bits, for which a table of powers of g modulo p
+    # fits within the memory budget, or 0 if none does.
+
+    w = 0
+    while w < _G_TABLE_MAX_WINDOW and \
+        util.FixedBaseTable.size(p, _Q_BIT_LEN, w + 1) <= _g_table_max_bytes:
+        w += 1
+
+    return w
+
+
+def generate_parameters(p_bit_len: int, workers: int=1, certify: bool=False) -> tuple:
     """
     Returns the public parameters necessary for two parties to negotiate a shared,
     private key to be used in a symmetric cipher (e.g., 3DES, AES). The returned
     value is a tuple of the form (q, p, g), where q is a 256-bit prime number that
     is the order of the smallest subgroup modulo p, p is a "safe" prime of at least
     p_bit_len length (p_bit_len must be at least 2048 bits), and g is a generator
-    of the subgroup.
+    of the subgroup. If the optional parameter workers is greater than 1, candidates
+    for p are tested for primality in that many processes at once.
+
+    If the optional parameter certify is True, the returned value is instead a tuple
+    of the form (q, p, g, certificate), where certificate is a certificate of the
+    primality of p that can be passed to validate_parameters (see that function).
     """
 
     assert isinstance(p_bit_len, int) and \
         (p_bit_len == _P_MIN_BIT_LEN or p_bit_len == _P_MAX_BIT_LEN)
+    assert isinstance(certify, bool)
 
     # Generate a 256-bit prime that will be the order (or size) of a large subgroup
     # modulo p. Public keys exchanged between communicating parties must fall within
     # this subgroup.
     q = primes.generate_prime(_Q_BIT_LEN)
 
+    # To certify p, p - 1 must have known prime factors whose product is greater than
+    # the square root of p. q alone is too small, so generate a second prime r just
+    # large enough that q * r is, and make r a factor of p - 1 too.
+    r = 1
+    if certify:
+        r = primes.generate_prime(p_bit_len // 2 - _Q_BIT_LEN + 2)
+
     # Find values for n and p that satisfy the equation p = q * n + 1, where p is a
     # prime of p_bit_len length. This ensures that the public keys used in the secret
     # key agreement will fall into the subgroup of order (or size) q. The order of
     # this subgroup must be large enough (i.e., at least 256 bits) to thwart small
     # subgroup attacks.
-    n, p = _generate_p(q, p_bit_len)
+    n, p = _generate_p(q, p_bit_len, workers, r)
 
     # Find a generator g that generates all elements of the subgroup of order
     # (or size) q.
     g = _generate_g(n, p)
 
+    if certify:
+        return q, p, g, _generate_certificate(q, r, p)
+
     return q, p, g
 
 
-def _generate_p(q: int, p_bit_len: int) -> tuple[int, int]:
+def _generate_p(q: int, p_bit_len: int, workers: int=1, m: int=1) -> tuple[int, int]:
     # Returns positive integers n and p which satisfy the equation p = q * n + 1,
     # where q is a 256-bit prime, and p is a p_bit_len prime. The value n returned from
     # this function will be used to find a generator of the subgroup modulo p that is
-    # of order (or size) q.
+    # of order (or size) q. If m is greater than 1, n is a multiple of m.
 
     assert isinstance(q, int) and q.bit_length() == _Q_BIT_LEN
+    assert isinstance(m, int) and m >= 1
     assert isinstance(p_bit_len, int) and \
         (p_bit_len == _P_MIN_BIT_LEN or p_bit_len == _P_MAX_BIT_LEN)
-
-    # Compute bounds from which to select a random factor n.
-    n_bit_len = p_bit_len - q.bit_length()
-    l, u = 2 ** (n_bit_len - 1), 2**n_bit_len
-
-    max_tries = 100 * p_bit_len
-    for tries in range(max_tries):
-        n = prng.randrange(l, u)
-        # n must be even for p to be prime (and test bit length for interoperability).
-        if n % 2 == 0 and (q * n).bit_length() == p_bit_len:
-            p = q * n + 1
-            if primes.is_prime(p):
-                break
-
-    if tries == max_tries - 1:
-        raise Exception("Unable to generate a suitable prime")
-
-    return n, p
+    assert isinstance(workers, int) and workers >= 1
+
+    # Search for p = (q * m) * n + 1 as if q * m were q, and return m * n as n.
+    q *= m
+
+    # Compute bounds from which to select a random factor n, such that q * n + 1 is
+    # p_bit_len bits in length.
+    l, u = -(-2 ** (p_bit_len - 1) // q), (2**p_bit_len - 1) // q
+
+    # Rather than test random values of n one at a time, sieve the candidates
+    # p = q * (n0 + 2k) + 1 for k = 0, 1, ..., _SIEVE_LEN-1, starting from a random
+    # even n0 (n must be even for p to be odd), and test only those candidates that
+    # have no small prime factors. For a small prime r that does not divide q, r
+    # divides the kth candidate if and only if k = -(q * n0 + 1) * (2q)^-1 (mod r),
+    # so precompute q mod r and (2q)^-1 mod r once for each r.
+    residues = [(r, q % r, euclid.inverse((2 * q) % r, r))
+                for r in primes.primes_in_range(3, _SIEVE_BOUND)]
+
+    executor = concurrent.futures.ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        max_tries = max(1, 100 * p_bit_len // _SIEVE_LEN)
+        for _ in range(max_tries):
+            n0 = 2 * prng.randrange(l // 2, (u - 2 * _SIEVE_LEN) // 2)
+
+            sieve = bytearray(b"\x01") * _SIEVE_LEN
+            for r, q_r, inv_2q_r in residues:
+                k = (-(q_r * (n0 % r) + 1) * inv_2q_r) % r
+                sieve[k::r] = bytes(len(range(k, _SIEVE_LEN, r)))
+
+            # Test bit length for interoperability.
+            ns = [n0 + 2 * k for k in range(_SIEVE_LEN)
+                  if sieve[k] and (q * (n0 + 2 * k)).bit_length() == p_bit_len]
+
+            if executor is None:
+                for n in ns:
+                    if primes.is_prime(q * n + 1):
+                        return m * n, q * n + 1
+            else:
+                for i in range(0, len(ns), workers):
+                    batch = ns[i:i + workers]
+                    for n, is_prime in zip(batch,
+                            executor.map(primes.is_prime, [q * n + 1 for n in batch])):
+                        if is_prime:
+                            return m * n, q * n + 1
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    raise Exception("Unable to generate a suitable prime")
+
+
+def _generate_certificate(q: int, r: int, p: int) -> tuple[int, int]:
+    # Returns a certificate of the primality of p of the form (r, a), where q and r are
+    # primes such that q * r divides p - 1 and (q * r)^2 > p, and a is a witness to the
+    # primality of p (see the function _check_certificate).
+
+    for a in range(2, 1000):
+        if _check_certificate(q, p, (r, a), util.ModContext(p)):
+            return r, a
+
+    raise Exception("Unable to find a witness")
 
 
 def _generate_g(n: int, p: int) -> int:
@@ -224,31 +439,55 @@ def _generate_g(n: int, p: int) -> int:
     return g
 
 
-def generate_keypair(q: int, p: int, g: int) -> tuple[int, int]:
+def generate_keypair(q: int, p: int, g: int, ctx: util.ModContext=None,
+                     g_table: util.FixedBaseTable=None) -> tuple[int, int]:
     """
     Given the public parameters q, p and g (which can be obtained from this
     module's generate_parameters function), returns a tuple of the form (x,
     y), where x is a private key randomly selected from the range
     (1, ..., q-1), and y is a public key of the form g^x % p. The private
     key x returned by this function must be kept secret; whereas the public
-    key y may be shared freely.
+    key y may be shared freely. If present, the optional parameter ctx must
+    be a context for arithmetic modulo p (see DHParameters.ctx), and the
+    optional parameter g_table a table of powers of g modulo p (see
+    DHParameters.g_table).
     """
 
-    validate_parameters(q, p, g)
+    if ctx is None:
+        ctx = util.ModContext(p)
+    assert ctx.n == p
+    assert g_table is None or (g_table.g == g and g_table.n == p)
+
+    validate_parameters(q, p, g, ctx)
+
+    x, y = _generate_keypair(q, p, g, ctx, g_table)
+
+    # Validate the public key.
+    validate_pub_key(y, q, p, ctx)
+
+    return x, y
+
+
+def _generate_keypair(q: int, p: int, g: int, ctx: util.ModContext,
+                      g_table: util.FixedBaseTable | None) -> tuple[int, int]:
+    # Returns a keypair as described in generate_keypair, for parameters q, p and g that
+    # are known to be valid. Given that g has order q, any public key computed here must
+    # fall within the subgroup of order q, so there is no need to validate it.
 
     # Select a random, private key in the range of 1 to q-1.
     x = prng.randrange(1, q - 1)
 
     # Compute a public key based on this private key.
-    y = util.fast_mod_exp(g, x % q, p)
-
-    # Validate the public key.
-    validate_pub_key(y, q, p)
+    if g_table is not None:
+        y = g_table.exp(x % q)
+    else:
+        y = ctx.exp(g, x % q)
 
     return x, y
 
 
-def generate_session_key(y: int, x: int, q: int, p: int, hash_obj=None) -> bytes:
+def generate_session_key(y: int, x: int, q: int, p: int, hash_obj=None,
+                         ctx: util.ModContext=None) -> bytes:
     """
     Given a private key x known only to the caller of this function, a public
     key y supplied by another party, domain parameters q and p (which can be
@@ -258,6 +497,8 @@ def generate_session_key(y: int, x: int, q: int, p: int, hash_obj=None) -> bytes
     symmetric cipher (e.g., 3DES, AES). If present, hash_obj must conform to the
     standard interface for hash objects specified in the Python standard library
     module hashlib. The session key returned by this function must be kept secret.
+    If present, the optional parameter ctx must be a context for arithmetic modulo
+    p (see DHParameters.ctx).
     """
 
     assert isinstance(y, int)
@@ -266,12 +507,16 @@ def generate_session_key(y: int, x: int, q: int, p: int, hash_obj=None) -> bytes
     assert isinstance(p, int) and \
         (p.bit_length() == _P_MIN_BIT_LEN or p.bit_length() == _P_MAX_BIT_LEN)
 
+    if ctx is None:
+        ctx = util.ModContext(p)
+    assert ctx.n == p
+
     # Validate supplied public key.
-    validate_pub_key(y, q, p)
+    validate_pub_key(y, q, p, ctx)
 
     # Compute a session key using the essential property of DH (i.e., by raising
     # the other party's public key to the power of this party's private key modulo p).
-    ki = util.fast_mod_exp(y, x % q, p)
+    ki = ctx.exp(y, x % q)
 
     # The session key is hashed to obscure any mathematical structure that could be
     # exploited by an adversary if it were to be leaked.
@@ -280,19 +525,24 @@ def generate_session_key(y: int, x: int, q: int, p: int, hash_obj=None) -> bytes
     return util.digest(ki, hash_obj)
 
 
-def validate_pub_key(y: int, q: int, p: int) -> None:
+def validate_pub_key(y: int, q: int, p: int, ctx: util.ModContext=None) -> None:
     """
     Validates a public key y given the public parameters q and p used to generate
     it. This function must be called, without raising an exception, by a party receiving
     the public key from another party before using the public key to generate a session
     key. If this function raises an exception, the public key should be considered invalid
-    and the session halted.
+    and the session halted. If present, the optional parameter ctx must be a context for
+    arithmetic modulo p (see DHParameters.ctx).
     """
 
     assert isinstance(y, int)
     assert isinstance(q, int)
     assert isinstance(p, int)
 
+    if ctx is None:
+        ctx = util.ModContext(p)
+    assert ctx.n == p
+
     valid = True
 
     # y must be in the interval [2, p-1].
@@ -300,24 +550,139 @@ def validate_pub_key(y: int, q: int, p: int) -> None:
         valid = False
 
     # y must be in the subgroup of order (or size) q.
-    if valid and util.fast_mod_exp(y, q, p) != 1:
+    if valid and ctx.exp(y, q) != 1:
         valid = False
 
     if not valid:
         raise ValueError("Invalid key")
 
 
-def validate_parameters(q: int, p: int, g: int) -> None:
+def validate_pub_keys(ys: list, q: int, p: int, ctx: util.ModContext=None) -> list[bool]:
+    """
+    Validates a list of public keys ys given the public parameters q and p used to
+    generate them, and returns a list of booleans whose ith element is True if ys[i] is
+    valid (in the sense of the function validate_pub_key), or False if it is not. If
+    present, the optional parameter ctx must be a context for arithmetic modulo p (see
+    DHParameters.ctx).
+
+    This function is much faster than calling validate_pub_key once per key when the
+    list is long. It validates the keys in batches, and returns a result that differs
+    from that of validate_pub_key for some key only with negligible (at most 2^-64)
+    probability.
+    """
+
+    assert isinstance(ys, list)
+    assert all(isinstance(y, int) for y in ys)
+    assert isinstance(q, int)
+    assert isinstance(p, int)
+
+    if ctx is None:
+        ctx = util.ModContext(p)
+    assert ctx.n == p
+
+    results = [False] * len(ys)
+
+    # y must be in the interval [2, p-1]; the keys that are not need not be tested
+    # for membership in the subgroup.
+    idxs = [i for i, y in enumerate(ys) if 2 <= y <= p-1]
+
+    _validate_pub_keys(ys, q, ctx, idxs, results)
+
+    return results
+
+
+def _validate_pub_keys(ys: list, q: int, ctx: util.ModContext, idxs: list,
+                       results: list) -> None:
+    # Sets results[i] to True for each index i in idxs such that ys[i] is in the subgroup
+    # of order (or size) q.
+
+    if len(idxs) < _BATCH_MIN_LEN:
+        for i in idxs:
+            results[i] = ctx.exp(ys[i], q) == 1
+        return
+
+    # Each round of the random subset test checks that the product of a randomly chosen
+    # subset of the keys is in the subgroup, using a single exponentiation. If any key is
+    # not in the subgroup, the round fails with probability at least 1/2, no matter what
+    # the other keys are. Raising the keys to random many-bit exponents instead (the small
+    # exponents test) would not be sound here, because the full group modulo p has elements
+    # of small order; e.g., a key multiplied by p-1, which has order 2, is caught only if
+    # its exponent is odd.
+    bs = [ys[i] for i in idxs]
+    for _ in range(_BATCH_ROUNDS):
+        subset = prng.randbits(len(idxs))
+        es = [(subset >> x) & 1 for x in range(len(idxs))]
+        if ctx.exp(util.multi_exp(bs, es, ctx.n), q) != 1:
+            # At least one of the keys is invalid; find it (or them) by bisection.
+            mid = len(idxs) // 2
+            _validate_pub_keys(ys, q, ctx, idxs[:mid], results)
+            _validate_pub_keys(ys, q, ctx, idxs[mid:], results)
+            return
+
+    for i in idxs:
+        results[i] = True
+
+
+def validate_parameters(q: int, p: int, g: int, ctx: util.ModContext=None,
+                        certificate: tuple[int, int]=None) -> None:
     """
     Validates the public parameters q, p and g returned from the function generate_parameters,
     or supplied to the caller by another party. If this function raises an exception, the
-    parameters should be considered invalid and the session halted.
+    parameters should be considered invalid and the session halted. If present, the optional
+    parameter ctx must be a context for arithmetic modulo p (see DHParameters.ctx).
+
+    If present, the optional parameter certificate must be a certificate of the primality
+    of p returned from generate_parameters (with certify=True), or supplied by another party
+    along with the parameters. The primality of p is then proven using the certificate, which
+    is much faster than testing it with is_prime. A bogus certificate causes validation to
+    fail, even if the parameters are otherwise valid.
+
+    Any numbers tested for primality here are tested with the Miller-Rabin test (see
+    primes.is_prime), whose probability of error is proven to be negligible, rather than
+    with the default test used to generate primes.
+
+    The fingerprints (see the function fingerprint) of the most recently validated parameters
+    are remembered, so that parameters which show up repeatedly are validated only once.
     """
 
     assert isinstance(q, int)
     assert isinstance(p, int)
     assert isinstance(g, int)
 
+    fp = fingerprint(q, p, g)
+
+    # The named groups in this module are known to be valid (the unit tests check them in full),
+    # as are the parameters that have already passed validation.
+    known = fp in _GROUP_NAMES
+    if not known:
+        with _validated_lock:
+            known = fp in _validated
+
+    if ctx is None and (not known or certificate is not None):
+        ctx = util.ModContext(p)
+    assert ctx is None or ctx.n == p
+
+    if known:
+        # Even so, a certificate must be checked if one is supplied; q is known to be prime.
+        if certificate is not None and not _check_certificate(q, p, certificate, ctx):
+            raise ValueError("Invalid parameters")
+        return
+
+    if not _check_parameters(q, p, g, ctx, certificate):
+        raise ValueError("Invalid parameters")
+
+    with _validated_lock:
+        _validated[fp] = None
+        if len(_validated) > _VALIDATED_CACHE_MAX:
+            del _validated[next(iter(_validated))]
+
+
+def _check_parameters(q: int, p: int, g: int, ctx: util.ModContext,
+                      certificate: tuple[int, int]=None) -> bool:
+    # Returns True if the public parameters q, p and g are valid, or False otherwise. Unlike
+    # validate_parameters, this function always performs every check. If certificate is not
+    # None, it is used to prove that p is prime.
+
     valid = True
 
     # The bit length of p must be equal to _P_MIN_BIT_LEN or _P_MAX_BIT_LEN
@@ -328,12 +693,15 @@ def validate_parameters(q: int, p: int, g: int) -> None:
     if valid and q.bit_length() != _Q_BIT_LEN:
         valid = False
 
+    # q must be prime.
+    if valid and not primes.is_prime(q, _VALIDATION_PRIMALITY_TEST):
+        valid = False
+
     # p must be prime.
-    if valid and not primes.is_prime(p):
+    if valid and certificate is None and not primes.is_prime(p, _VALIDATION_PRIMALITY_TEST):
         valid = False
 
-    # q must be prime.
-    if valid and not primes.is_prime(q):
+    if valid and certificate is not None and not _check_certificate(q, p, certificate, ctx):
         valid = False
 
     # q must divide p - 1.
@@ -345,8 +713,65 @@ def validate_parameters(q: int, p: int, g: int) -> None:
         valid = False
 
     # The order of g must be q.
-    if valid and util.fast_mod_exp(g, q, p) != 1:
+    if valid and ctx.exp(g, q) != 1:
         valid = False
 
-    if not valid:
-        raise ValueError("Invalid parameters")
+    return valid
+
+
+def _check_certificate(q: int, p: int, certificate: tuple[int, int],
+                       ctx: util.ModContext) -> bool:
+    # Returns True if certificate, of the form (r, a), proves that p is prime given that q
+    # is prime, or False otherwise. By the Pocklington-Lehmer theorem, p is prime if p - 1
+    # has a factor F > sqrt(p) whose prime factors are all known, and there is a witness a
+    # such that a^(p-1) = 1 (mod p) and gcd(a^((p-1)/s) - 1, p) = 1 for each prime factor s
+    # of F. Here F = q * r.
+
+    if not (isinstance(certificate, tuple) and len(certificate) == 2 and
+            all(isinstance(x, int) for x in certificate)):
+        return False
+
+    r, a = certificate
+
+    valid = True
+
+    # a must be in the interval [2, p-2].
+    if valid and not (2 <= a <= p-2):
+        valid = False
+
+    # q * r must divide p - 1, and its square must exceed p.
+    if valid and not (r >= 2 and (p - 1) % (q * r) == 0 and (q * r)**2 > p):
+        valid = False
+
+    # r must be prime. r is much smaller than p, so this is relatively cheap.
+    if valid and not primes.is_prime(r, _VALIDATION_PRIMALITY_TEST):
+        valid = False
+
+    # a^(p-1) must be 1 (mod p). Compute it from a^((p-1)/r), which is needed anyway.
+    a_r = ctx.exp(a, (p - 1) // r) if valid else 0
+    if valid and ctx.exp(a_r, r) != 1:
+        valid = False
+
+    # gcd(a^((p-1)/q) - 1, p) and gcd(a^((p-1)/r) - 1, p) must both be 1.
+    a_q = ctx.exp(a, (p - 1) // q) if valid else 0
+    if valid and (a_q <= 1 or euclid.gcd(a_q - 1, p) != 1):
+        valid = False
+
+    if valid and (a_r <= 1 or euclid.gcd(a_r - 1, p) != 1):
+        valid = False
+
+    return valid
+
+
+def fingerprint(q: int, p: int, g: int) -> bytes:
+    """
+    Returns a SHA-256 digest of the public parameters q, p and g, which uniquely identifies
+    them. Parties that have already exchanged a set of parameters can use this digest to
+    refer to them thereafter.
+    """
+
+    assert isinstance(q, int)
+    assert isinstance(p, int)
+    assert isinstance(g, int)
+
+    return util.digest((q, p, g), hashlib.sha256())
@@ -0,0 +1,257 @@
+"""
+Algorithms for computing discrete logarithms modulo a prime p; i.e., for finding x given g and
+h = g^x (mod p). These are infeasible for sound Diffie-Hellman parameters (see the dh module
+of this package), whose generator's order q is a 256-bit prime, and whose private keys are
+random in the range [1, q). They can therefore be used to audit parameters and keys for
+weaknesses, and to demonstrate them at toy sizes: a generator whose order has only small
+prime factors (see pohlig_hellman), or a private key much smaller than the order (see bsgs).
+
+Each function takes the group as either a dh.DHParameters object, or a tuple (p, g, order),
+where order is the order of g modulo p.
+"""
+
+import concurrent.futures
+import math
+
+from . import dh
+from . import primes
+from . import prng
+from . import util
+
+# Default upper bound on the number of baby steps kept by bsgs.
+_BSGS_MAX_TABLE_LEN = 2**20
+
+# Baby steps are kept by the low bits of their values, which suffice to identify them.
+_BSGS_KEY_MASK = 2**64 - 1
+
+# Prime orders up to this bound are solved by bsgs in pohlig_hellman; larger ones by
+# pollard_rho, which takes about as long but little memory.
+_BSGS_MAX_ORDER = 2**32
+
+# Number of multipliers in the walks of pollard_rho.
+_RHO_MULTIPLIERS = 20
+
+# Number of distinguished points found by each batch of walks in pollard_rho.
+_RHO_BATCH_LEN = 16
+
+# Walks in pollard_rho that find no distinguished point within this multiple of the
+# expected number of steps are abandoned.
+_RHO_MAX_WALK_FACTOR = 20
+
+
+# mypy: no_implicit_optional=False
+def bsgs(h: int, group, bound: int=None, max_table_len: int=_BSGS_MAX_TABLE_LEN) -> int | None:
+    """
+    Returns the least x in the range [0, bound) such that g^x = h (mod p), or None if there is
+    none, using the baby-step giant-step method. The bound is the order of g by default.
+
+    This takes time and memory proportional to the square root of the bound, and so can be
+    used to find a private key that is known to be short, in a group of any size; e.g., a
+    32-bit key takes about a second in a 2048-bit group (and a 40-bit key 15 seconds). At
+    most max_table_len baby steps are kept; if the square root of the bound is greater than
+    this, the method instead takes bound / max_table_len giant steps.
+    """
+    p, g, order = _group(group)
+    if bound is None:
+        bound = order
+    assert isinstance(h, int)
+    assert isinstance(bound, int) and bound >= 1
+    assert isinstance(max_table_len, int) and max_table_len >= 1
+
+    h %= p
+    m = min(math.isqrt(bound - 1) + 1, max_table_len)
+
+    # Baby steps: a table of g^j for j < m, by the low bits of their values.
+    baby_steps: dict[int, int] = {}
+    y = 1
+    for j in range(m):
+        baby_steps.setdefault(y & _BSGS_KEY_MASK, j)
+        y = (y * g) % p
+
+    # Giant steps: h * g^(-m*i) for each i, until one of them is a baby step g^j, so that
+    # x = m*i + j (a match of the low bits alone is ruled out by checking x).
+    giant_step = pow(y, -1, p)
+    z = h
+    for i in range(-(-bound // m)):
+        j = baby_steps.get(z & _BSGS_KEY_MASK)
+        if j is not None and m * i + j < bound and pow(g, m * i + j, p) == h:
+            return m * i + j
+        z = (z * giant_step) % p
+
+    return None
+
+
+# mypy: no_implicit_optional=False
+def pollard_rho(h: int, group, workers: int=1) -> int | None:
+    """
+    Returns the x in the range [0, order) such that g^x = h (mod p), where order is the order
+    of g, or None if h is not a power of g, using Pollard's rho method with distinguished
+    points. The order should be prime; for a composite order, see pohlig_hellman.
+
+    Like bsgs, this takes time proportional to the square root of the order (e.g., seconds
+    for a 40-bit order), but little memory. Pseudo-random walks g^a * h^b are taken through
+    the group, each ending at the first distinguished point it reaches (one whose low bits
+    are zero). Two walks that reach the same point g^a1 * h^b1 = g^a2 * h^b2 reveal
+    x = (a1 - a2) / (b2 - b1) (mod order). Since the walks are independent, they can be
+    spread across processes; if the optional parameter workers is greater than 1, walks are
+    taken in that many processes at once.
+    """
+    p, g, order = _group(group)
+    assert isinstance(h, int)
+    assert isinstance(workers, int) and workers >= 1
+
+    # The group modulo p is cyclic, so h is a power of g if and only if its order divides
+    # that of g.
+    h %= p
+    if pow(h, order, p) != 1:
+        return None
+    if h == 1:
+        return 0
+
+    # Each step of a walk multiplies the point by one of a few random multipliers
+    # g^a_k * h^b_k, chosen by the point's value (an r-adding walk, which behaves more like
+    # a random mapping than the classic three-way partition). About 1 in 2^bits points are
+    # distinguished.
+    coefficients = [(prng.randbelow(order), prng.randbelow(order))
+                    for _ in range(_RHO_MULTIPLIERS)]
+    multipliers = [(pow(g, a, p) * pow(h, b, p)) % p for a, b in coefficients]
+    bits = max(0, order.bit_length() // 4 - 2)
+    args = (p, g, h, order, multipliers, coefficients, bits)
+
+    # Distinguished points found so far, and the exponents (a, b) of each.
+    points: dict[int, tuple[int, int]] = {}
+
+    executor = None
+    if workers > 1:
+        executor = concurrent.futures.ProcessPoolExecutor(workers)
+    try:
+        pending: set[concurrent.futures.Future] = set()
+        while True:
+            if executor is None:
+                results = [_rho_walks(*args)]
+            else:
+                while len(pending) < 2 * workers:
+                    pending.add(executor.submit(_rho_walks, *args))
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                results = [future.result() for future in done]
+
+            for found in results:
+                for y, a, b in found:
+                    if y not in points:
+                        points[y] = (a, b)
+                        continue
+                    x = _solve(a, b, *points[y], p, g, h, order)
+                    if x is not None:
+                        return x
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def _rho_walks(p: int, g: int, h: int, order: int, multipliers: list[int],
+               coefficients: list[tuple[int, int]], bits: int) -> list[tuple[int, int, int]]:
+    # Takes walks from random starting points until _RHO_BATCH_LEN distinguished points are
+    # found, and returns them as tuples (y, a, b), where y = g^a * h^b (mod p).
+
+    mask = (1 << bits) - 1
+    max_steps = _RHO_MAX_WALK_FACTOR << bits
+    r = len(multipliers)
+
+    found = []
+    while len(found) < _RHO_BATCH_LEN:
+        a, b = prng.randbelow(order), prng.randbelow(order)
+        y = (pow(g, a, p) * pow(h, b, p)) % p
+        for _ in range(max_steps):
+            if y & mask == 0:
+                found.append((y, a % order, b % order))
+                break
+            k = y % r
+            a_k, b_k = coefficients[k]
+            y, a, b = (y * multipliers[k]) % p, a + a_k, b + b_k
+
+    return found
+
+
+def _solve(a_1: int, b_1: int, a_2: int, b_2: int, p: int, g: int, h: int,
+           order: int) -> int | None:
+    # Returns x such that g^x = h (mod p), given that g^a_1 * h^b_1 = g^a_2 * h^b_2, so that
+    # x * (b_1 - b_2) = a_2 - a_1 (mod order), or None if this does not determine x. If the
+    # gcd d of b_1 - b_2 and the order is greater than 1, there are d candidates, each of
+    # which is tried if d is small.
+
+    d = math.gcd(b_1 - b_2, order)
+    if (a_2 - a_1) % d != 0 or d > _BSGS_MAX_TABLE_LEN:
+        return None
+
+    n = order // d
+    x = ((a_2 - a_1) // d * pow((b_1 - b_2) // d, -1, n)) % n if n > 1 else 0
+    for k in range(d):
+        if pow(g, x + k * n, p) == h:
+            return x + k * n
+
+    return None
+
+
+# mypy: no_implicit_optional=False
+def pohlig_hellman(h: int, group, factors: list[int]=None, workers: int=1) -> int | None:
+    """
+    Returns the x in the range [0, order) such that g^x = h (mod p), where order is the order
+    of g, or None if h is not a power of g, using the Pohlig-Hellman algorithm. The optional
+    parameter factors is the prime factorization of the order (as returned by
+    primes.factor), which is found if it is not supplied.
+
+    For each prime power q^e dividing the order, this finds x mod q^e one base-q digit at a
+    time, each by solving a discrete logarithm in the subgroup of order q (using bsgs for
+    small q, and pollard_rho, with the given number of workers, for large ones), and then
+    combines the results with the Chinese remainder theorem. Its running time is therefore
+    governed by the square root of the largest prime factor of the order, rather than of the
+    order itself; this is why the order of a Diffie-Hellman generator must have a large prime
+    factor, and why public keys received from another party must be checked to lie in the
+    subgroup of that prime order (see dh.validate_pub_key).
+    """
+    p, g, order = _group(group)
+    if factors is None:
+        factors = primes.factor(order)
+    assert isinstance(h, int)
+    assert math.prod(factors) == order
+
+    h %= p
+    if pow(h, order, p) != 1:
+        return None
+
+    x, modulus = 0, 1
+    for q in sorted(set(factors)):
+        e = factors.count(q)
+
+        # g_q = g^(order/q) has order q. Each digit d_k of x mod q^e satisfies
+        # g_q^d_k = (h * g^-(x mod q^k))^(order/q^(k+1)).
+        g_q = pow(g, order // q, p)
+        x_q = 0
+        for k in range(e):
+            h_k = pow((h * pow(g, -x_q, p)) % p, order // q**(k + 1), p)
+            if q <= _BSGS_MAX_ORDER:
+                d_k = bsgs(h_k, (p, g_q, q))
+            else:
+                d_k = pollard_rho(h_k, (p, g_q, q), workers)
+            if d_k is None:
+                return None
+            x_q += d_k * q**k
+
+        x = util.from_crt(x_q, x, q**e, modulus)
+        modulus *= q**e
+
+    return x
+
+
+def _group(group) -> tuple[int, int, int]:
+    # Returns the tuple (p, g, order) for a dh.DHParameters object or such a tuple.
+
+    if isinstance(group, dh.DHParameters):
+        return group.p, group.g, group.q
+
+    p, g, order = group
+    assert isinstance(p, int) and p > 2
+    assert isinstance(g, int) and 1 <= g < p
+    assert isinstance(order, int) and order >= 1
+    return p, g, order
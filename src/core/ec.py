@@ -22,6 +22,14 @@ _Y = 1
 # Default curve is secp256k1.
 _CURVE = curves.Secp256k1()
 
+# Curves whose base points have orders up to this bound are small enough to tabulate.
+_TABLE_MAX_ORDER = 2**12
+
+# For a small curve, the multiples kG of the base point G for 0 <= k < n, as tuples, and the
+# index k of each; otherwise None. See _build_tables.
+_TABLE_POINTS: list[tuple] | None = None
+_TABLE_INDEX: dict[tuple, int] | None = None
+
 class ECPoint:
     """
     A class representing an elliptic curve point. Do not instantiate this
@@ -189,6 +197,13 @@ def id_elem() -> ECPoint:
     return make_point(None, None)
 
 
+def curve() -> curves.Curve:
+    """
+    Returns the currently active elliptic curve (see new_curve).
+    """
+    return _CURVE
+
+
 def new_curve(curve: curves.Curve, B_iters: int = 100) -> None:
     """
     Given a curve (either one selected from the "curves" module of this
@@ -198,82 +213,124 @@ def new_curve(curve: curves.Curve, B_iters: int = 100) -> None:
 
     global _CURVE
     _CURVE = curve
+    _build_tables(None)
     _validate_curve_params(B_iters)
+    if _CURVE.n <= _TABLE_MAX_ORDER:
+        _build_tables(_CURVE)
+
+
+def _build_tables(curve: curves.Curve | None) -> None:
+    # If curve is not None, tabulates its points kG, where G is the base point and
+    # 0 <= k < n, so that the sum of two such points, or the product of one and an integer,
+    # is found by adding or multiplying their indices modulo n, and looking up the result.
+    # This is only worthwhile for the tiny curves of the unit tests. Points not in the
+    # table (i.e., those not on the curve, or not multiples of G) are handled as for any
+    # other curve. If curve is None, the tables are discarded.
+
+    global _TABLE_POINTS, _TABLE_INDEX
+    _TABLE_POINTS, _TABLE_INDEX = None, None
+    if curve is None:
+        return
+
+    table_points = [tuple(_I)]
+    for _ in range(1, curve.n):
+        table_points.append(tuple(_add(curve.G, list(table_points[-1]))))
+    _TABLE_POINTS = table_points
+    _TABLE_INDEX = {pt: k for k, pt in enumerate(table_points)}
+
+
+def _table_index(pt: list) -> int | None:
+    # Returns the index k of the point pt = kG in the tables of a small curve, or None if
+    # there are no tables or pt is not in them.
+
+    if _TABLE_INDEX is None or not isinstance(pt, list) or len(pt) != 2:
+        return None
+    return _TABLE_INDEX.get((pt[_X], pt[_Y]))
 
 
 def _add(pt1: list, pt2: list) -> list:
     # Returns the sum of points pt1 and pt2 on the curve, according to the addition
-    # rules of elliptic curves; i.e., (a) the identity element if pt1 and pt2 are
-    # both the the identity element, (b) pt2 if pt1 is the identity element, (c) pt1
-    # if pt2 is the identity element, (d) the identity element if pt1 and pt2 share
-    # the same x-coordinate, or (e) the sum of pt1 and pt2 on the curve.
+    # rules of elliptic curves (see add_unchecked), having checked that both are on
+    # the curve.
+
+    k1, k2 = _table_index(pt1), _table_index(pt2)
+    if k1 is not None and k2 is not None:
+        return list(_TABLE_POINTS[(k1 + k2) % _CURVE.n])
 
     _validate_pt(pt1)
     _validate_pt(pt2)
 
-    if pt1 == _I and pt2 == _I:
-        [x, y] = _I
-    elif pt1 == _I:
-        [x, y] = pt2
-    elif pt2 == _I:
-        [x, y] = pt1
-    elif pt1 == pt2:
-        [x, y] = _double(pt1)
-    elif pt1[_X] == pt2[_X]:
-        [x, y] = _I
-    else:
-        [x, y] = _additive_inverse(_secant_intersection(pt1, pt2))
-
-    return [x, y]
+    return add_unchecked(pt1, pt2)
 
 
 def _double(pt: list) -> list:
     # Returns the sum of point pt with itself on the curve. If pt is the point at
     # infinity, returns the point at infinity.
 
-    _validate_pt(pt)
-
-    if pt == _I:
-        return pt
-
-    return _additive_inverse(_tangent_intersection(pt))
+    k = _table_index(pt)
+    if k is not None:
+        return list(_TABLE_POINTS[(2 * k) % _CURVE.n])
 
+    _validate_pt(pt)
 
-def _additive_inverse(pt: list) -> list:
-    # Returns the additive inverse of pt, where pt is of the form [x, y], and pt's
-    # inverse is [x, -y].
-
-    return [pt[_X], -pt[_Y] % _CURVE.p]
-
+    return add_unchecked(pt, pt)
 
-def _tangent_intersection(pt: list) -> list:
-    # Returns the point of intersection on the curve of a straight line drawn tangent
-    # to the point pt on the curve. For a thorough explanation of the arithmetic used in
-    # this function, consult the following URL:
-    # https://github.com/dchampion/crypto/blob/master/doc/EllipticCurves.ipynb
 
-    m = (
-        ((3 * pt[_X] ** 2) + _CURVE.a) * euclid.inverse(2 * pt[_Y], _CURVE.p)
-    ) % _CURVE.p
-    pt2x = (m**2 - (2 * pt[_X])) % _CURVE.p
-    pt2y = (m * (pt2x - pt[_X])) + pt[_Y] % _CURVE.p
+# mypy: no_implicit_optional=False
+def add_unchecked(pt1: list, pt2: list, curve: curves.Curve=None) -> list:
+    """
+    Returns the sum of the points pt1 and pt2, each a list [x, y], on the
+    given curve (by default the currently active one); i.e., (a) pt2 if pt1
+    is the identity element [None, None], (b) pt1 if pt2 is the identity
+    element, (c) the identity element if pt1 and pt2 are additive inverses
+    of one another, or (d) the reflection in the x-axis of the third point at
+    which the line through pt1 and pt2 (the tangent, if they are the same
+    point) meets the curve. Neither point is checked to be on the curve, so
+    this is the caller's responsibility.
+
+    For a thorough explanation of the arithmetic used in this function,
+    consult the following URL:
+    https://github.com/dchampion/crypto/blob/master/doc/EllipticCurves.ipynb
+    """
+    if curve is None:
+        curve = _CURVE
+
+    if pt1[_X] is None:
+        return list(pt2)
+    if pt2[_X] is None:
+        return list(pt1)
+
+    p = curve.p
+    if pt1[_X] == pt2[_X]:
+        if (pt1[_Y] + pt2[_Y]) % p == 0:
+            return list(_I)
+        # The slope of the tangent at pt1.
+        m = ((3 * pt1[_X] ** 2 + curve.a) * euclid.inverse(2 * pt1[_Y] % p, p)) % p
+    else:
+        # The slope of the secant through pt1 and pt2.
+        m = ((pt2[_Y] - pt1[_Y]) * euclid.inverse((pt2[_X] - pt1[_X]) % p, p)) % p
+    x = (m**2 - pt1[_X] - pt2[_X]) % p
 
-    return [pt2x, pt2y]
+    return [x, (m * (pt1[_X] - x) - pt1[_Y]) % p]
 
 
-def _secant_intersection(pt1: list, pt2: list) -> list:
-    # Returns the point of intersection on the curve of a straight line drawn between
-    # points pt1 and pt2 (i.e., the secant line) on the curve. For a thorough explanation
-    # of the arithmetic used in this function, consult the following URL:
-    # https://github.com/dchampion/crypto/blob/master/doc/EllipticCurves.ipynb
+# mypy: no_implicit_optional=False
+def mul_unchecked(k: int, pt: list, curve: curves.Curve=None) -> list:
+    """
+    Returns the point kpt, where k is a non-negative integer and pt a list
+    [x, y], on the given curve (by default the currently active one), by
+    doubling and adding (see add_unchecked). The point is not checked to be
+    on the curve, so this is the caller's responsibility.
+    """
+    assert isinstance(k, int) and k >= 0
 
-    m = (
-        (pt2[_Y] - pt1[_Y]) * euclid.inverse((pt2[_X] - pt1[_X]) % _CURVE.p, _CURVE.p)
-    ) % _CURVE.p
-    pt3x = (m**2 - pt1[_X] - pt2[_X]) % _CURVE.p
-    pt3y = (m * (pt3x - pt1[_X]) + pt1[_Y]) % _CURVE.p
+    result = list(_I)
+    for i in range(k.bit_length() - 1, -1, -1):
+        result = add_unchecked(result, result, curve)
+        if (k >> i) & 1:
+            result = add_unchecked(result, pt, curve)
 
-    return [pt3x, pt3y]
+    return result
 
 
 def generate_keypair() -> tuple[int, list]:
@@ -421,16 +478,14 @@ def _fast_point_at(d: int) -> list:
 def _x_times_pt(x: int, pt: list) -> list:
     # Returns the point on the curve at x point-additions of the start point pt.
 
-    _validate_pt(pt)
     assert isinstance(x, int) and x > 0
+    k = _table_index(pt)
+    if k is not None:
+        return list(_TABLE_POINTS[(x * k) % _CURVE.n])
 
-    start_pt = pt
-    for i in range(x.bit_length() - 2, -1, -1):
-        pt = _double(pt)
-        if (x >> i) & 1:
-            pt = _add(start_pt, pt)
+    _validate_pt(pt)
 
-    return pt
+    return mul_unchecked(x, pt)
 
 
 def _point_at(d: int) -> list:
@@ -0,0 +1,274 @@
+"""
+Algorithms for computing elliptic curve discrete logarithms; i.e., for finding d given a point
+Q = dG, where G is the base point of a curve. These are infeasible for the curves of the curves
+module of this package, whose base points have orders of 192 bits or more. They can therefore
+be used to check that private and public keys match on toy curves, and to demonstrate attacks
+on curves of 40 to 60 bits, or on keys known to lie in a short interval (see kangaroo).
+
+Each function takes a point as a list [x, y] (the form used by the ec module, in which the
+point at infinity is [None, None]) or an ec.ECPoint, and an optional curve (see the curves
+module), which is the current curve of the ec module by default. The order n of the base point
+should be prime.
+"""
+
+import concurrent.futures
+import math
+
+from . import curves
+from . import ec
+from . import prng
+
+# Orders up to this bound are solved by table_log in discrete_log; larger ones by
+# pollard_rho.
+_TABLE_MIN_RHO_ORDER = 2**16
+
+# Upper bound on the order of a curve whose points are tabulated by table_log.
+_TABLE_MAX_ORDER = 2**24
+
+# Number of points added in the walks of pollard_rho.
+_RHO_MULTIPLIERS = 20
+
+# Number of distinguished points found by each batch of walks in pollard_rho.
+_RHO_BATCH_LEN = 16
+
+# Walks in pollard_rho that find no distinguished point within this multiple of the
+# expected number of steps are abandoned.
+_RHO_MAX_WALK_FACTOR = 20
+
+# kangaroo gives up after this multiple of the square root of the interval's width in steps.
+_KANGAROO_MAX_STEP_FACTOR = 16
+
+# Tables built by table_log, by the parameters of their curves.
+_tables: dict[tuple, dict] = {}
+
+
+# mypy: no_implicit_optional=False
+def discrete_log(Q, curve: curves.Curve=None, workers: int=1) -> int | None:
+    """
+    Returns the d in the range [0, n) such that Q = dG, where G is the base point of the curve
+    and n its order, or None if Q is not a multiple of G, using table_log for tiny curves and
+    pollard_rho (with the given number of workers) for others.
+    """
+    curve = _curve(curve)
+    if curve.n <= _TABLE_MIN_RHO_ORDER:
+        return table_log(Q, curve)
+    return pollard_rho(Q, curve, workers)
+
+
+# mypy: no_implicit_optional=False
+def table_log(Q, curve: curves.Curve=None) -> int | None:
+    """
+    Returns the d in the range [0, n) such that Q = dG, where G is the base point of the curve
+    and n its order, or None if Q is not a multiple of G, by looking Q up in a table of every
+    multiple of G. The table is built, in time and memory proportional to n, on the first call
+    for each curve, and so this is suitable only for tiny curves, such as those of the unit
+    tests, on which it is then the fastest method.
+    """
+    curve = _curve(curve)
+    Q = _point(Q, curve)
+    assert curve.n <= _TABLE_MAX_ORDER
+
+    key = (curve.p, curve.a, curve.b, curve.Gx, curve.Gy, curve.n)
+    table = _tables.get(key)
+    if table is None:
+        table = {}
+        pt = [None, None]
+        for d in range(curve.n):
+            table[tuple(pt)] = d
+            pt = ec.add_unchecked(pt, curve.G, curve)
+        _tables[key] = table
+
+    return table.get(tuple(Q))
+
+
+# mypy: no_implicit_optional=False
+def pollard_rho(Q, curve: curves.Curve=None, workers: int=1) -> int | None:
+    """
+    Returns the d in the range [0, n) such that Q = dG, where G is the base point of the curve
+    and n its order, or None if Q is not a multiple of G, using Pollard's rho method with
+    distinguished points.
+
+    This takes time proportional to the square root of n, and little memory; e.g., about 5
+    seconds for a 40-bit curve, or a minute for a 48-bit one, and 16 times as long for each
+    further 8 bits. Pseudo-random walks aG + bQ are taken through the group, each ending at the
+    first distinguished point it reaches (one whose x-coordinate has low bits of zero). Two
+    walks that reach the same point a1G + b1Q = a2G + b2Q reveal d = (a1 - a2) / (b2 - b1)
+    (mod n). Since the walks are independent, they can be spread across processes; if the
+    optional parameter workers is greater than 1, walks are taken in that many processes at
+    once.
+    """
+    curve = _curve(curve)
+    Q = _point(Q, curve)
+    assert isinstance(workers, int) and workers >= 1
+
+    n, G = curve.n, curve.G
+    if ec.mul_unchecked(n, Q, curve) != [None, None]:
+        return None
+    if Q[0] is None:
+        return 0
+
+    # Each step of a walk adds one of a few random points a_k*G + b_k*Q, chosen by the
+    # x-coordinate of the current point (an r-adding walk). About 1 in 2^bits points are
+    # distinguished.
+    coefficients = [(prng.randbelow(n), prng.randbelow(n)) for _ in range(_RHO_MULTIPLIERS)]
+    multipliers = [ec.add_unchecked(ec.mul_unchecked(a_k, G, curve),
+                                    ec.mul_unchecked(b_k, Q, curve), curve)
+                   for a_k, b_k in coefficients]
+    bits = max(0, n.bit_length() // 4 - 2)
+    args = (curve, G, Q, multipliers, coefficients, bits)
+
+    # Distinguished points found so far, and the coefficients (a, b) of each.
+    points: dict[tuple[int, int], tuple[int, int]] = {}
+
+    executor = None
+    if workers > 1:
+        executor = concurrent.futures.ProcessPoolExecutor(workers)
+    try:
+        pending: set[concurrent.futures.Future] = set()
+        while True:
+            if executor is None:
+                results = [_rho_walks(*args)]
+            else:
+                while len(pending) < 2 * workers:
+                    pending.add(executor.submit(_rho_walks, *args))
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                results = [future.result() for future in done]
+
+            for found in results:
+                for pt, a_1, b_1 in found:
+                    if pt not in points:
+                        points[pt] = (a_1, b_1)
+                        continue
+                    a_2, b_2 = points[pt]
+                    if (b_1 - b_2) % n != 0:
+                        return ((a_2 - a_1) * pow(b_1 - b_2, -1, n)) % n
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def _rho_walks(curve: curves.Curve, G: list, Q: list, multipliers: list,
+               coefficients: list[tuple[int, int]],
+               bits: int) -> list[tuple[tuple[int, int], int, int]]:
+    # Takes walks from random starting points until _RHO_BATCH_LEN distinguished points are
+    # found, and returns them as tuples (pt, a, b), where pt = aG + bQ. A walk that lands on
+    # the point at infinity is abandoned.
+
+    n = curve.n
+    mask = (1 << bits) - 1
+    max_steps = _RHO_MAX_WALK_FACTOR << bits
+    r = len(multipliers)
+
+    found = []
+    while len(found) < _RHO_BATCH_LEN:
+        a_1, b_1 = prng.randbelow(n), prng.randbelow(n)
+        pt = ec.add_unchecked(ec.mul_unchecked(a_1, G, curve), ec.mul_unchecked(b_1, Q, curve),
+                              curve)
+        for _ in range(max_steps):
+            x = pt[0]
+            if x is None:
+                break
+            if x & mask == 0:
+                found.append((tuple(pt), a_1 % n, b_1 % n))
+                break
+            k = x % r
+            a_k, b_k = coefficients[k]
+            pt, a_1, b_1 = ec.add_unchecked(pt, multipliers[k], curve), a_1 + a_k, b_1 + b_k
+
+    return found
+
+
+# mypy: no_implicit_optional=False
+def kangaroo(Q, lo: int, hi: int, curve: curves.Curve=None) -> int | None:
+    """
+    Returns the d in the range [lo, hi) such that Q = dG, where G is the base point of the
+    curve, or None if there is none, using Pollard's kangaroo (or lambda) method with
+    distinguished points. The range must lie within [0, n), where n is the order of G.
+
+    This takes time proportional to the square root of the width of the range, regardless of
+    the size of the curve, and so can be used to find a private key that is known to be short
+    or to share most of its bits with a known value; e.g., a 32-bit key takes about a second.
+    A tame kangaroo starts from the middle of the range, at a known multiple of G, and a wild
+    one from Q; each jumps by a multiple of G chosen by its current point, so that once the
+    wild one lands on a point the tame one has visited, it follows the same path. The two
+    meet at the next distinguished point, which reveals d as the difference of the distances
+    they have travelled.
+    """
+    curve = _curve(curve)
+    Q = _point(Q, curve)
+    assert isinstance(lo, int) and isinstance(hi, int) and 0 <= lo < hi <= curve.n
+
+    n, G = curve.n, curve.G
+    if Q[0] is None:
+        return 0 if lo == 0 else None
+
+    # Jumps are the multiples 2^i * G for i < k, where k is chosen to make the mean jump about
+    # half the square root of the width of the range.
+    width = hi - lo
+    k = 1
+    while (2**(k + 1) - 1) // (k + 1) <= math.isqrt(width) // 2:
+        k += 1
+    jumps = [ec.mul_unchecked(1 << i, G, curve) for i in range(k)]
+
+    bits = max(0, width.bit_length() // 4 - 2)
+    mask = (1 << bits) - 1
+    max_steps = _KANGAROO_MAX_STEP_FACTOR * ((math.isqrt(width) + 1) + (1 << bits))
+
+    # Each kangaroo is kept as [tame, pt, s], where pt = sG for the tame one, and
+    # pt = Q + sG = (d + s)G for the wild one. Distinguished points are recorded with the
+    # kangaroo that found them and its distance.
+    kangaroos = [[True, None, lo + width // 2], [False, Q, 0]]
+    kangaroos[0][1] = ec.mul_unchecked(kangaroos[0][2], G, curve)
+    points: dict[tuple[int, int], tuple[bool, int]] = {}
+
+    for _ in range(max_steps):
+        for kangaroo_ in kangaroos:
+            tame, pt, s = kangaroo_
+            if pt[0] is not None and pt[0] & mask == 0:
+                key = tuple(pt)
+                if key not in points:
+                    points[key] = (tame, s)
+                elif points[key][0] != tame:
+                    s_tame, s_wild = (s, points[key][1]) if tame else (points[key][1], s)
+                    d = (s_tame - s_wild) % n
+                    return d if lo <= d < hi and ec.mul_unchecked(d, G, curve) == Q else None
+                else:
+                    # This kangaroo is following one of its own kind.
+                    pt = [None, None]
+            while pt[0] is None:
+                # Restart from a random point nearby.
+                s += prng.randbelow(math.isqrt(width)) + 1
+                pt = ec.mul_unchecked(s, G, curve)
+                if not tame:
+                    pt = ec.add_unchecked(Q, pt, curve)
+            i = pt[0] % k
+            kangaroo_[1], kangaroo_[2] = ec.add_unchecked(pt, jumps[i], curve), s + (1 << i)
+
+    return None
+
+
+def _curve(curve: curves.Curve | None) -> curves.Curve:
+    # Returns the given curve, or the current curve of the ec module if it is None.
+
+    if curve is None:
+        return ec.curve()
+    assert isinstance(curve, curves.Curve)
+    return curve
+
+
+def _point(Q, curve: curves.Curve) -> list:
+    # Returns the point Q, given as a list [x, y] or an ec.ECPoint, as a list [x, y], having
+    # checked that it is on the curve.
+
+    if isinstance(Q, ec.ECPoint):
+        Q = Q.as_list()
+    assert isinstance(Q, list) and len(Q) == 2
+    if Q[0] is None and Q[1] is None:
+        return [None, None]
+
+    x, y = Q
+    assert isinstance(x, int) and isinstance(y, int)
+    assert 0 <= x < curve.p and 0 <= y < curve.p
+    assert (y * y - x**3 - curve.a * x - curve.b) % curve.p == 0
+    return [x, y]
@@ -1,5 +1,27 @@
 """ Euclidean algorithms and support functions. """
 
+# gcdx uses Lehmer's algorithm if the smaller of its operands has at least this many bits, and
+# the textbook loop otherwise.
+_LEHMER_MIN_BIT_LEN = 2048
+
+# gcdx uses the half-gcd algorithm if the smaller of its operands has at least this many bits.
+_HGCD_MIN_BIT_LEN = 65536
+
+# Bit length of the leading digits of the operands on which Lehmer's algorithm simulates the
+# textbook loop (that of a machine word, less a sign bit and a carry bit).
+_LEHMER_DIGIT_BIT_LEN = 62
+
+# Operands of _hgcd with fewer bits than this are reduced one quotient at a time.
+_HGCD_BASE_BIT_LEN = 1024
+
+# The "auto" inversion engine uses the native engine for moduli of fewer bits than this, and
+# gcdx for larger ones.
+_NATIVE_INVERSE_MAX_BIT_LEN = 6144
+
+# The identity matrix, as a tuple (A, B, C, D) of the rows (A, B) and (C, D).
+_IDENTITY = (1, 0, 0, 1)
+
+
 def gcd(a: int, b: int) -> int:
     """Returns the greatest common divisor (or gcd) of positive
     integers a and b."""
@@ -31,9 +53,27 @@ def gcdx(a: int, b: int) -> tuple[int, int, int]:
     Returns the greatest common divisor (or gcd) of positive
     integers a and b, and the x and y solutions for the relation
     ax + by = gcd(a,b) (see Bezout's identity).
+
+    The algorithm is chosen by the size of the smaller of a and b: the
+    textbook loop, which takes one division of the full operands per
+    quotient, for small ones; Lehmer's algorithm, which finds most
+    quotients from the leading digits of the operands alone, for larger
+    ones; and the subquadratic half-gcd algorithm for very large ones.
+    All three return the same x and y.
     """
     _validate_params(a, b)
 
+    bit_len = min(a, b).bit_length()
+    if bit_len < _LEHMER_MIN_BIT_LEN:
+        return _gcdx_textbook(a, b)
+    if bit_len < _HGCD_MIN_BIT_LEN:
+        return _gcdx_lehmer(a, b)
+    return _gcdx_hgcd(a, b)
+
+
+def _gcdx_textbook(a: int, b: int) -> tuple[int, int, int]:
+    # The extended Euclidean algorithm, one quotient at a time.
+
     a1, b1, x, y = 1, 0, 1, 0
     while b:
         q = a // b
@@ -45,6 +85,164 @@ def gcdx(a: int, b: int) -> tuple[int, int, int]:
     return a, x, y
 
 
+def _gcdx_lehmer(a: int, b: int) -> tuple[int, int, int]:
+    # Lehmer's algorithm (see Knuth, The Art of Computer Programming, vol. 2, section 4.5.2,
+    # algorithm L). The quotients of the textbook loop are found from the leading digits ah
+    # and bh of a and b, and accumulated in a matrix (A, B, C, D), until they may differ from
+    # those of the full operands (i.e., until (ah + A) // (bh + C) and (ah + B) // (bh + D)
+    # differ); the matrix is then applied to a and b at once. Throughout, a = x0*a_in + y0*b_in
+    # and b = x1*a_in + y1*b_in, where a_in and b_in are the operands.
+
+    x0, y0, x1, y1 = 1, 0, 0, 1
+    if a < b:
+        a, b, x0, y0, x1, y1 = b, a, x1, y1, x0, y0
+
+    while b.bit_length() > _LEHMER_DIGIT_BIT_LEN:
+        shift = a.bit_length() - _LEHMER_DIGIT_BIT_LEN
+        ah, bh = a >> shift, b >> shift
+        A, B, C, D = _IDENTITY
+        while bh + C != 0 and bh + D != 0:
+            q = (ah + A) // (bh + C)
+            if q != (ah + B) // (bh + D):
+                break
+            A, C = C, A - q * C
+            B, D = D, B - q * D
+            ah, bh = bh, ah - q * bh
+
+        if B == 0:
+            # The leading digits did not determine even one quotient; take one step of the
+            # textbook loop.
+            q = a // b
+            a, b = b, a - q * b
+            x0, x1 = x1, x0 - q * x1
+            y0, y1 = y1, y0 - q * y1
+        else:
+            a, b = A * a + B * b, C * a + D * b
+            x0, x1 = A * x0 + B * x1, C * x0 + D * x1
+            y0, y1 = A * y0 + B * y1, C * y0 + D * y1
+
+    g, x, y = _gcdx_textbook(a, b)
+
+    return g, x * x0 + y * x1, x * y0 + y * y1
+
+
+def _gcdx_hgcd(a: int, b: int) -> tuple[int, int, int]:
+    # The half-gcd algorithm: a and b are repeatedly reduced by _hgcd to about half their
+    # size, by a matrix M such that (a_in, b_in) = M(a, b), where a_in and b_in are the
+    # operands, until they are small enough for _gcdx_lehmer. The resulting x and y are
+    # adjusted to those of the textbook loop, which are the least in absolute value.
+
+    a_in, b_in = a, b
+    M = _IDENTITY
+    while min(a, b).bit_length() >= _HGCD_MIN_BIT_LEN:
+        M_k, a, b = _hgcd(a, b)
+        if M_k == _IDENTITY:
+            # a and b differ too much in size to be reduced together; reduce the larger
+            # modulo the smaller.
+            if a >= b:
+                q = a // b
+                a, M_k = a - q * b, (1, q, 0, 1)
+            else:
+                q = b // a
+                b, M_k = b - q * a, (1, 0, q, 1)
+        M = _mat_mul(M, M_k)
+
+    g, x, y = _gcdx_lehmer(a, b)
+    if M == _IDENTITY:
+        return g, x, y
+    A, B, C, D = M
+    x = x * D - y * C
+
+    m = b_in // g
+    x %= m
+    if 2 * x > m:
+        x -= m
+
+    return g, x, (g - a_in * x) // b_in
+
+
+def _hgcd(a: int, b: int) -> tuple[tuple[int, int, int, int], int, int]:
+    # Returns (M, a', b'), where M is a matrix (A, B, C, D) of non-negative integers with
+    # determinant 1, such that a = A*a' + B*b' and b = C*a' + D*b', and a' and b' are as
+    # small as steps of the (subtractive) Euclidean algorithm can make them while both remain
+    # above 2^s, where s = n//2 + 1 and n is the bit length of the larger of a and b (this is
+    # Moller's formulation of Schonhage's algorithm; see "On Schonhage's algorithm and
+    # subquadratic integer gcd computation", Mathematics of Computation 77, 2008). Most of the
+    # reduction is done by two recursive calls on the leading bits of a and b, so that the
+    # running time is that of multiplication times a logarithmic factor.
+
+    n = max(a.bit_length(), b.bit_length())
+    s = n // 2 + 1
+    if min(a, b) <= 1 << s:
+        return _IDENTITY, a, b
+
+    M = _IDENTITY
+    if n >= _HGCD_BASE_BIT_LEN:
+        # Reduce a and b to about 3n/4 bits by recursion on their leading n/2 bits.
+        M, a, b = _hgcd_reduce(a, b, n // 2)
+        while max(a.bit_length(), b.bit_length()) > 3 * n // 4 + 1:
+            step = _hgcd_step(a, b, s, M)
+            if step is None:
+                return M, a, b
+            M, a, b = step
+
+        # Reduce them further by recursion on their leading bits, beyond the first 2s - n_k
+        # (where n_k is their current bit length).
+        n_k = max(a.bit_length(), b.bit_length())
+        if n_k > s + 2:
+            M_k, a, b = _hgcd_reduce(a, b, 2 * s - n_k + 1)
+            M = _mat_mul(M, M_k)
+
+    while True:
+        step = _hgcd_step(a, b, s, M)
+        if step is None:
+            return M, a, b
+        M, a, b = step
+
+
+def _hgcd_reduce(a: int, b: int, p: int) -> tuple[tuple[int, int, int, int], int, int]:
+    # Returns (M, a', b'), where M is the matrix found by _hgcd for a and b without their
+    # p least significant bits, and (a', b') is the inverse of M applied to (a, b).
+
+    M, _, _ = _hgcd(a >> p, b >> p)
+    A, B, C, D = M
+
+    return M, D * a - B * b, A * b - C * a
+
+
+def _hgcd_step(a: int, b: int, s: int,
+               M: tuple[int, int, int, int]) -> tuple[tuple[int, int, int, int], int, int] | None:
+    # Reduces the larger of a and b modulo the smaller, but not to 2^s or below, and returns
+    # the new values with the matrix M updated accordingly; or None if they differ by 2^s or
+    # less, so that no reduction is possible.
+
+    A, B, C, D = M
+    if a > b:
+        if a - b <= 1 << s:
+            return None
+        q, a = divmod(a, b)
+        if a <= 1 << s:
+            q, a = q - 1, a + b
+        return (A, B + q * A, C, D + q * C), a, b
+
+    if b - a <= 1 << s:
+        return None
+    q, b = divmod(b, a)
+    if b <= 1 << s:
+        q, b = q - 1, b + a
+    return (A + q * B, B, C + q * D, D), a, b
+
+
+def _mat_mul(M_1: tuple[int, int, int, int],
+             M_2: tuple[int, int, int, int]) -> tuple[int, int, int, int]:
+    # Returns the product of the 2x2 matrices M_1 and M_2.
+
+    A1, B1, C1, D1 = M_1
+    A2, B2, C2, D2 = M_2
+
+    return A1 * A2 + B1 * C2, A1 * B2 + B1 * D2, C1 * A2 + D1 * C2, C1 * B2 + D1 * D2
+
+
 def _gcdx(a: int, b: int) -> tuple[int, int, int]:
     """
     Returns the greatest common divisor (or gcd) of positive integers
@@ -77,11 +275,77 @@ def inverse(a: int, b: int) -> int:
     """
     Returns the modular multiplicative inverse of a modulo b, where
     a and b are positive integers; if no such inverse exists, raises a
-    ValueError.
+    ValueError. The work is delegated to the currently selected
+    inversion engine (see set_inverse_engine).
     """
     _validate_params(a, b)
 
-    gcd_var, x, _ = gcdx(a, b)
+    return _INVERSE_ENGINES[_inverse_engine](a, b)
+
+
+def set_inverse_engine(name: str) -> None:
+    """
+    Selects the engine used by inverse (and hence by every module in this
+    package that inverts modulo n). The available engines, listed by the
+    function inverse_engines, are "native" (the language primitive
+    pow(a, -1, b)), "textbook", "lehmer" and "half-gcd" (each of which
+    uses the corresponding algorithm of gcdx), and "auto" (the default),
+    which uses the native engine for moduli of up to a few thousand bits,
+    and gcdx, with its own choice of algorithm, for larger ones; beyond
+    that size, Lehmer's algorithm is faster than the native one. All
+    engines return the same results.
+    """
+    global _inverse_engine
+    if name not in _INVERSE_ENGINES:
+        raise ValueError(f"Unknown inversion engine {name}")
+    _inverse_engine = name
+
+
+def inverse_engine() -> str:
+    """Returns the name of the engine currently used by inverse."""
+    return _inverse_engine
+
+
+def inverse_engines() -> list[str]:
+    """Returns the names of the engines that can be used by inverse."""
+    return list(_INVERSE_ENGINES)
+
+
+def _inverse_auto(a: int, b: int) -> int:
+    # The native engine for small moduli, and gcdx for large ones.
+
+    if b.bit_length() < _NATIVE_INVERSE_MAX_BIT_LEN:
+        return _inverse_native(a, b)
+
+    return _inverse_from_gcdx(gcdx(a, b), a, b)
+
+
+def _inverse_native(a: int, b: int) -> int:
+    # The interpreter's own implementation of modular inversion, which runs in
+    # native code.
+
+    try:
+        return pow(a, -1, b)
+    except ValueError:
+        raise ValueError(f"{a} has no inverse modulo {b}") from None
+
+
+def _inverse_textbook(a: int, b: int) -> int:
+    return _inverse_from_gcdx(_gcdx_textbook(a, b), a, b)
+
+
+def _inverse_lehmer(a: int, b: int) -> int:
+    return _inverse_from_gcdx(_gcdx_lehmer(a, b), a, b)
+
+
+def _inverse_hgcd(a: int, b: int) -> int:
+    return _inverse_from_gcdx(_gcdx_hgcd(a, b), a, b)
+
+
+def _inverse_from_gcdx(gcdx_var: tuple[int, int, int], a: int, b: int) -> int:
+    # Returns the inverse of a modulo b, given the result of gcdx(a, b).
+
+    gcd_var, x, _ = gcdx_var
     if gcd_var != 1:
         err_str = f"{a} has no inverse modulo {b}"
         raise ValueError(err_str)
@@ -89,6 +353,19 @@ def inverse(a: int, b: int) -> int:
     return x % b
 
 
+# Available engines for inverse, by name.
+_INVERSE_ENGINES = {
+    "auto": _inverse_auto,
+    "native": _inverse_native,
+    "textbook": _inverse_textbook,
+    "lehmer": _inverse_lehmer,
+    "half-gcd": _inverse_hgcd,
+}
+
+# The engine currently used by inverse.
+_inverse_engine = "auto"
+
+
 def _validate_params(a: int, b: int) -> None:
     assert isinstance(a, int) and a >= 0
     assert isinstance(b, int) and b >= 0
@@ -0,0 +1,47 @@
+"""
+A collection of named Diffie-Hellman groups for use with the dh module of this package. Each
+group consists of a prime modulus p, and a generator g of a subgroup of prime order q modulo
+p. Because these groups are fixed and public, two parties can agree to use one by name alone,
+rather than generating (and then validating) a new group, which at 3072 bits can take minutes.
+"""
+
+
+class Group:
+    """Abstract class for Diffie-Hellman groups."""
+
+    def __init__(self, q: int, p: int, g: int) -> None:
+        # Prime order q of the subgroup modulo p generated by g
+        self.q = q
+        # Prime modulus p, where p = q * n + 1 for some even integer n
+        self.p = p
+        # Generator g of the subgroup of order q
+        self.g = g
+
+    def __str__(self) -> str:
+        return (
+f"""{type(self).__name__} group parameters:\n\
+ q: {self.q}\n\
+ p: {self.p}\n\
+ g: {self.g}""")
+
+
+class Modp2048q256(Group):
+    """A 2048-bit modulus with a 256-bit prime-order subgroup (see dh.generate_parameters)."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            0xC68E22DD3BAE17D4AEBB3689080394BED20F4041AF939B790A352E540DA041B1,
+            0xBEF0AFC42A38850A7421D2AC63558CB0BF33292F36BCC85F51D8B6F6397D3868E70B833CA3D6AC66D36AC9502081727E72F290B0C808EBFB1CBD65A1CAF206E4B0393421DA61666B156E9B944A7227255378ADD0C8CFA8F2A9C9093DB9976BB197C5AD819B936F37982386D64CD438BA44425F9ADFA8F28F667DBDC11E0CEA051222B767849EED94640BE6162CCF74C2BE0C8646E690EB7D1C1EAE258E08FCF19D1DB602DDC1A7106B3284D051ECFC93A2B91350053F82A9245C8FB3B12C2CF151652FD3D889DC10F352EC27790E0C9A45A64EF5F80460869704B57D1ECA7A1FC5870A36ED035D969E6CF4BF7E163891115A0364CEE79AE552BD4D8D181EADA5,
+            0x25B0090E340692D450696787CFE58842FCE1916CE3FAD5E0F79DD3A1F48647870BAC4537B8C8EA34A45FC7101E4DCF6E1DE816578815254829BCDBB77F8E39CABDF4B1EF6509DC70BE12AFCCEA9782740B1805F8FC47F70523205F6D1E4DE205FEB64548603E3381FD195004784BE07A61990F03F0C690C4961562C88D015C64723D226534A5D9CB06EFD63110A4EBDFBD8C490FCC5947632A75A7BF7ACE68BDD5759790CF4135527685F8E37E5257EC49CB34693C3E0460063034E9B8F10F187BA9C7B0970C0988B85A4C6CB10AEDC7A713CC30C35BACA25CAE6821CE45597CBB90233CC31DAA13BC1597BE7FAF73AAAF3025F404A1339A0B7092F7086C9D11,
+        )
+
+
+class Modp3072q256(Group):
+    """A 3072-bit modulus with a 256-bit prime-order subgroup (see dh.generate_parameters)."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            0xAFA7617C9DC0112D79D517D55198FCAB5F64C68807195F9DDED4377EE07C3009,
+            0x832D6600DE1F9B98FCF5621C4A4FDEE29EF0382F5BA9D4ECCEA100859C77CEE773808A4C78063893A663B87C7281BF07DFC4881BD45F9AA199FA83625F25071AF44041F1AD1549680132C7D9619F795C51EB215C7FB4DA32EC9E428882D99F4C8AF317D40536DA56B45521894BC39B6FF687AFABB0B6D9DFFB6803441C4475420E45FBE783171B0561AE30B1ADCC5BF89EC7B9ED2213C48D6F85AE5C61E3A8E6B0B08129F75BCA0317F1F876FF335F78C30633C9ED0D6EC57CB7E2E4DE540DB428033D663557934150941C987090DB6CB654D9309565FE56886FC660970F62102743863965567BF935D51ED81A43240C8B249D36C83DD174EE9B90FDB25AAE490F7032CB32AE2F4056B48541469A3263413C80CEDC7D3385C1323607DC33E2E45F6F7518DFE7FE5593E9EE70E8CE1A6C7D2BAB209098BF814707752975DDF673475537BEE14BE52F3351E664DFB0505F895BEB7EFD1C15231B02C85D36F26B4EF9F891DE2B13FFDD0772E111919AA910842E5ACEB29067AAE62FC41FEFF301E3,
+            0xFC54C72BD8B9A5293E57F99312933107369BA5C96CC53EEF6D9A61F73518C131E570FB288683BA462668CB67C7ABB6F7C5B699BEBDFD75B777F474ED052262369C31D37F4145B1CFFCBD5D287FCFCF922DB5C8E772BECCB8B00BC900B87098435D0432FA246DE6E8F7D181449DBC272027145ADA70985F5665C0351C61304EBA0E5C3DBE01C2F5D92216107E4E5FBE1CAE411719E1A3831F1A191E057476A97FAB85EDF34E38F7CE0051AD1382EC0E707CE48110852AE8751C208112FAC01BF3B770E38462CBCE89BF165ECECC50ADB63F8AB6D5E46706B862B5CB4049E8827AF46DBEDB55DE74C899B1F6ECDA5D3EF5E0BF17454BA4584CC786F3E5B0C254062DDA185C4B4B549EC1E6DD1FF42681348107534A73C1786C934A75CCFC8D8F40F6FBE3DCA029E4F1A7A4EE1CA461B3B764AEF2046CCFF2075E8984769054847C8E313B277C2F1E286921B9FF9C8994C066643A7E5C5269AAF42B3558DA009DDBA5AA5EDFBA0C4E29E99BC5BBC652C716545A52D79291E81959315B2C70C181A,
+        )
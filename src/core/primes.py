@@ -1,6 +1,10 @@
 """ Various functions for generating primes and primality testing. """
 
+import concurrent.futures
+import itertools
 import math
+import operator
+from typing import Callable, Iterator
 
 from . import prng
 from . import util
@@ -16,35 +20,299 @@ _small_primes =  [ 3,  5,  7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59
                  761,769,773,787,797,809,811,821,823,827,829,839,853,857,859,863,877,881,883,
                  887,907,911,919,929,937,941,947,953,967,971,977,983,991,997]
 
-def is_prime(n: int) -> bool:
+# The test is_prime uses when none is named (see set_primality_test).
+_primality_test = "bpsw"
+
+# Sets of Miller-Rabin bases that identify every odd composite below the paired bound
+# (Jaeschke; Jiang and Deng; and Sorenson and Webster for the two largest bounds).
+_DETERMINISTIC_BASES = (
+    (2047, (2,)),
+    (1373653, (2, 3)),
+    (25326001, (2, 3, 5)),
+    (3215031751, (2, 3, 5, 7)),
+    (2152302898747, (2, 3, 5, 7, 11)),
+    (3474749660383, (2, 3, 5, 7, 11, 13)),
+    (341550071728321, (2, 3, 5, 7, 11, 13, 17)),
+    (3825123056546413051, (2, 3, 5, 7, 11, 13, 17, 19, 23)),
+    (318665857834031151167461, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)),
+    (3317044064679887385961981, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)),
+)
+
+# Bit length of the operands below which _divmod uses the language primitive.
+_DIV_MIN_BIT_LEN = 4096
+
+# Bounds for stages 1 and 2 of Pollard's p-1 method in factor.
+_P_MINUS_1_B1 = 2000
+_P_MINUS_1_B2 = 100000
+
+# Number of steps of Brent's rho method in factor before the elliptic curve method is tried.
+_RHO_MAX_STEPS = 2**16
+
+# Stage 1 bounds and numbers of curves for the elliptic curve method in factor, which find
+# factors of about 15, 20, 25 and 30 digits, respectively.
+_ECM_SCHEDULE = ((2000, 25), (11000, 90), (50000, 300), (250000, 700))
+
+# Spacing of the giant steps in stage 2 of the elliptic curve method.
+_ECM_D = 210
+
+# For the self-initialising quadratic sieve: the greatest bit length of kn, the number of
+# primes in the factor base, and half the length of the sieve interval, for sizes of kn.
+_SIQS_PARAMETERS = (
+    (100, 100, 2**13),
+    (120, 250, 2**15),
+    (140, 500, 2**16),
+    (160, 1000, 2**17),
+    (180, 2000, 2**17),
+    (200, 3500, 2**18),
+    (220, 6000, 2**18),
+    (240, 9000, 2**19),
+    (260, 13000, 2**19),
+    (280, 18000, 2**19),
+)
+
+# Bit length up to which factor uses the quadratic sieve.
+_SIQS_MAX_BIT_LEN = 280
+
+# Candidate multipliers k for the quadratic sieve of kn, and the number of odd primes
+# considered in choosing among them.
+_SIQS_MULTIPLIERS = (1, 3, 5, 7, 11, 13, 15, 17, 19, 21, 23, 29, 31, 33, 35, 37, 39, 41, 43, 47)
+_SIQS_MULTIPLIER_PRIMES = 50
+
+# The primes in the factor base up to this bound are not sieved (though values are still
+# divided by them).
+_SIQS_MIN_SIEVE_PRIME = 30
+
+# Large primes in partial relations are below this multiple of the largest prime in the
+# factor base.
+_SIQS_LARGE_PRIME_MULTIPLIER = 64
+
+# Greatest distance of the logarithm of the polynomial coefficient a from that of its ideal
+# value in the quadratic sieve (before it is relaxed).
+_SIQS_A_TOLERANCE = 0.1
+
+# Number of primes from which those in the polynomial coefficient a are chosen at random
+# (all but one of them) in the quadratic sieve.
+_SIQS_A_POOL_LEN = 30
+
+# Allowance in the sieve threshold for the primes that are not sieved, and rounding.
+_SIQS_THRESHOLD_MARGIN = 6
+
+# Number of relations collected beyond the number of primes in the factor base.
+_SIQS_EXTRA_RELATIONS = 16
+
+# Number of times more relations are collected before the quadratic sieve gives up.
+_SIQS_MAX_ATTEMPTS = 4
+
+# Number of terms multiplied together by the factoring methods between gcds with n.
+_GCD_BATCH_LEN = 128
+
+# Number of odd numbers in each segment sieved by iter_primes.
+_SEGMENT_LEN = 2**18
+
+# The primes below this bound are those in _small_primes (and 2).
+_SMALL_PRIMES_BOUND = 1000
+
+# Default bound below which is_prime trial-divides its argument by every prime.
+_TRIAL_DIVISION_BOUND = 2**16
+
+# Bit length from which is_prime trial-divides its argument by the primes above
+# _SMALL_PRIMES_BOUND (and below the trial division bound).
+_TRIAL_PRODUCT_MIN_BIT_LEN = 512
+
+# State for trial division in is_prime (see set_trial_division_bound).
+_trial_division_bound = 0
+_trial_sieve = bytearray()
+_trial_products: list[int] = []
+_trial_primes: list[int] = []
+
+def _odd_primes_below(n: int) -> list[int]:
+    # Returns the odd primes less than n, using the sieve of Eratosthenes.
+
+    assert isinstance(n, int) and n >= 0
+
+    sieve = bytearray(b"\x01") * max(n, 2)
+    for i in range(2, math.isqrt(n) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytes(len(range(i * i, n, i)))
+
+    return [i for i in range(3, n, 2) if sieve[i]]
+
+
+def primes_below(n: int) -> list[int]:
+    """
+    Returns a list of the primes less than the non-negative integer n, in increasing order.
+    """
+    assert isinstance(n, int) and n >= 0
+    return list(iter_primes(2, n))
+
+
+def primes_in_range(lo: int, hi: int) -> list[int]:
+    """
+    Returns a list of the primes p such that lo <= p < hi, in increasing order, where lo
+    and hi are non-negative integers.
+    """
+    assert isinstance(lo, int) and lo >= 0
+    assert isinstance(hi, int) and hi >= 0
+    return list(iter_primes(lo, hi))
+
+
+# mypy: no_implicit_optional=False
+def iter_primes(lo: int=2, hi: int=None) -> Iterator[int]:
+    """
+    Yields the primes p such that lo <= p < hi, in increasing order, where lo and hi are
+    non-negative integers. If hi is None, the primes from lo onward are yielded without end.
+    The primes are found using a segmented sieve of Eratosthenes, so that, however far the
+    primes are enumerated, the memory used is bounded by the size of a segment (plus a
+    list of the primes up to the square root of the largest prime yielded so far).
+    """
+    assert isinstance(lo, int) and lo >= 0
+    assert hi is None or (isinstance(hi, int) and hi >= 0)
+
+    if lo <= 2 and (hi is None or hi > 2):
+        yield 2
+
+    # Sieve only the odd numbers, starting from the first odd number >= lo (and > 1).
+    lo = max(lo, 3) | 1
+
+    base_primes: list[int] = []
+    base_bound = 0
+    while hi is None or lo < hi:
+        # This segment holds the odd numbers lo, lo + 2, ..., seg_hi - 2.
+        seg_len = _SEGMENT_LEN if hi is None else min(_SEGMENT_LEN, (hi - lo + 1) // 2)
+        seg_hi = lo + 2 * seg_len
+
+        # Every composite in the segment has an odd prime factor no greater than
+        # sqrt(seg_hi); extend the list of such primes if necessary (doubling its bound,
+        # so that this happens rarely).
+        if base_bound * base_bound < seg_hi:
+            base_bound = max(2 * base_bound, math.isqrt(seg_hi) + 1)
+            base_primes = _odd_primes_below(base_bound)
+
+        # Cross off the odd multiples of each base prime p, starting from the first one in
+        # the segment (or p^2, whose smaller multiples are crossed off by smaller primes).
+        sieve = bytearray(b"\x01") * seg_len
+        for p in base_primes:
+            if p * p >= seg_hi:
+                break
+            start = max(p * p, -(-lo // p) * p)
+            if start % 2 == 0:
+                start += p
+            i = (start - lo) // 2
+            sieve[i::p] = bytes(len(range(i, seg_len, p)))
+
+        yield from itertools.compress(range(lo, seg_hi, 2), sieve)
+
+        lo = seg_hi
+
+
+# mypy: no_implicit_optional=False
+def is_prime(n: int, test: str=None) -> bool:
     """
     Returns True if the supplied positive integer n is prime, or False if it is composite.
-    This function is probabilistic, as defined by the following characteristics:
+    If n survives trial division by small primes, it is tested with the primality test
+    named by the optional parameter test, or by the currently selected test if test is None
+    (see set_primality_test).
 
-    If n < 1000, then the probability this function will return a correct answer is 1;
-    that is, this function is deterministic.
+    If n < 3.3 x 10^24, then this function is deterministic, whatever the test; such an
+    n is tested with a fixed set of Miller-Rabin bases that is proven to be sufficient.
 
-    If n > 1000, and this function returns False, then the probability n is composite is
-    also 1; that is, this function is deterministic.
+    If n is larger, and this function returns False, then n is certainly composite, whatever
+    the test.
 
-    If n > 1000, and this function returns True, however, then the probability n is
-    composite is .25^64 (or 2.93 x 10^-39). That is, if n is a prime > 1000, this function
-    might return the wrong answer, but the likelihood of such a result is infinitesimally
-    small.
+    If n is larger, and this function returns True, however, then with the "miller-rabin"
+    test the probability n is composite is .25^64 (or 2.93 x 10^-39). That is, if n is a
+    prime, this function might return the wrong answer, but the likelihood of such a result
+    is infinitesimally small. With the "bpsw" test, no composite n is known for which this
+    function returns True, but none has been proven not to exist.
     """
     assert isinstance(n, int) and n > 1
+    if test is None:
+        test = _primality_test
+    if test not in _PRIMALITY_TESTS:
+        raise ValueError(f"Unknown primality test {test}")
 
     # Dispense with even numbers.
     if n % 2 == 0:
         return n == 2
 
-    # Dispense with small primes and multiples thereof.
-    for prime in _small_primes:
-        if n % prime == 0:
-            return n == prime
+    # Dispense with numbers below the trial division bound, which are looked up.
+    if n < _trial_division_bound:
+        return bool(_trial_sieve[n])
+
+    # Dispense with multiples of small primes, using a single gcd with their product
+    # rather than a division by each.
+    if math.gcd(n, _trial_products[0]) != 1:
+        return False
+
+    # Numbers below _DETERMINISTIC_BASES' bounds are tested with a fixed set of bases
+    # that is proven to identify every composite of that size.
+    if n < _DETERMINISTIC_BASES[-1][0]:
+        return not _is_composite_deterministic(n)
+
+    # Dispense with multiples of the remaining primes below the trial division bound. This
+    # gcd is more costly, and saves the cost of the test that follows only for a large n.
+    if len(_trial_products) > 1 and n.bit_length() >= _TRIAL_PRODUCT_MIN_BIT_LEN and \
+            math.gcd(n, _trial_products[1]) != 1:
+        return False
 
     # n is neither even, a small prime, nor a multiple thereof; resort to heavy lifting.
-    return not _is_composite(n)
+    return not _PRIMALITY_TESTS[test](n)
+
+
+def set_trial_division_bound(bound: int) -> None:
+    """
+    Sets the bound below which is_prime looks up its argument in a table of primes, or
+    otherwise trial-divides its argument by every prime before testing it (the default is
+    2^16; primes above 1000 are used only for arguments of 512 bits or more). A larger
+    bound costs more per call, but spares more of the composites that is_prime is called
+    on (e.g., by generate_prime) the cost of a primality test.
+    """
+    global _trial_division_bound, _trial_sieve, _trial_products, _trial_primes
+    assert isinstance(bound, int) and bound >= _SMALL_PRIMES_BOUND
+
+    # Mark the odd primes below the bound, for looking up numbers below it.
+    ps = primes_below(bound)[1:]
+    sieve = bytearray(bound)
+    for p in ps:
+        sieve[p] = 1
+
+    # The product of the primes below _SMALL_PRIMES_BOUND, and that of the remaining ones.
+    products = [math.prod(p for p in ps if p < _SMALL_PRIMES_BOUND)]
+    if ps[-1] > _SMALL_PRIMES_BOUND:
+        products.append(math.prod(p for p in ps if p > _SMALL_PRIMES_BOUND))
+
+    _trial_division_bound, _trial_sieve, _trial_products = bound, sieve, products
+    _trial_primes = ps
+
+
+def trial_division_bound() -> int:
+    """Returns the bound below which is_prime trial-divides its argument by every prime."""
+    return _trial_division_bound
+
+
+def set_primality_test(name: str) -> None:
+    """
+    Selects the test used by is_prime (and hence by generate_prime, and by every module in
+    this package that generates or validates primes) when no test is named in the call.
+    The available tests, listed by the function primality_tests, are "bpsw" (the Baillie-PSW
+    test; i.e., a Miller-Rabin test to base 2 followed by a strong Lucas test, which is the
+    default) and "miller-rabin" (64 rounds of the Miller-Rabin test with random bases). On a
+    large prime, the Baillie-PSW test costs about as much as three rounds of Miller-Rabin.
+    """
+    global _primality_test
+    if name not in _PRIMALITY_TESTS:
+        raise ValueError(f"Unknown primality test {name}")
+    _primality_test = name
+
+
+def primality_test() -> str:
+    """Returns the name of the test currently used by is_prime."""
+    return _primality_test
+
+
+def primality_tests() -> list[str]:
+    """Returns the names of the tests that can be used by is_prime."""
+    return list(_PRIMALITY_TESTS)
 
 
 def _is_composite(n: int) -> bool:
@@ -95,6 +363,125 @@ def _is_composite(n: int) -> bool:
     return False
 
 
+def _is_composite_bpsw(n: int) -> bool:
+    # The Baillie-PSW primality test. Returns True if the supplied positive odd integer n,
+    # which must not be divisible by any of the small primes, is composite; otherwise False.
+    # n is declared prime if it is a strong probable prime to base 2 and a strong Lucas
+    # probable prime. The pseudoprimes of the two tests appear to be disjoint: no composite
+    # that passes both is known, and exhaustive searches have found none below 2^64. If
+    # this function returns True, n is assured to be composite.
+
+    _validate_param(n)
+
+    s, t = _factor_n(n)
+    if _is_witness(2, n, s, t):
+        return True
+
+    return _is_composite_lucas(n)
+
+
+def _is_composite_deterministic(n: int) -> bool:
+    # The Miller-Rabin test with a fixed set of bases. Returns True if the supplied positive
+    # odd integer n, which must be less than the largest bound in _DETERMINISTIC_BASES, is
+    # composite; otherwise False. Unlike _is_composite, this function is never wrong.
+
+    _validate_param(n)
+
+    bases = next(bases for bound, bases in _DETERMINISTIC_BASES if n < bound)
+
+    s, t = _factor_n(n)
+    return any(_is_witness(a, n, s, t) for a in bases if a % n != 0)
+
+
+def _is_witness(a: int, n: int, s: int, t: int) -> bool:
+    # Returns True if a is a witness to the compositeness of the positive odd integer n in
+    # the Miller-Rabin test, where n = ((2^t) * s) + 1 and s is odd; otherwise False.
+
+    x = util.fast_mod_exp(a, s, n)
+    if x == 1 or x == n - 1:
+        return False
+
+    for _ in range(t - 1):
+        x = x**2 % n
+        if x == n - 1:
+            return False
+
+    return True
+
+
+def _is_composite_lucas(n: int) -> bool:
+    # The strong Lucas probable prime test, with parameters chosen by Selfridge's method.
+    # Returns True if the supplied positive odd integer n, which must not be divisible by
+    # any of the small primes, is composite; otherwise False.
+
+    # Find the first D in the sequence 5, -7, 9, -11, ... for which the Jacobi symbol
+    # (D/n) is -1. There is no such D if n is a perfect square, so check for that once
+    # a few Ds have failed (a prime n would typically have been dealt with by then).
+    d = 5
+    while True:
+        j = _jacobi(d, n)
+        if j == -1:
+            break
+        if j == 0 and abs(d) != n:
+            return True
+        if d == 13 and math.isqrt(n)**2 == n:
+            return True
+        d = -d - 2 if d > 0 else -d + 2
+
+    # Take P = 1 and Q = (1 - D) / 4, and factor n + 1 into s and t, such that
+    # n + 1 = (2^t) * s, where s is odd.
+    p, q = 1, (1 - d) // 4
+    s, t = n + 1, 0
+    while s % 2 == 0:
+        s //= 2
+        t += 1
+
+    # Compute the Lucas sequence terms U_s and V_s (and Q^s) modulo n from the most
+    # significant bit of s, doubling the index at each bit, and incrementing it if the
+    # bit is set. Divisions by 2 modulo n are done by adding n to odd values.
+    u, v, q_k = 1, p, q % n
+    for bit in bin(s)[3:]:
+        u, v = (u * v) % n, (v * v - 2 * q_k) % n
+        q_k = (q_k * q_k) % n
+        if bit == "1":
+            u, v = p * u + v, d * u + p * v
+            u = (u if u % 2 == 0 else u + n) // 2 % n
+            v = (v if v % 2 == 0 else v + n) // 2 % n
+            q_k = (q_k * q) % n
+
+    # n is a strong Lucas probable prime if U_s = 0, or V_(s*2^r) = 0 for some
+    # 0 <= r < t (mod n).
+    if u == 0 or v == 0:
+        return False
+    for _ in range(t - 1):
+        v = (v * v - 2 * q_k) % n
+        q_k = (q_k * q_k) % n
+        if v == 0:
+            return False
+
+    return True
+
+
+def _jacobi(a: int, n: int) -> int:
+    # Returns the Jacobi symbol (a/n) of the integer a and the positive odd integer n.
+
+    assert isinstance(n, int) and n > 0 and n % 2 != 0
+
+    a %= n
+    result = 1
+    while a != 0:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+
+    return result if n == 1 else 0
+
+
 def _factor_n(n: int) -> tuple[int, int]:
     # Returns the tuple (s, t), after conversion of the supplied positive odd integer
     # n to the form (2^t * s) + 1, where s is the greatest odd divisor of n-1. This
@@ -245,13 +632,947 @@ def _is_square(n: int) -> bool:
     return n == math.isqrt(n) ** 2
 
 
+# mypy: no_implicit_optional=False
+def batch_gcd(moduli: list, chunk_size: int=None, workers: int=1) -> list[int]:
+    """
+    Returns a list whose ith element is the greatest common divisor of the ith element of
+    the list moduli, and the product of all the other elements, where each element is an
+    integer greater than 1 (e.g., an RSA modulus). An element of the returned list that is
+    greater than 1 therefore indicates a modulus that shares a factor with another modulus in
+    the list; if it is equal to the modulus itself, the modulus shares all of its factors
+    (e.g., it is duplicated in the list), otherwise it is a factor of the modulus.
+
+    This function uses Bernstein's batch gcd algorithm, which computes the product of the
+    moduli with a product tree, and the product modulo the square of each modulus with a
+    remainder tree, and is much faster than computing the gcd of each pair of moduli.
+
+    If the optional parameter chunk_size is present, the moduli are processed in chunks of
+    that many, keeping only one chunk's trees in memory at a time (at the cost of building
+    them twice). If the optional parameter workers is greater than 1, the multiplications
+    and reductions at each level of the trees are performed in that many processes at once.
+    """
+    assert isinstance(moduli, list)
+    assert all(isinstance(n, int) and n > 1 for n in moduli)
+    assert chunk_size is None or (isinstance(chunk_size, int) and chunk_size >= 1)
+    assert isinstance(workers, int) and workers >= 1
+
+    if len(moduli) == 0:
+        return []
+
+    if chunk_size is None:
+        chunk_size = len(moduli)
+    chunks = [moduli[i:i + chunk_size] for i in range(0, len(moduli), chunk_size)]
+
+    executor = concurrent.futures.ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        if len(chunks) == 1:
+            tree = _product_tree(moduli, executor)
+            return _remainders_to_gcds(tree, tree[-1][0], executor)
+
+        # Compute the product of all the moduli from the products of the chunks, then
+        # rebuild the tree of each chunk in turn to descend from that product to its moduli.
+        product = _product_tree([_product_tree(chunk, executor)[-1][0] for chunk in chunks],
+                                executor)[-1][0]
+        gcds = []
+        for chunk in chunks:
+            gcds.extend(_remainders_to_gcds(_product_tree(chunk, executor), product, executor))
+        return gcds
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def _product_tree(xs: list, executor) -> list[list[int]]:
+    # Returns the levels of a product tree of the integers in the list xs, from the leaves
+    # (xs itself) to the root (a list containing only the product of xs).
+
+    tree = [xs]
+    while len(tree[-1]) > 1:
+        level = tree[-1]
+        products = _map(executor, operator.mul, level[0::2], level[1::2])
+        if len(level) % 2 != 0:
+            products.append(level[-1])
+        tree.append(products)
+
+    return tree
+
+
+def _remainders_to_gcds(tree: list[list[int]], product: int, executor) -> list[int]:
+    # Descends the product tree tree from its root, reducing product modulo the square of
+    # each node, and returns gcd(x, (product mod x^2) / x) for each leaf x, which is the
+    # gcd of x and product / x.
+
+    remainders = [product % tree[-1][0]**2]
+    for level in reversed(tree[:-1]):
+        remainders = _map(executor, _mod_square, [remainders[i // 2] for i in
+                          range(len(level))], level)
+
+    return [math.gcd(r // x, x) for r, x in zip(remainders, tree[0])]
+
+
+def _mod_square(r: int, x: int) -> int:
+    return _divmod(r, x * x)[1]
+
+
+def _divmod(a: int, b: int) -> tuple[int, int]:
+    # Returns divmod(a, b) for non-negative a and positive b. The language primitive takes
+    # time quadratic in the size of b (times that of the quotient), which dominates the cost
+    # of the remainder trees in batch_gcd; so for large operands, divide recursively instead
+    # (Burnikel and Ziegler), which reduces the division to multiplications, which are
+    # subquadratic.
+
+    n = b.bit_length()
+    if n <= _DIV_MIN_BIT_LEN or a.bit_length() - n <= _DIV_MIN_BIT_LEN:
+        return divmod(a, b)
+
+    # Divide a, one n-bit digit at a time from the most significant, by the n-bit b.
+    digits = []
+    while a:
+        a, digit = a >> n, a & ((1 << n) - 1)
+        digits.append(digit)
+
+    q, r = 0, 0
+    for digit in reversed(digits):
+        q_digit, r = _div_2n_by_n((r << n) | digit, b, n)
+        q = (q << n) | q_digit
+
+    return q, r
+
+
+def _div_2n_by_n(a: int, b: int, n: int) -> tuple[int, int]:
+    # Returns divmod(a, b), where b has n bits, and a < b * 2^n.
+
+    if n <= _DIV_MIN_BIT_LEN:
+        return divmod(a, b)
+
+    # Make n even, so that it can be split into halves.
+    odd = n % 2
+    if odd:
+        a, b, n = a << 1, b << 1, n + 1
+
+    # Divide the top three quarters of a by b, then the remainder and the bottom quarter
+    # of a by b, each as a division of three half digits by two.
+    h = n // 2
+    mask = (1 << h) - 1
+    b_hi, b_lo = b >> h, b & mask
+    q_hi, r = _div_3h_by_2h(a >> n, (a >> h) & mask, b, b_hi, b_lo, h)
+    q_lo, r = _div_3h_by_2h(r, a & mask, b, b_hi, b_lo, h)
+
+    return (q_hi << h) | q_lo, r >> odd
+
+
+def _div_3h_by_2h(a_hi: int, a_lo: int, b: int, b_hi: int, b_lo: int,
+                  h: int) -> tuple[int, int]:
+    # Returns divmod((a_hi << h) | a_lo, b), where b = (b_hi << h) | b_lo, b_hi has h bits,
+    # a_lo has at most h bits, and a_hi < b * 2^h. The quotient is estimated by dividing
+    # a_hi by b_hi, and is then too large by at most 2.
+
+    if a_hi >> h == b_hi:
+        q, r = (1 << h) - 1, a_hi - (b_hi << h) + b_hi
+    else:
+        q, r = _div_2n_by_n(a_hi, b_hi, h)
+
+    r = ((r << h) | a_lo) - q * b_lo
+    while r < 0:
+        q -= 1
+        r += b
+
+    return q, r
+
+
+def _map(executor, fn, *iterables) -> list:
+    # Maps fn over iterables, in the processes of executor if it is not None.
+    if executor is None:
+        return list(map(fn, *iterables))
+    return list(executor.map(fn, *iterables))
+
+
+def factor(n: int) -> list[int]:
+    """
+    Returns the prime factorization of the positive integer n, as a list of its prime factors
+    in increasing order, each repeated as many times as it divides n (e.g., factor(12) returns
+    [2, 2, 3], and factor(1) returns []).
+
+    Factors below the trial division bound (see set_trial_division_bound) are found by trial
+    division. Larger factors are found by Pollard's p-1 method, which quickly finds a factor
+    p of n if p-1 has only small prime factors, and failing that by Pollard's rho method (as
+    improved by Brent), which finds a factor p in time proportional to the square root of p.
+    The rho method therefore takes seconds to find a 50-bit factor, and is impractical
+    for much larger ones, which are found by the elliptic curve method (see ecm). Numbers
+    of up to 280 bits (about 84 digits) that have no factors of about 15 digits or fewer are
+    instead split by the quadratic sieve (see siqs), which takes about a second for 40-digit
+    numbers, and a minute for 60-digit ones.
+    """
+    assert isinstance(n, int) and n >= 1
+
+    factors = []
+
+    # Divide out the powers of 2, and those of the other primes below the trial division
+    # bound. A gcd with the product of these primes reveals whether there are any.
+    while n % 2 == 0:
+        factors.append(2)
+        n //= 2
+
+    g = math.gcd(n, math.prod(_trial_products))
+    for p in _trial_primes:
+        if g == 1:
+            break
+        if g % p == 0:
+            g //= p
+            while n % p == 0:
+                factors.append(p)
+                n //= p
+
+    # Split the remaining cofactors until only primes remain.
+    cofactors = [n]
+    while cofactors:
+        m = cofactors.pop()
+        if m == 1:
+            continue
+
+        if m < _trial_division_bound**2 or is_prime(m):
+            factors.append(m)
+            continue
+
+        root, k = _perfect_power(m)
+        if k > 1:
+            cofactors.extend([root] * k)
+            continue
+
+        d = _find_factor(m)
+        cofactors.extend([d, m // d])
+
+    return sorted(factors)
+
+
+def _find_factor(n: int) -> int:
+    # Returns a nontrivial factor of the odd composite integer n, which is not a perfect power.
+    # The methods are tried in increasing order of cost for the size of factor they find.
+
+    d = _pollard_p_minus_1(n, _P_MINUS_1_B1, _P_MINUS_1_B2)
+    if d is not None:
+        return d
+
+    d = _brent_rho(n, 1, _RHO_MAX_STEPS)
+    if d is not None:
+        return d
+
+    # The quadratic sieve takes less time than the elliptic curve method takes to find factors
+    # of more than about 15 digits, of the numbers within its reach.
+    sievable = n.bit_length() <= _SIQS_MAX_BIT_LEN
+    for b1, curves in _ECM_SCHEDULE[:1] if sievable else _ECM_SCHEDULE:
+        d = ecm(n, b1, curves=curves)
+        if d is not None:
+            return d
+
+    if sievable:
+        d = siqs(n)
+        if d is not None:
+            return d
+
+    c = 2
+    while True:
+        d = _brent_rho(n, c)
+        if d is not None:
+            return d
+        c += 1
+
+
+def _pollard_p_minus_1(n: int, b1: int, b2: int) -> int | None:
+    # Pollard's p-1 method. Returns a nontrivial factor of the odd composite integer n, or
+    # None if none is found. By Fermat's little theorem, if p is a prime factor of n, and
+    # E is a multiple of p-1, then a^E = 1 (mod p), and so p divides gcd(a^E - 1, n). Stage 1
+    # takes E to be the product of the prime powers up to b1, so succeeds if the prime factors
+    # of p-1 are all below b1; stage 2 additionally tries each prime q between b1 and b2 as a
+    # final factor of p-1, so succeeds if all but one are.
+
+    a = 2
+
+    # Stage 1: raise a to the prime powers up to b1, in batches to save on gcds.
+    e = 1
+    for q in iter_primes(2, b1):
+        e *= q ** int(math.log(b1, q))
+        if e.bit_length() > 1024:
+            a, e = pow(a, e, n), 1
+    a = pow(a, e, n)
+
+    g = math.gcd(a - 1, n)
+    if g == n:
+        return None
+    if g != 1:
+        return g
+
+    # Stage 2: multiply together a^(E*q) - 1 for each prime q in (b1, b2), and take the gcd
+    # of the product with n. Successive primes differ by small even gaps, so a^(E*q) for the
+    # next q is found with one multiplication by a precomputed a^(E*gap).
+    a_gaps = {2: (a * a) % n}
+    q_prev = None
+    x = 1
+    acc = 1
+    for i, q in enumerate(iter_primes(b1, b2)):
+        if q_prev is None:
+            x = pow(a, q, n)
+        else:
+            gap = q - q_prev
+            if gap not in a_gaps:
+                a_gaps[gap] = pow(a, gap, n)
+            x = (x * a_gaps[gap]) % n
+        q_prev = q
+        acc = (acc * (x - 1)) % n
+
+        if i % _GCD_BATCH_LEN == 0:
+            g = math.gcd(acc, n)
+            if g == n:
+                return None
+            if g != 1:
+                return g
+
+    g = math.gcd(acc, n)
+    return g if 1 < g < n else None
+
+
+# mypy: no_implicit_optional=False
+def _brent_rho(n: int, c: int, max_steps: int=None) -> int | None:
+    # Pollard's rho method, with Brent's cycle detection. Returns a nontrivial factor of the
+    # odd composite integer n, or None if none is found with the polynomial x^2 + c (within
+    # about max_steps steps, if max_steps is not None). The
+    # sequence x, f(x), f(f(x)), ... for f(x) = x^2 + c (mod n) eventually cycles modulo
+    # each prime factor p of n, after about sqrt(p) steps; when it does, p divides the
+    # difference of two of its elements, and hence their gcd with n. Differences are
+    # multiplied together, and their product's gcd with n taken once per batch.
+
+    y, r, acc, g = 2, 1, 1, 1
+    x = ys = y
+    while g == 1:
+        x = y
+        for _ in range(r):
+            y = (y * y + c) % n
+
+        k = 0
+        while k < r and g == 1:
+            ys = y
+            for _ in range(min(_GCD_BATCH_LEN, r - k)):
+                y = (y * y + c) % n
+                acc = (acc * (x - y)) % n
+            g = math.gcd(acc, n)
+            k += _GCD_BATCH_LEN
+
+        r *= 2
+        if g == 1 and max_steps is not None and r > max_steps:
+            return None
+
+    # If the batch overshot (i.e., all the factors of n were found at once), retrace its
+    # steps one at a time.
+    if g == n:
+        g = 1
+        while g == 1:
+            ys = (ys * ys + c) % n
+            g = math.gcd(x - ys, n)
+
+    return g if g != n else None
+
+
+# mypy: no_implicit_optional=False
+def ecm(n: int, b1: int, b2: int=None, curves: int=100, workers: int=1,
+        progress: Callable[[int, int], None]=None) -> int | None:
+    """
+    Attempts to find a nontrivial factor of the odd composite integer n using Lenstra's
+    elliptic curve method, and returns the factor if it is successful, or None otherwise.
+    This method finds a factor p of n in time that depends mostly on the size of p rather
+    than that of n, and is the method of choice for finding factors of up to 30-40 digits
+    of numbers too large for other methods (see factor).
+
+    Up to curves random curves are tried, each with stage 1 bound b1, and stage 2 bound b2
+    (100 * b1 by default). The method finds p with a given curve if the order of the curve
+    modulo p has no prime factors above b1 except for at most one below b2. As a rule of
+    thumb, the following values of b1 and curves find a factor of the given number of digits
+    with high probability: 15 digits, 2000 and 25; 20 digits, 11000 and 90; 25 digits, 50000
+    and 300; 30 digits, 250000 and 700; 35 digits, 1000000 and 1800.
+
+    If the optional parameter workers is greater than 1, curves are tried in that many
+    processes at once. If the optional parameter progress is present, it is called after
+    each curve with the number of curves tried so far and the number of curves in all.
+    """
+    assert isinstance(n, int) and n > 3 and n % 2 != 0
+    assert isinstance(b1, int) and b1 >= _ECM_D
+    assert b2 is None or (isinstance(b2, int) and b2 >= b1)
+    assert isinstance(curves, int) and curves >= 1
+    assert isinstance(workers, int) and workers >= 1
+
+    if b2 is None:
+        b2 = 100 * b1
+
+    sigmas = [prng.randrange(6, n - 1) for _ in range(curves)]
+
+    if workers == 1:
+        for i, sigma in enumerate(sigmas):
+            d = _ecm_curve(n, b1, b2, sigma)
+            if progress is not None:
+                progress(i + 1, curves)
+            if d is not None:
+                return d
+        return None
+
+    executor = concurrent.futures.ProcessPoolExecutor(workers)
+    try:
+        futures = [executor.submit(_ecm_curve, n, b1, b2, sigma) for sigma in sigmas]
+        for i, future in enumerate(concurrent.futures.as_completed(futures)):
+            d = future.result()
+            if progress is not None:
+                progress(i + 1, curves)
+            if d is not None:
+                return d
+        return None
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _ecm_curve(n: int, b1: int, b2: int, sigma: int) -> int | None:
+    # Runs stages 1 and 2 of the elliptic curve method on one curve, and returns a nontrivial
+    # factor of n, or None if none is found. The curve is the Montgomery curve
+    # By^2 = x^3 + Ax^2 + x with Suyama's parametrization by sigma, whose order is divisible by
+    # 12. Points are represented by their projective coordinates (X : Z), which suffice for
+    # doubling and for adding two points whose difference is known; the y coordinate is not
+    # needed. A factor p of n is found when a multiple of the starting point is the point at
+    # infinity modulo p; i.e., when p divides its Z coordinate.
+
+    # The starting point (u^3 : v^3), and the curve constant a24 = (A + 2) / 4, where
+    # u = sigma^2 - 5 and v = 4 * sigma. If the constant's denominator is not invertible
+    # modulo n, it shares a factor with n.
+    u = (sigma * sigma - 5) % n
+    v = (4 * sigma) % n
+    den = (16 * u**3 * v) % n
+    g = math.gcd(den, n)
+    if g != 1:
+        return g if g != n else None
+    a24 = ((v - u)**3 * (3 * u + v) * pow(den, -1, n)) % n
+    pt = (u**3 % n, v**3 % n)
+
+    # Stage 1: multiply the point by each prime power up to b1.
+    for p in iter_primes(2, b1 + 1):
+        pe = p
+        while pe * p <= b1:
+            pe *= p
+        pt = _ecm_mul(pt, pe, a24, n)
+
+    g = math.gcd(pt[1], n)
+    if g == n:
+        return None
+    if g != 1:
+        return g
+
+    # Stage 2: for each prime q in (b1, b2], check whether qQ is the point at infinity modulo
+    # p, where Q is the point from stage 1. Writing q = mD + d or q = mD - d, where 0 < d < D/2,
+    # qQ is the point at infinity if and only if mDQ = dQ or mDQ = -dQ, which, since -dQ
+    # and dQ have the same x coordinate, is if and only if X_mDQ * Z_dQ = X_dQ * Z_mDQ.
+    # So precompute dQ for odd d < D/2, step through mDQ, and multiply together
+    # X_mDQ * Z_dQ - X_dQ * Z_mDQ for each q, taking the gcd of the product with n.
+    q2 = _ecm_double(pt, a24, n)
+    multiples = {1: pt, 3: _ecm_add(q2, pt, pt, n)}
+    for d in range(5, _ECM_D // 2, 2):
+        multiples[d] = _ecm_add(multiples[d - 2], q2, multiples[d - 4], n)
+
+    dq = _ecm_mul(pt, _ECM_D, a24, n)
+    m = (b1 + _ECM_D // 2) // _ECM_D
+    r_prev = _ecm_mul(pt, (m - 1) * _ECM_D, a24, n) if m > 1 else dq
+    r = _ecm_mul(pt, m * _ECM_D, a24, n)
+    if m == 1:
+        # R_0 is the point at infinity, which the differential addition cannot handle, so
+        # take R_1 = DQ and R_2 = 2DQ explicitly.
+        r_prev, r, m = dq, _ecm_double(dq, a24, n), 2
+
+    acc = 1
+    for i, q in enumerate(iter_primes(b1 + 1, b2 + 1)):
+        # Advance R = mDQ until q is within D/2 of mD.
+        while q > m * _ECM_D + _ECM_D // 2:
+            r, r_prev = _ecm_add(r, dq, r_prev, n), r
+            m += 1
+
+        # d is odd and below D/2, unless q lies below the first mD used, which can happen
+        # only for b1 < 1.5D; such q are skipped.
+        d = abs(q - m * _ECM_D)
+        if d not in multiples:
+            continue
+        s = multiples[d]
+        acc = (acc * (r[0] * s[1] - s[0] * r[1])) % n
+
+        if i % _GCD_BATCH_LEN == 0:
+            g = math.gcd(acc, n)
+            if g != 1:
+                return g if g != n else None
+
+    g = math.gcd(acc, n)
+    return g if g not in (1, n) else None
+
+
+def _ecm_double(pt: tuple[int, int], a24: int, n: int) -> tuple[int, int]:
+    # Returns 2P for the point P = pt on the Montgomery curve with constant a24.
+    x, z = pt
+    s, d = (x + z)**2 % n, (x - z)**2 % n
+    t = s - d
+    return (s * d) % n, (t * (d + a24 * t)) % n
+
+
+def _ecm_add(pt: tuple[int, int], qt: tuple[int, int], diff: tuple[int, int],
+             n: int) -> tuple[int, int]:
+    # Returns P + Q for the points P = pt and Q = qt, given their difference P - Q = diff.
+    u = (pt[0] - pt[1]) * (qt[0] + qt[1])
+    v = (pt[0] + pt[1]) * (qt[0] - qt[1])
+    return (diff[1] * (u + v)**2) % n, (diff[0] * (u - v)**2) % n
+
+
+def _ecm_mul(pt: tuple[int, int], k: int, a24: int, n: int) -> tuple[int, int]:
+    # Returns kP for the point P = pt and the positive integer k, using the Montgomery
+    # ladder, which keeps the pair (jP, (j+1)P), whose difference is always P.
+    r0, r1 = pt, _ecm_double(pt, a24, n)
+    for bit in bin(k)[3:]:
+        if bit == "1":
+            r0, r1 = _ecm_add(r1, r0, pt, n), _ecm_double(r1, a24, n)
+        else:
+            r0, r1 = _ecm_double(r0, a24, n), _ecm_add(r1, r0, pt, n)
+    return r0
+
+
+def _perfect_power(n: int) -> tuple[int, int]:
+    # Returns the tuple (r, k) with the greatest k such that n = r^k, for the integer n > 1.
+
+    for k in range(n.bit_length(), 1, -1):
+        r = _iroot(n, k)
+        if r > 1 and r**k == n:
+            return r, k
+
+    return n, 1
+
+
+def _iroot(n: int, k: int) -> int:
+    # Returns the integer k-th root of the non-negative integer n; i.e., the greatest r
+    # such that r^k <= n, using Newton's method.
+
+    if n < 2:
+        return n
+
+    r = 1 << -(-n.bit_length() // k)
+    while True:
+        s = ((k - 1) * r + n // r**(k - 1)) // k
+        if s >= r:
+            return r
+        r = s
+
+
+# mypy: no_implicit_optional=False
+def siqs(n: int, workers: int=1, progress: Callable[[int, int], None]=None) -> int | None:
+    """
+    Attempts to find a nontrivial factor of the odd composite integer n using the
+    self-initialising quadratic sieve, and returns the factor if it is successful, or None
+    otherwise. Unlike the elliptic curve method (see ecm), this method takes time that depends
+    only on the size of n, and not on that of its factors, and so is the method of choice for
+    numbers of about 40 to 80 digits whose factors are all too large for other methods (it
+    takes about a second for 40 digits, and a minute for 60).
+
+    The method collects relations u^2 = v (mod n), where v is a product of primes from a
+    factor base of small primes, by sieving the values of a series of quadratic polynomials.
+    Once there are more relations than primes in the factor base, a subset of them whose
+    values v multiply to a square y^2 is found by Gaussian elimination over GF(2). Then
+    x^2 = y^2 (mod n), where x is the product of the corresponding values u, and
+    gcd(x - y, n) is a nontrivial factor of n with probability at least 1/2.
+
+    If the optional parameter workers is greater than 1, polynomials are sieved in that many
+    processes at once. If the optional parameter progress is present, it is called as
+    relations are collected with the number collected so far and the number needed.
+    """
+    assert isinstance(n, int) and n > 3 and n % 2 != 0
+    assert isinstance(workers, int) and workers >= 1
+
+    root, k = _perfect_power(n)
+    if k > 1:
+        return root
+
+    # Sieve for a small multiple kn of n, for which more small primes are in the factor base.
+    kn = _siqs_multiplier(n) * n
+    fb_len, half_width = _siqs_parameters(kn)
+
+    # The factor base consists of the primes p modulo which kn is a square, with the square
+    # roots of kn modulo each, and their (rounded) logarithms for the sieve.
+    fb, roots, logs = [], [], []
+    for p in iter_primes(2):
+        if len(fb) == fb_len:
+            break
+        if n % p == 0:
+            return p if p != n else None
+        if p == 2 or kn % p == 0 or _jacobi(kn, p) == 1:
+            fb.append(p)
+            roots.append(_sqrt_mod(kn, p))
+            logs.append(round(math.log2(p)))
+
+    # Values with a single prime factor above the factor base, and below this bound, are kept
+    # as partial relations; two with the same large prime combine to give a full relation.
+    lp_bound = fb[-1] * _SIQS_LARGE_PRIME_MULTIPLIER
+
+    # Sieve positions whose logarithms sum to at least this threshold are candidates for
+    # relations. It falls short of the logarithm of the largest values (about
+    # half_width * sqrt(kn/2)) to allow for a large prime, and for the small primes that
+    # are not sieved.
+    threshold = round(math.log2(half_width) + (kn.bit_length() - 1) / 2
+                      - math.log2(lp_bound) - _SIQS_THRESHOLD_MARGIN)
+
+    # The coefficient a of each polynomial is a product of primes from the factor base, near
+    # to sqrt(2kn) / half_width, so that the values of the polynomials are as small as possible.
+    a_target = math.isqrt(2 * kn) // half_width
+    a_used: set[int] = set()
+    params = (kn, fb, roots, logs, _product_tree(fb, None), half_width, threshold, lp_bound)
+
+    relations: list[tuple[int, list[int], int]] = []
+    partials: dict[int, tuple[int, list[int]]] = {}
+    seen: set[int] = set()
+    needed = len(fb) + _SIQS_EXTRA_RELATIONS
+    attempts = 0
+
+    executor = None
+    if workers > 1:
+        executor = concurrent.futures.ProcessPoolExecutor(workers)
+    try:
+        pending: set[concurrent.futures.Future] = set()
+        while True:
+            # Sieve the polynomials for the next value(s) of a, in each process if there
+            # are several.
+            if executor is None:
+                results = [_siqs_sieve(_siqs_choose_a(fb, kn, a_target, a_used), *params)]
+            else:
+                while len(pending) < 2 * workers:
+                    a_idxs = _siqs_choose_a(fb, kn, a_target, a_used)
+                    pending.add(executor.submit(_siqs_sieve, a_idxs, *params))
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                results = [future.result() for future in done]
+
+            # Keep each new full relation, and combine partial relations with the same large
+            # prime: if u1^2 = v1 * l and u2^2 = v2 * l, then (u1 * u2)^2 = v1 * v2 * l^2.
+            for fulls, halves in results:
+                for u, factors in fulls:
+                    if u not in seen:
+                        seen.add(u)
+                        relations.append((u, factors, 1))
+                for u, factors, large in halves:
+                    if u in seen:
+                        continue
+                    seen.add(u)
+                    if large in partials:
+                        u_0, factors_0 = partials[large]
+                        relations.append(((u * u_0) % n, factors + factors_0, large))
+                    else:
+                        partials[large] = (u, factors)
+
+            if progress is not None:
+                progress(min(len(relations), needed), needed)
+
+            if len(relations) >= needed:
+                d = _siqs_find_factor(n, fb, relations)
+                if d is not None:
+                    return d
+
+                # Each dependency fails with probability at most 1/2, so this is unlikely
+                # unless n is prime.
+                attempts += 1
+                if attempts == _SIQS_MAX_ATTEMPTS:
+                    return None
+                needed = len(relations) + _SIQS_EXTRA_RELATIONS
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def _siqs_multiplier(n: int) -> int:
+    # Returns the multiplier k for which the factor base of kn is expected to be richest in
+    # small primes, using the Knuth-Schroeppel function. Each odd prime p modulo which kn is
+    # a nonzero square contributes 2 * log(p) / (p - 1) to the expected logarithm of the
+    # part of a sieve value that factors over the primes, and each p that divides k
+    # contributes log(p) / p; this is offset by the factor k in the size of the values.
+
+    best_k, best_score = 1, -math.inf
+    for k in _SIQS_MULTIPLIERS:
+        kn = k * n
+        score = -math.log(k) / 2
+        if kn % 8 == 1:
+            score += 2 * math.log(2)
+        elif kn % 8 == 5:
+            score += math.log(2)
+        elif kn % 4 == 3:
+            score += math.log(2) / 2
+        for p in _small_primes[:_SIQS_MULTIPLIER_PRIMES]:
+            if kn % p == 0:
+                score += math.log(p) / p
+            elif _jacobi(kn, p) == 1:
+                score += 2 * math.log(p) / (p - 1)
+        if score > best_score:
+            best_k, best_score = k, score
+
+    return best_k
+
+
+def _siqs_parameters(kn: int) -> tuple[int, int]:
+    # Returns the number of primes in the factor base, and half the length of the sieve
+    # interval, for the quadratic sieve of kn.
+
+    for bit_len, fb_len, half_width in _SIQS_PARAMETERS:
+        if kn.bit_length() <= bit_len:
+            break
+    return fb_len, half_width
+
+
+def _siqs_choose_a(fb: list[int], kn: int, a_target: int, a_used: set[int]) -> list[int]:
+    # Returns the indices in the factor base fb of the primes whose product is the next
+    # polynomial coefficient a, which is near to a_target, and not in the set a_used (to
+    # which it is added). All but the last of the s primes are chosen at random from those
+    # nearest to the s-th root of a_target, where s is the least number for which this root
+    # is below the median of the factor base, and the last so that the product is as near
+    # as possible to a_target.
+
+    # The primes in a are not sieved, so the smallest are avoided, as are those dividing kn.
+    eligible = [i for i in range(len(fb)) if fb[i] > _SIQS_MIN_SIEVE_PRIME and kn % fb[i] != 0]
+    log_target = math.log(max(a_target, 2))
+    s = max(1, math.ceil(log_target / math.log(fb[eligible[len(eligible) // 2]])))
+    pool = sorted(eligible, key=lambda i: abs(math.log(fb[i]) - log_target / s))
+    pool = pool[:_SIQS_A_POOL_LEN]
+
+    # A product far from a_target gives larger values (and fewer relations), so the last prime
+    # must bring it within a tolerance, which is relaxed if this repeatedly fails.
+    for tries in itertools.count():
+        tolerance = _SIQS_A_TOLERANCE * 2 ** (tries // 10)
+        a_idxs = [pool[prng.randbelow(len(pool))] for _ in range(s - 1)]
+        if len(set(a_idxs)) < s - 1:
+            continue
+
+        a_0 = math.prod(fb[i] for i in a_idxs)
+        log_last = log_target - math.log(a_0)
+        lasts = [i for i in eligible
+                 if abs(math.log(fb[i]) - log_last) <= tolerance and i not in a_idxs]
+        for i in sorted(lasts, key=lambda i: abs(math.log(fb[i]) - log_last)):
+            a = a_0 * fb[i]
+            if a not in a_used:
+                a_used.add(a)
+                return a_idxs + [i]
+
+    raise AssertionError("unreachable")
+
+
+def _siqs_sieve(a_idxs: list[int], kn: int, fb: list[int], roots: list[int], logs: list[int],
+                tree: list[list[int]], half_width: int, threshold: int, lp_bound: int
+                ) -> tuple[list[tuple[int, list[int]]], list[tuple[int, list[int], int]]]:
+    # Sieves each of the polynomials with the coefficient a that is the product of the primes
+    # in the factor base fb at the indices a_idxs, and returns the full relations found, as
+    # tuples (u, factors), and the partial relations, as tuples (u, factors, large prime),
+    # where u^2 = (the product of the factors and the large prime) (mod kn). The factors are
+    # the primes dividing that product, repeated as often as they divide it, with -1 for a
+    # negative product. The list tree is the product tree of fb.
+    #
+    # The polynomials are Q(x) = (a*x + b)^2 - kn, where b^2 = kn (mod a), so that
+    # Q(x) = a * (a*x^2 + 2*b*x + c), for c = (b^2 - kn) / a. For an a that is the product of
+    # s primes q_l, there are 2^s such b, each a sum of +/- b_l, where b_l = 0 (mod q_j) for
+    # j != l and b_l^2 = kn (mod q_l). These are taken in Gray code order, so that each
+    # differs from the last in the sign of a single b_l (b and -b give the same values, so
+    # only half are used). This allows the roots of Q(x) modulo each prime p in the factor
+    # base to be updated from the last polynomial's with one addition per prime.
+    #
+    # The values of a*x^2 + 2*b*x + c for x in [-half_width, half_width) are sieved: the
+    # (rounded) logarithm of each prime p in the factor base is added to the positions x
+    # that are roots modulo p. Positions whose sum of logarithms reaches the threshold are
+    # likely to factor over the factor base, and are checked by division.
+
+    qs = [fb[i] for i in a_idxs]
+    a = math.prod(qs)
+
+    bs = []
+    for q, i in zip(qs, a_idxs):
+        a_q = a // q
+        gamma = (roots[i] * pow(a_q, -1, q)) % q
+        if gamma > q // 2:
+            gamma = q - gamma
+        bs.append(a_q * gamma)
+    b = sum(bs)
+
+    # The roots of Q(x) modulo each sieved prime p (as offsets into the sieve array), and the
+    # amounts by which they change when the sign of each b_l is changed. The primes in a are
+    # not sieved, since Q(x) has only one root modulo each.
+    sieved = [i for i, p in enumerate(fb) if p > _SIQS_MIN_SIEVE_PRIME and i not in a_idxs]
+    ps = [fb[i] for i in sieved]
+    a_invs = [pow(a, -1, p) for p in ps]
+    r1s = [(a_inv * (roots[i] - b) + half_width) % p for i, p, a_inv in zip(sieved, ps, a_invs)]
+    r2s = [(a_inv * (-roots[i] - b) + half_width) % p for i, p, a_inv in zip(sieved, ps, a_invs)]
+    deltas = [[(2 * b_l * a_inv) % p for p, a_inv in zip(ps, a_invs)] for b_l in bs]
+
+    # Translation tables for bytes that add the logarithm of each sieved prime (saturating at
+    # 255), and that flag the positions that reach the threshold.
+    tables = [bytes(min(v + log_p, 255) for v in range(256)) for log_p in range(max(logs) + 1)]
+    adds = [tables[logs[i]] for i in sieved]
+    candidates = bytes(1 if v >= threshold else 0 for v in range(256))
+
+    fulls, partials = [], []
+    for j in range(2 ** (len(bs) - 1)):
+        # Change the sign of b_l, where l is the number of trailing zeros of j.
+        if j > 0:
+            l = (j & -j).bit_length() - 1
+            e = -1 if ((j >> l) + 1) // 2 % 2 != 0 else 1
+            b += 2 * e * bs[l]
+            e_deltas = [e * delta for delta in deltas[l]]
+            r1s = [(r - d) % p for r, d, p in zip(r1s, e_deltas, ps)]
+            r2s = [(r - d) % p for r, d, p in zip(r2s, e_deltas, ps)]
+        c = (b * b - kn) // a
+
+        # Adding log(p) to every p-th position is done for all of them at once, by translating
+        # the slice of those positions through the table that adds log(p) to each byte.
+        sieve = bytearray(2 * half_width)
+        for p, add, r1, r2 in zip(ps, adds, r1s, r2s):
+            sieve[r1::p] = sieve[r1::p].translate(add)
+            if r2 != r1:
+                sieve[r2::p] = sieve[r2::p].translate(add)
+
+        flags = sieve.translate(candidates)
+        x = flags.find(1)
+        while x != -1:
+            # Divide the value at x by the primes in the factor base that divide it.
+            t = x - half_width
+            v = (a * t + 2 * b) * t + c
+            factors = list(qs)
+            if v < 0:
+                factors.append(-1)
+                v = -v
+            for p in _siqs_divisors(v, tree):
+                while v % p == 0:
+                    factors.append(p)
+                    v //= p
+
+            u = a * t + b
+            if v == 1:
+                fulls.append((u % kn, factors))
+            elif v < lp_bound:
+                partials.append((u % kn, factors, v))
+
+            x = flags.find(1, x + 1)
+
+    return fulls, partials
+
+
+def _siqs_divisors(v: int, tree: list[list[int]]) -> list[int]:
+    # Returns the primes in the leaves of the product tree tree that divide v, found by
+    # descending from the root only into the subtrees whose products share a factor with v.
+
+    divisors = []
+    nodes = [(len(tree) - 1, 0, math.gcd(v, tree[-1][0]))]
+    while nodes:
+        k, i, g = nodes.pop()
+        if g == 1:
+            continue
+        if k == 0:
+            divisors.append(tree[0][i])
+            continue
+        for child in range(2 * i, min(2 * i + 2, len(tree[k - 1]))):
+            nodes.append((k - 1, child, math.gcd(g, tree[k - 1][child])))
+
+    return divisors
+
+
+def _siqs_find_factor(n: int, fb: list[int], relations: list[tuple[int, list[int], int]]
+                      ) -> int | None:
+    # Returns a nontrivial factor of n found from the relations u^2 = y^2 * v (mod n), where v
+    # is the product of the primes in factors, for each (u, factors, y) in relations, or None
+    # if none is found. Each subset of relations whose v multiply to a square gives a
+    # congruence of squares modulo n.
+
+    # Each relation's v is represented by its vector of exponents modulo 2, as an int whose
+    # bit i is the parity of the exponent of the prime fb[i] (or of -1, for the last bit).
+    cols = {p: i for i, p in enumerate(fb)}
+    cols[-1] = len(fb)
+    vectors = []
+    for _, factors, _ in relations:
+        vector = 0
+        for p in factors:
+            vector ^= 1 << cols[p]
+        vectors.append(vector)
+
+    for dependency in _gf2_dependencies(vectors):
+        x, y = 1, 1
+        exponents: dict[int, int] = {}
+        while dependency:
+            low = dependency & -dependency
+            u, factors, y_0 = relations[low.bit_length() - 1]
+            x, y = (x * u) % n, (y * y_0) % n
+            for p in factors:
+                exponents[p] = exponents.get(p, 0) + 1
+            dependency ^= low
+        for p, e in exponents.items():
+            if p != -1:
+                y = (y * pow(p, e // 2, n)) % n
+
+        d = math.gcd(x - y, n)
+        if 1 < d < n:
+            return d
+
+    return None
+
+
+def _gf2_dependencies(vectors: list[int]) -> list[int]:
+    # Returns subsets of the vectors over GF(2), each represented by an int whose bits are set
+    # for the indices of the vectors, that sum to zero; each vector is an int whose bits are
+    # its coordinates. This is Gaussian elimination: each vector is reduced by the pivot
+    # vectors with its lowest set bit until it has none, when it becomes a new pivot, or is
+    # zero, when the vectors that reduced it (and it) sum to zero.
+
+    pivots: dict[int, tuple[int, int]] = {}
+    dependencies = []
+    for i, vector in enumerate(vectors):
+        subset = 1 << i
+        while vector != 0:
+            low = vector & -vector
+            if low not in pivots:
+                pivots[low] = (vector, subset)
+                break
+            pivot, pivot_subset = pivots[low]
+            vector ^= pivot
+            subset ^= pivot_subset
+        if vector == 0:
+            dependencies.append(subset)
+
+    return dependencies
+
+
+def _sqrt_mod(a: int, p: int) -> int:
+    # Returns a square root of a modulo the prime p, where a is a square modulo p, using the
+    # Tonelli-Shanks algorithm.
+
+    a %= p
+    if a == 0 or p == 2:
+        return a
+    if p % 4 == 3:
+        return pow(a, (p + 1) // 4, p)
+
+    # Write p - 1 = s * 2^t for odd s, and find a non-square z.
+    s, t = _factor_n(p)
+    z = 2
+    while _jacobi(z, p) != -1:
+        z += 1
+
+    m, c, r, u = t, pow(z, s, p), pow(a, (s + 1) // 2, p), pow(a, s, p)
+    while u != 1:
+        i, u_2 = 0, u
+        while u_2 != 1:
+            u_2 = (u_2 * u_2) % p
+            i += 1
+        b = pow(c, 1 << (m - i - 1), p)
+        m, c = i, (b * b) % p
+        r, u = (r * b) % p, (u * c) % p
+
+    return r
+
+
 def shor_factor(n: int) -> tuple[int, int]:
     """
     Attempts to factor a valid RSA modulus n using Shor's factorization algorithm. A valid n
     is an integer that is the product of exactly two distinct, nontrivial prime factors.
     Returns the tuple (p, q) if the factorization is successful, where p and q are the
     nontrivial factors of n. The runtime performance of this algorithm is exponential in the
-    size (in bits) of n; therefore it should generally not be called with n > 32 bits.
+    size (in bits) of n; it takes well under a second for a 64-bit n whose factors are of
+    similar size, but time (and memory) proportional to the square root of n if one factor is
+    much smaller.
     """
     assert isinstance(n, int) and n > 2 and n % 2 != 0
     assert not is_prime(n)
@@ -269,12 +1590,10 @@ def shor_factor(n: int) -> tuple[int, int]:
             return g, n // g
 
         # Find the order r of a in the finite group modulo n. Whatever r is, by Lagrange's
-        # theorem, it must divide the totient of n (or the order of the group). The larger n
-        # is, the longer this will take; in fact, the running time of this loop is
-        # exponential in the size (in bits) of n.
-        r = 1
-        while util.fast_mod_exp(a, r, n) != 1:
-            r += 1
+        # theorem, it must divide the totient of n (or the order of the group). This is the
+        # step that a quantum computer performs in polynomial time; classically, the running
+        # time is exponential in the size (in bits) of n (see _order).
+        r = _order(a, n)
 
         # If the order r is even, then a^r mod n must have a square root; namely,
         # a^(r/2) mod n. If r is odd, start over with another a.
@@ -295,20 +1614,85 @@ def shor_factor(n: int) -> tuple[int, int]:
                 return p, n // p
 
 
+def _order(a: int, n: int) -> int:
+    # Returns the multiplicative order of a modulo n; i.e., the least r > 0 such that
+    # a^r = 1 (mod n), for a coprime to n. A multiple of the order is found first, and is
+    # then reduced to the order by dividing out its prime factors while a^(r/f) = 1.
+    #
+    # For n = p*q, the totient (p-1)(q-1) = n + 1 - (p+q) is a multiple of the order, so
+    # a^(n+1) = a^s for s = p+q, which is small compared to n if p and q are of similar
+    # size. The least such s is found by searching ever larger intervals [0, m^2) with the
+    # baby-step giant-step method, in time proportional to the square root of s (i.e., to
+    # the fourth root of n, for balanced p and q), rather than to the order itself.
+
+    m = 1 << (n.bit_length() // 4 + 1)
+    while True:
+        multiple = _order_multiple(a, n, m)
+        if multiple is not None:
+            break
+        m *= 2
+
+    r = multiple
+    for f in set(factor(multiple)):
+        while r % f == 0 and pow(a, r // f, n) == 1:
+            r //= f
+
+    return r
+
+
+def _order_multiple(a: int, n: int, m: int) -> int | None:
+    # Returns a positive multiple n + 1 - s of the order of a modulo n, for the least s < m^2
+    # such that a^s = a^(n+1) (mod n), or the order itself if it is less than m, or None if
+    # there is no such s.
+
+    # Baby steps: a table of a^j for j < m, found by successive multiplications by a.
+    baby_steps: dict[int, int] = {}
+    x = 1
+    for j in range(m):
+        if x == 1 and j > 0:
+            return j
+        baby_steps.setdefault(x, j)
+        x = (x * a) % n
+
+    # Giant steps: a^(n+1) * a^(-m*i) for i < m, until one of them is a baby step a^j, so
+    # that s = m*i + j.
+    giant_step = pow(x, -1, n)
+    y = pow(a, n + 1, n)
+    for i in range(m):
+        j = baby_steps.get(y)
+        if j is not None and m * i + j <= n:
+            return n + 1 - (m * i + j)
+        y = (y * giant_step) % n
+
+    return None
+
+
 def _validate_param(n: int) -> None:
     assert isinstance(n, int) and n >= 3 and n % 2 != 0
 
 
-def generate_prime(bit_len: int) -> int:
+# mypy: no_implicit_optional=False
+def generate_prime(bit_len: int, test: str=None) -> int:
     """
     Returns a prime number of bit_len bits in length, testing randomly selected values for
     primality. If a prime is not found after a sensible number of tries, an exception is raised
     (this should be rare), in which case the function can be called again to generate a prime.
+    The optional parameter test names the primality test to use (see is_prime).
     """
     tries = 100 * bit_len
     for _ in range(tries):
         n = prng.randrange(2 ** (bit_len - 1), 2**bit_len)
-        if is_prime(n):
+        if is_prime(n, test):
             return n
 
     raise Exception("Failed to generate a prime")
+
+
+# Available tests for is_prime, by name.
+_PRIMALITY_TESTS = {
+    "bpsw": _is_composite_bpsw,
+    "miller-rabin": _is_composite,
+}
+
+# Build the tables for trial division in is_prime.
+set_trial_division_bound(_TRIAL_DIVISION_BOUND)
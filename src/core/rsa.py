@@ -49,6 +49,7 @@ class RSAKey:
         Build an RSA key.
         """
         self._p, self._q, self._n, self._d_sig, self._d_dec = generate_rsa_key(size)
+        self._ctx = util.ModContext(self._n)
 
     @property
     def p(self) -> int:
@@ -90,6 +91,13 @@ class RSAKey:
         """
         return self._d_dec
     
+    @property
+    def ctx(self) -> util.ModContext:
+        """
+        The context for arithmetic modulo the public modulus n of this RSA key.
+        """
+        return self._ctx
+
     def public_key(self) -> int:
         """
         Returns the public modulus of this RSA key. This value may be shared
@@ -109,6 +117,13 @@ class RSAKey:
         """
         return sign(self._d_sig, self._p, self._q, message)
 
+    def verify(self, message: object, signature: object, legacy: bool=False) -> bool:
+        """
+        Returns True if the supplied signature of the supplied message was made
+        by this RSA key, or False otherwise (see the module function verify).
+        """
+        return verify(self._n, message, signature, legacy, self._ctx)
+
     def decrypt_key(self, encrypted_key: object, hash_obj=None) -> bytes:
         """
         Recovers a session key from the encrypted key supplied to this
@@ -120,6 +135,33 @@ class RSAKey:
         """
         return decrypt_key(self._d_dec, encrypted_key, self._p, self._q, hash_obj)
 
+    def sign_and_decrypt(self, message: object, encrypted_key: object, hash_obj=None,
+                         legacy: bool=False) -> tuple[bytes, bytes]:
+        """
+        Returns a tuple of the form (signature, key), where signature is the
+        signature of the supplied message by this RSA key (see the method
+        sign), and key is the session key recovered from the supplied
+        encrypted key (see the method decrypt_key). Both results are derived
+        from a single private-key exponentiation, which makes this method
+        roughly twice as fast as calling sign and decrypt_key separately.
+        If legacy is True, the message is signed as in the module function
+        sign with legacy=True.
+        """
+        return sign_and_decrypt(self._d_sig, self._d_dec, self._p, self._q,
+                                message, encrypted_key, hash_obj, legacy)
+
+    def sign_and_decrypt_many(self, messages: list, encrypted_keys: list, hash_obj=None,
+                              legacy: bool=False) -> tuple[list[bytes], list[bytes]]:
+        """
+        Returns a tuple of the form (signatures, keys), where signatures is a
+        list of the signatures of the supplied messages by this RSA key, and
+        keys is a list of the session keys recovered from the supplied
+        encrypted keys. Pending signature and decryption requests are paired
+        off and processed as in the method sign_and_decrypt.
+        """
+        return sign_and_decrypt_many(self._d_sig, self._d_dec, self._p, self._q,
+                                     messages, encrypted_keys, hash_obj, legacy)
+
     def __eq__(self, other):
         return self._p  == other._p  and\
                self._q  == other._q  and\
@@ -308,11 +350,13 @@ def decrypt_key(d: int, c: object, p: int, q: int, hash_obj=None) -> bytes:
     return K
 
 
-def sign(d: int, p: int, q: int, m: object) -> bytes:
+def sign(d: int, p: int, q: int, m: object, legacy: bool=False) -> bytes:
     """
     Given a private signing key d, and the factors p and q of a public RSA modulus n,
     signs a message m and returns its signature. This function is the inverse of the function
-    verify.
+    verify. If the optional parameter legacy is True, m is mapped to an integer using the
+    message encoding of earlier releases of this module, so that the signature can be checked
+    by verifiers that have not been upgraded.
     """
 
     assert isinstance(d, int)
@@ -320,7 +364,7 @@ def sign(d: int, p: int, q: int, m: object) -> bytes:
     assert isinstance(q, int)
 
     # Map k-bit hash of m to an integer p*q (aka n) bits in length.
-    s = _msg_to_rsa_number(p * q, m)
+    s = _msg_to_rsa_number(p * q, m, legacy)
 
     # Sign the value using CRT for a 3- to 4-fold performance improvement (exponentiation to
     # such large exponents is otherwise costly).
@@ -329,46 +373,196 @@ def sign(d: int, p: int, q: int, m: object) -> bytes:
     return util.to_bytes(o)
 
 
-def verify(n: int, m: object, o: object) -> bool:
+# mypy: no_implicit_optional=False
+def verify(n: int, m: object, o: object, legacy: bool=False,
+           ctx: util.ModContext=None) -> bool:
     """
     Given an RSA modulus n, a message m and a signature o, returns True if the signature
     is valid for the message m, or False otherwise. This function is the inverse of the
-    function sign.
+    function sign. Set the optional parameter legacy to True to verify signatures produced
+    by earlier releases of this module (see the function sign). If present, the optional
+    parameter ctx must be a context for arithmetic modulo n (see RSAKey.ctx).
     """
 
     assert isinstance(n, int)
 
+    if ctx is None:
+        ctx = util.ModContext(n)
+    assert ctx.n == n
+
     # Map k-bit hash of m to an integer n bits in length.
-    s = _msg_to_rsa_number(n, m)
+    s = _msg_to_rsa_number(n, m, legacy)
 
     # Sign it (can't use CRT here since the verifier doesn't know the factorization of n; anyway,
     # the exponent here is the number 3).
-    oi = util.fast_mod_exp(util.to_int(o), VERIFICATION_EXPONENT, n)
+    oi = ctx.exp(util.to_int(o), VERIFICATION_EXPONENT)
 
     # Compare.
     return oi == s
 
 
-def _msg_to_rsa_number(n: int, m: object) -> int:
+def verify_many(n: int, ms: list, sigs: list, legacy: bool=False,
+                ctx: util.ModContext=None) -> list[bool]:
+    """
+    Given an RSA modulus n, a list of messages ms and a list of signatures sigs, returns a list
+    of booleans, the ith of which is True if the ith signature is valid for the ith message, or
+    False otherwise. The result is identical to calling the function verify on each pair, but
+    the context for arithmetic modulo n is built only once. The optional parameters legacy and
+    ctx have the same meaning as in the function verify.
+    """
+
+    assert isinstance(n, int)
+    assert isinstance(ms, list)
+    assert isinstance(sigs, list)
+    assert len(ms) == len(sigs)
+
+    if ctx is None:
+        ctx = util.ModContext(n)
+    assert ctx.n == n
+
+    # Cube each signature directly. Since the verification exponent is 3, this costs just two
+    # multiplications per signature, which no batch test (e.g., the random subset test of
+    # dh.validate_pub_keys) can undercut: any sound screen of a batch of k signatures needs
+    # many rounds of about k multiplications each.
+    return [ctx.exp(util.to_int(o), VERIFICATION_EXPONENT) == _msg_to_rsa_number(n, m, legacy)
+            for m, o in zip(ms, sigs)]
+
+
+def sign_and_decrypt(d_sig: int, d_dec: int, p: int, q: int, m: object, c: object,
+                     hash_obj=None, legacy: bool=False) -> tuple[bytes, bytes]:
+    """
+    Given private signing and decryption keys d_sig and d_dec, the prime factors p and q of a
+    public RSA modulus n, a message m, a ciphertext c and a hash function provided by hash_obj
+    (optional), returns a tuple of the form (o, K), where o is the signature of m (identical to
+    that returned by the function sign), and K is the symmetric key recovered from c (identical
+    to that returned by the function decrypt_key). Using Fiat's batch RSA, both results are
+    derived from a single full-size exponentiation, rather than the two required by calling
+    sign and decrypt_key separately. The optional parameter legacy has the same meaning as in
+    the function sign. K must be kept secret by callers of this function.
+    """
+
+    assert isinstance(d_sig, int)
+    assert isinstance(d_dec, int)
+    assert isinstance(p, int)
+    assert isinstance(q, int)
+
+    # Map k-bit hash of m to an integer p*q (aka n) bits in length.
+    s = _msg_to_rsa_number(p * q, m, legacy)
+
+    ci = util.to_int(c)
+    assert 0 <= ci <= p * q
+
+    o, r = _batch_roots(d_sig, d_dec, p, q, s, ci)
+
+    if hash_obj is None:
+        hash_obj = hashlib.sha256()
+    K = util.digest(r, hash_obj)
+
+    # K must be kept secret.
+    return util.to_bytes(o), K
+
+
+def sign_and_decrypt_many(d_sig: int, d_dec: int, p: int, q: int, ms: list, cs: list,
+                          hash_obj=None, legacy: bool=False) \
+    -> tuple[list[bytes], list[bytes]]:
+    """
+    Given private signing and decryption keys d_sig and d_dec, the prime factors p and q of a
+    public RSA modulus n, a list of messages ms, a list of ciphertexts cs and a hash function
+    provided by hash_obj (optional), returns a tuple of the form (os, Ks), where os is the list
+    of signatures of the messages in ms, and Ks is the list of symmetric keys recovered from the
+    ciphertexts in cs. Each message is paired with a ciphertext, and each such pair is processed
+    as in the function sign_and_decrypt; any messages or ciphertexts left over are processed
+    individually. If present, hash_obj is copied before hashing each key. The optional parameter
+    legacy has the same meaning as in the function sign. The keys in Ks must be kept secret by
+    callers of this function.
+    """
+
+    assert isinstance(ms, list)
+    assert isinstance(cs, list)
+
+    if hash_obj is None:
+        hash_obj = hashlib.sha256()
+
+    sigs, keys = [], []
+    for m, c in zip(ms, cs):
+        o, K = sign_and_decrypt(d_sig, d_dec, p, q, m, c, hash_obj.copy(), legacy)
+        sigs.append(o)
+        keys.append(K)
+
+    # The two queues need not be the same length; drain whatever is left of the longer one.
+    for m in ms[len(sigs):]:
+        sigs.append(sign(d_sig, p, q, m, legacy))
+    for c in cs[len(keys):]:
+        keys.append(decrypt_key(d_dec, c, p, q, hash_obj.copy()))
+
+    return sigs, keys
+
+
+def _batch_roots(d_sig: int, d_dec: int, p: int, q: int, s: int, c: int) -> tuple[int, int]:
+    # Returns the tuple (s^d_sig mod n, c^d_dec mod n), where n = p*q, using a single full-size
+    # exponentiation (see Fiat, "Batch RSA"). Write v and e for the public exponents 3 and 5,
+    # respectively.
+
+    n = p * q
+    v, e = VERIFICATION_EXPONENT, ENCRYPTION_EXPONENT
+
+    # The splitting step below requires inverses modulo n. If s or c shares a factor with n
+    # (vanishingly unlikely for honest inputs), compute the roots separately.
+    if euclid.gcd(s * c % n, n) != 1:
+        return util.fast_mod_exp_crt(s, d_sig, p, q), util.fast_mod_exp_crt(c, d_dec, p, q)
+
+    # Combine s and c into a single value whose (v*e)th root is (s^(1/v))*(c^(1/e)). Since
+    # v*e*d_sig*d_dec = 1 modulo lcm(p-1, q-1), the product d_sig*d_dec is a (v*e)th root
+    # exponent; and this is the only full-size exponentiation in the batch.
+    x = (util.fast_mod_exp(s, e, n) * util.fast_mod_exp(c, v, n)) % n
+    y = util.fast_mod_exp_crt(x, d_sig * d_dec, p, q)
+
+    # Split y into its two roots. Choose w such that w = 0 (mod v) and w = 1 (mod e); then
+    # y^w = s^(w/v) * c^((w-1)/e) * c^(1/e), where all but the last factor are known. The
+    # exponents involved here are tiny, so this costs next to nothing.
+    w = v * euclid.inverse(v, e)
+    z = (util.fast_mod_exp(s, w // v, n) * util.fast_mod_exp(c, (w - 1) // e, n)) % n
+    r = (util.fast_mod_exp(y, w, n) * euclid.inverse(z, n)) % n
+    o = (y * euclid.inverse(r, n)) % n
+
+    return o, r
+
+
+def _msg_to_rsa_number(n: int, m: object, legacy: bool=False) -> int:
     # Maps a message m to an integer suitable for signing.
 
     assert isinstance(n, int)
     assert n.bit_length() == _MODULUS_MIN_BIT_LEN or \
         n.bit_length() == _MODULUS_MID_BIT_LEN or n.bit_length() == _MODULUS_MAX_BIT_LEN
 
-
-    # Seed the PRNG with a hash of the message m (or h(m)).
-    random.seed(util.digest(m, hashlib.sha256()))
+    if legacy:
+        return _msg_to_rsa_number_legacy(n, m)
 
     # Here we want a byte string that is always the same given the same m (and hence the same
     # h(m)). We are not interested in random data per se, but rather a deterministic mapping
     # from the 256-bit result of h(m) to an n-bit number; that is, a number in the range of
-    # the modulus n (see RSA-FDH, or full-domain hash, for more information).
-    xb = random.randbytes((n.bit_length() + 7) // 8)
+    # the modulus n (see RSA-FDH, or full-domain hash, for more information). The extendable-
+    # output function SHAKE-256 does exactly this, and because it keeps no state between
+    # calls it is safe to use from any number of threads at once. Draw 64 more bits than
+    # needed so that reducing modulo n introduces no measurable bias.
+    xb = hashlib.shake_256(util.digest(m, hashlib.sha256())).digest(
+        (n.bit_length() + 64 + 7) // 8)
+
+    # Convert byte string to an integer "representative" in the full range of the modulus n.
+    xi = util.to_int(xb) % n
+
+    return xi
+
+
+def _msg_to_rsa_number_legacy(n: int, m: object) -> int:
+    # Maps a message m to an integer suitable for signing, exactly as earlier releases of this
+    # module did. Use a private instance of the PRNG rather than the global one, so as not to
+    # disturb (or be disturbed by) other users of the random module.
+
+    # Seed the PRNG with a hash of the message m (or h(m)).
+    xb = random.Random(util.digest(m, hashlib.sha256())).randbytes((n.bit_length() + 7) // 8)
 
-    # Convert byte string to an integer "representative", whose bit length is in the full range
-    # of the modulus n.
-    # TODO: revisit endian-ness.
+    # Convert byte string to an integer "representative".
     xi = util.to_int(xb, byteorder="little") % n.bit_length()
 
     return xi
@@ -3,15 +3,60 @@
 from . import euclid
 
 
+# Exponent bit lengths above which the sliding-window exponentiation engine widens its window
+# to 2, 3, 4, 5 and 6 bits, respectively.
+_WINDOW_THRESHOLDS = (24, 80, 240, 672, 1792)
+
+
 def fast_mod_exp(a: int, e: int, n: int) -> int:
     """
     Returns the equivalent of b^e % n, but with much better performance than
-    that form for very large numbers.
+    that form for very large numbers. The work is delegated to the currently
+    selected exponentiation engine (see set_mod_exp_engine).
     """
     assert isinstance(a, int) and a >= 0
     assert isinstance(e, int) and e >= 0
     assert isinstance(n, int) and n >= 1
 
+    return _MOD_EXP_ENGINES[_mod_exp_engine](a, e, n)
+
+
+def set_mod_exp_engine(name: str) -> None:
+    """
+    Selects the engine used by fast_mod_exp (and hence by every module in this
+    package that exponentiates modulo n). The available engines, listed by the
+    function mod_exp_engines, are "native" (the language primitive pow, which is
+    the default and by far the fastest), "window" (sliding-window exponentiation)
+    and "square-and-multiply" (the textbook algorithm). All engines return the
+    same results; the latter two are provided so that the algorithms can be
+    inspected and compared with one another.
+    """
+    global _mod_exp_engine
+    if name not in _MOD_EXP_ENGINES:
+        raise ValueError(f"Unknown exponentiation engine {name}")
+    _mod_exp_engine = name
+
+
+def mod_exp_engine() -> str:
+    """Returns the name of the engine currently used by fast_mod_exp."""
+    return _mod_exp_engine
+
+
+def mod_exp_engines() -> list[str]:
+    """Returns the names of the engines that can be used by fast_mod_exp."""
+    return list(_MOD_EXP_ENGINES)
+
+
+def _mod_exp_native(a: int, e: int, n: int) -> int:
+    # The interpreter's own implementation of modular exponentiation, which
+    # runs in native code.
+
+    return pow(a, e, n)
+
+
+def _mod_exp_square_and_multiply(a: int, e: int, n: int) -> int:
+    # Right-to-left binary exponentiation, one bit of e at a time.
+
     e_bit_len = e.bit_length()
 
     # Don't screw around with edge cases; let the language primitives do the
@@ -29,6 +74,343 @@ def fast_mod_exp(a: int, e: int, n: int) -> int:
     return result
 
 
+def _mod_exp_window(a: int, e: int, n: int) -> int:
+    # Left-to-right sliding-window exponentiation (see _window_exp).
+
+    if e.bit_length() < 8:
+        return a**e % n
+
+    return _window_exp(a % n, e, 1, lambda x, y: (x * y) % n)
+
+
+def _window_exp(a: int, e: int, one: int, mul) -> int:
+    # Left-to-right sliding-window exponentiation, where the function mul multiplies
+    # two elements (e.g., modulo n, or in the Montgomery domain of n), and one is the
+    # multiplicative identity. The odd powers a^1, a^3, ..., a^(2^w - 1) are computed
+    # up front; the exponent is then scanned from its most significant bit, squaring
+    # once per bit and multiplying once per window of up to w bits (rather than once
+    # per set bit, as in square-and-multiply).
+
+    e_bit_len = e.bit_length()
+
+    # Pick a window size that balances the cost of the precomputed table against
+    # the number of multiplications saved.
+    w = 1 + sum(1 for threshold in _WINDOW_THRESHOLDS if e_bit_len > threshold)
+
+    # Precompute the odd powers of a.
+    a2 = mul(a, a)
+    odd_powers = [a]
+    for _ in range(1, 2 ** (w - 1)):
+        odd_powers.append(mul(odd_powers[-1], a2))
+
+    result = one
+    i = e_bit_len - 1
+    while i >= 0:
+        if not (e >> i) & 1:
+            result = mul(result, result)
+            i -= 1
+            continue
+
+        # Find the longest window e[i..j] of at most w bits that ends in a 1.
+        j = max(i - w + 1, 0)
+        while not (e >> j) & 1:
+            j += 1
+        window = (e >> j) & ((1 << (i - j + 1)) - 1)
+
+        for _ in range(i - j + 1):
+            result = mul(result, result)
+        result = mul(result, odd_powers[window >> 1])
+        i = j - 1
+
+    return result
+
+
+# Available engines for fast_mod_exp, by name.
+_MOD_EXP_ENGINES = {
+    "native": _mod_exp_native,
+    "window": _mod_exp_window,
+    "square-and-multiply": _mod_exp_square_and_multiply,
+}
+
+# The engine currently used by fast_mod_exp.
+_mod_exp_engine = "native"
+
+
+class ModContext:
+    """
+    A class representing the context for repeated arithmetic modulo a fixed
+    positive integer n (e.g., the modulus of a Diffie-Hellman group, or of an
+    RSA key). The constants required for Barrett reduction and, if n is odd,
+    for Montgomery multiplication, are computed at most once per context and
+    reused by every subsequent operation.
+
+    When the "native" exponentiation engine is selected (see the function
+    set_mod_exp_engine), the methods of this class use the language primitives
+    pow and %, which are faster than any reduction written in Python. Otherwise
+    they use Barrett reduction and Montgomery multiplication, so that these
+    algorithms can be inspected and compared with the native ones; the method
+    exp then runs the selected engine's algorithm (sliding-window or square-
+    and-multiply) in the Montgomery domain.
+    """
+    def __init__(self, n: int):
+        assert isinstance(n, int) and n >= 1
+        self._n = n
+        self._k = n.bit_length()
+        self._mu: int | None = None
+        self._n_prime: int | None = None
+        self._r2: int | None = None
+
+    @property
+    def n(self) -> int:
+        """The modulus of this context."""
+        return self._n
+
+    def reduce(self, x: int) -> int:
+        """
+        Returns x % n, where x is a non-negative integer.
+        """
+        if _mod_exp_engine == "native" or x >> (2 * self._k):
+            return x % self._n
+        return self._barrett_reduce(x)
+
+    def mul(self, a: int, b: int) -> int:
+        """
+        Returns a * b % n, where a and b are non-negative integers less than n.
+        """
+        return self.reduce(a * b)
+
+    def square(self, a: int) -> int:
+        """
+        Returns a^2 % n, where a is a non-negative integer less than n.
+        """
+        return self.reduce(a * a)
+
+    def exp(self, a: int, e: int) -> int:
+        """
+        Returns the equivalent of a^e % n (see the function fast_mod_exp).
+        """
+        assert isinstance(a, int) and a >= 0
+        assert isinstance(e, int) and e >= 0
+
+        if _mod_exp_engine == "native" or not self._n & 1 or self._n == 1:
+            return _MOD_EXP_ENGINES[_mod_exp_engine](a, e, self._n)
+
+        # Move a into the Montgomery domain (i.e., aR mod n), run the selected engine's
+        # algorithm there, and move the result back out.
+        self._init_montgomery()
+        am = self._montgomery_mul(a % self._n, self._r2)
+        one = self._montgomery_mul(1, self._r2)
+        if _mod_exp_engine == "window":
+            result = _window_exp(am, e, one, self._montgomery_mul)
+        else:
+            result = one
+            for x in range(e.bit_length() - 1, -1, -1):
+                result = self._montgomery_mul(result, result)
+                if (e >> x) & 1:
+                    result = self._montgomery_mul(result, am)
+
+        return self._montgomery_mul(result, 1)
+
+    def _barrett_reduce(self, x: int) -> int:
+        # Returns x % n for 0 <= x < 4^k, where k is the bit length of n, using
+        # only multiplications and shifts. With mu = floor(4^k / n), the quotient
+        # estimate q undershoots x // n by at most 2.
+        if self._mu is None:
+            self._mu = (1 << (2 * self._k)) // self._n
+
+        q = ((x >> (self._k - 1)) * self._mu) >> (self._k + 1)
+        r = x - q * self._n
+        while r >= self._n:
+            r -= self._n
+
+        return r
+
+    def _init_montgomery(self) -> None:
+        # With R = 2^k (which is coprime to the odd modulus n), computes
+        # n' = -n^-1 mod R and R^2 mod n.
+        if self._n_prime is None:
+            r = 1 << self._k
+            self._n_prime = -euclid.inverse(self._n, r) % r
+            self._r2 = (r * r) % self._n
+
+    def _montgomery_mul(self, a: int, b: int) -> int:
+        # Returns a * b * R^-1 mod n (Montgomery's REDC), where a and b are
+        # non-negative integers less than n. Division by R is a shift.
+        t = a * b
+        m = ((t & ((1 << self._k) - 1)) * self._n_prime) & ((1 << self._k) - 1)
+        u = (t + m * self._n) >> self._k
+
+        return u - self._n if u >= self._n else u
+
+
+class FixedBaseTable:
+    """
+    A class representing a table of precomputed powers of a fixed base g modulo n,
+    for exponents of up to e_bit_len bits. Writing an exponent e in base 2^w, as
+    e = d_0 + d_1*2^w + d_2*2^(2w) + ..., row i of the table holds the values
+    g^(d*2^(iw)) for every w-bit digit d. The power g^e is then the product of one
+    entry from each row, which costs about e_bit_len/w multiplications and no
+    squarings at all (compared with e_bit_len squarings for the methods of
+    fast_mod_exp).
+    """
+    def __init__(self, g: int, n: int, e_bit_len: int, w: int):
+        assert isinstance(g, int) and g >= 0
+        assert isinstance(n, int) and n >= 1
+        assert isinstance(e_bit_len, int) and e_bit_len >= 1
+        assert isinstance(w, int) and w >= 1
+
+        self._g = g
+        self._ctx = ModContext(n)
+        self._e_bit_len = e_bit_len
+        self._w = w
+
+        self._rows: list[list[int]] = []
+        base = g % n
+        for _ in range((e_bit_len + w - 1) // w):
+            row = [1 % n, base]
+            for _ in range(2, 2**w):
+                row.append(self._ctx.mul(row[-1], base))
+            self._rows.append(row)
+            # The base of the next row is this row's base raised to the power 2^w.
+            base = self._ctx.mul(row[-1], base)
+
+    @property
+    def g(self) -> int:
+        """The fixed base of this table."""
+        return self._g
+
+    @property
+    def n(self) -> int:
+        """The modulus of this table."""
+        return self._ctx.n
+
+    def exp(self, e: int) -> int:
+        """
+        Returns the equivalent of g^e % n, where e is a non-negative integer of at
+        most e_bit_len bits.
+        """
+        assert isinstance(e, int) and 0 <= e and e.bit_length() <= self._e_bit_len
+
+        mask = (1 << self._w) - 1
+        result = 1 % self._ctx.n
+        for row in self._rows:
+            d = e & mask
+            if d:
+                result = self._ctx.mul(result, row[d])
+            e >>= self._w
+
+        return result
+
+    @staticmethod
+    def size(n: int, e_bit_len: int, w: int) -> int:
+        """
+        Returns the approximate size, in bytes, of a table of powers modulo n for
+        exponents of up to e_bit_len bits, using a window of w bits.
+        """
+        return ((e_bit_len + w - 1) // w) * 2**w * ((n.bit_length() + 7) // 8)
+
+
+def multi_exp(bases: list, exponents: list, n: int) -> int:
+    """
+    Returns the equivalent of b_1^e_1 * b_2^e_2 * ... * b_k^e_k % n, where the b_i are
+    the integers in the list bases and the e_i the non-negative integers in the list
+    exponents. This is faster than computing each of the powers separately, because the
+    powers share a single chain of squarings.
+
+    Straus' (interleaving) method is used for a small number of bases, and Pippenger's
+    (bucket) method for a large number of bases, whichever is estimated to be cheaper.
+    """
+
+    assert isinstance(n, int) and n > 0
+    assert len(bases) == len(exponents)
+    assert all(isinstance(e, int) and e >= 0 for e in exponents)
+
+    # Bases with zero exponents contribute nothing to the product.
+    pairs = [(b % n, e) for b, e in zip(bases, exponents) if e]
+    if not pairs:
+        return 1 % n
+
+    k = len(pairs)
+    e_bit_len = max(e.bit_length() for _, e in pairs)
+
+    # Estimate the number of multiplications each method needs for each window size,
+    # and run the cheapest.
+    w_straus = min(range(1, 9), key=lambda w: _straus_cost(k, e_bit_len, w))
+    w_pippenger = min(range(1, 17), key=lambda w: _pippenger_cost(k, e_bit_len, w))
+    if _straus_cost(k, e_bit_len, w_straus) <= _pippenger_cost(k, e_bit_len, w_pippenger):
+        return _multi_exp_straus(pairs, e_bit_len, w_straus, n)
+    return _multi_exp_pippenger(pairs, e_bit_len, w_pippenger, n)
+
+
+def _straus_cost(k: int, e_bit_len: int, w: int) -> int:
+    # Table of 2^w - 2 powers per base, one multiplication per base per window, and
+    # one squaring per bit.
+    return k * (2**w - 2) + k * -(-e_bit_len // w) + e_bit_len
+
+
+def _pippenger_cost(k: int, e_bit_len: int, w: int) -> int:
+    # Per window, one multiplication per base to fill the buckets and two per bucket
+    # to combine them; and one squaring per bit.
+    return -(-e_bit_len // w) * (k + 2**(w + 1)) + e_bit_len
+
+
+def _multi_exp_straus(pairs: list, e_bit_len: int, w: int, n: int) -> int:
+    # Interleaved fixed-window exponentiation. The powers b^0, b^1, ..., b^(2^w - 1) of
+    # each base are computed up front; the exponents are then scanned together from their
+    # most significant window, squaring w times per window and multiplying in the power
+    # of each base that its exponent's digit in that window selects.
+
+    tables = []
+    for b, _ in pairs:
+        table = [1, b]
+        for _ in range(2, 2**w):
+            table.append((table[-1] * b) % n)
+        tables.append(table)
+
+    mask = (1 << w) - 1
+    result = 1
+    for x in range(-(-e_bit_len // w) - 1, -1, -1):
+        for _ in range(w):
+            result = (result * result) % n
+        for table, (_, e) in zip(tables, pairs):
+            d = (e >> (x * w)) & mask
+            if d:
+                result = (result * table[d]) % n
+
+    return result % n
+
+
+def _multi_exp_pippenger(pairs: list, e_bit_len: int, w: int, n: int) -> int:
+    # Bucket method. For each window of the exponents, from the most significant, the
+    # bases are multiplied into one of 2^w - 1 buckets according to their exponent's
+    # digit in that window; the product of the buckets, each raised to its digit, is
+    # then formed with running products (B_1 * ... * B_m, B_2 * ... * B_m, ...), and
+    # multiplied into the result after w squarings.
+
+    mask = (1 << w) - 1
+    result = 1
+    for x in range(-(-e_bit_len // w) - 1, -1, -1):
+        for _ in range(w):
+            result = (result * result) % n
+
+        buckets = [1] * (mask + 1)
+        for b, e in pairs:
+            d = (e >> (x * w)) & mask
+            if d:
+                buckets[d] = (buckets[d] * b) % n
+
+        running = 1
+        product = 1
+        for d in range(mask, 0, -1):
+            if buckets[d] != 1:
+                running = (running * buckets[d]) % n
+            if running != 1:
+                product = (product * running) % n
+        result = (result * product) % n
+
+    return result % n
+
+
 def fast_mod_exp_crt(a: int, e: int, p: int, q: int) -> int:
     """
     Returns the equivalent of b^e % pq, but with much better performance than
@@ -83,6 +465,101 @@ def to_crt(x: int, p: int, q: int) -> tuple[int, int]:
     return x % p, x % q
 
 
+class CRTContext:
+    """
+    A class representing the context for conversions between integers and their
+    CRT representations with respect to a fixed list of pairwise coprime moduli
+    m_1, ..., m_k (the functions to_crt and from_crt handle the case k = 2). The
+    moduli are arranged in a product tree, whose internal nodes are the products
+    of their children, and for each internal node, the inverse of its left child
+    modulo its right one (Garner's coefficient) is computed once, when the
+    context is created.
+
+    Recombination then requires no inversions: the values modulo sibling nodes
+    are combined by Garner's formula, from the leaves to the root. Conversion to
+    the CRT representation reduces x modulo the nodes from the root to the
+    leaves, so that the large value x is reduced only once, and each smaller
+    remainder by the moduli below it.
+    """
+    def __init__(self, moduli: list[int]):
+        assert isinstance(moduli, list) and len(moduli) >= 1
+        assert all(isinstance(m, int) and m >= 1 for m in moduli)
+
+        self._tree = [list(moduli)]
+        self._coefficients: list[list[int]] = []
+        while len(self._tree[-1]) > 1:
+            level = self._tree[-1]
+            try:
+                coefficients = [euclid.inverse(level[i] % level[i + 1], level[i + 1])
+                                for i in range(0, len(level) - 1, 2)]
+            except ValueError:
+                raise ValueError("Moduli are not pairwise coprime") from None
+            next_level = [level[i] * level[i + 1] for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                next_level.append(level[-1])
+            self._coefficients.append(coefficients)
+            self._tree.append(next_level)
+
+    @property
+    def moduli(self) -> list[int]:
+        """The moduli of this context."""
+        return list(self._tree[0])
+
+    @property
+    def modulus(self) -> int:
+        """The product of the moduli of this context."""
+        return self._tree[-1][0]
+
+    def to_crt(self, x: int) -> list[int]:
+        """
+        Returns the CRT representation of x; i.e., the list of the residues of x
+        modulo each of the moduli, in order.
+        """
+        assert isinstance(x, int) and x >= 0
+
+        residues = [x % self.modulus]
+        for level in reversed(self._tree[:-1]):
+            residues = [residues[i // 2] % m for i, m in enumerate(level)]
+
+        return residues
+
+    def from_crt(self, residues: list[int]) -> int:
+        """
+        Returns the unique value x in the range [0, M), where M is the product of
+        the moduli, given its CRT representation; i.e., the list of the residues
+        of x modulo each of the moduli, in order.
+        """
+        assert isinstance(residues, list) and len(residues) == len(self._tree[0])
+        assert all(isinstance(r, int) and r >= 0 for r in residues)
+
+        values = [r % m for r, m in zip(residues, self._tree[0])]
+        for level, coefficients in zip(self._tree, self._coefficients):
+            # Combine the values modulo each pair of siblings m_l and m_r by Garner's
+            # formula, x = x_l + m_l * ((x_r - x_l) * m_l^-1 mod m_r).
+            next_values = [
+                values[i] + level[i] * (((values[i + 1] - values[i]) * c) % level[i + 1])
+                for i, c in zip(range(0, len(level) - 1, 2), coefficients)]
+            if len(level) % 2:
+                next_values.append(values[-1])
+            values = next_values
+
+        return values[0]
+
+    def to_crt_batch(self, xs: list[int]) -> list[list[int]]:
+        """
+        Returns the CRT representations of each value in the list xs (see the
+        method to_crt).
+        """
+        return [self.to_crt(x) for x in xs]
+
+    def from_crt_batch(self, residues: list[list[int]]) -> list[int]:
+        """
+        Returns the values whose CRT representations are the lists of residues in
+        the list residues (see the method from_crt).
+        """
+        return [self.from_crt(r) for r in residues]
+
+
 def digest(k: object, hash_obj) -> bytes:
     """
     Returns a hashed byte array of input k using the hash algorithm provided by
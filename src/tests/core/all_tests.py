@@ -1,6 +1,8 @@
 """ Tests all functions in all modules of core. """
 
 from . import dh_test
+from . import dlog_test
+from . import ecdlog_test
 from . import euclid_test
 from . import ec_test
 from . import primes_test
@@ -10,6 +12,8 @@ from . import util_test
 
 def main():
     dh_test.main()
+    dlog_test.main()
+    ecdlog_test.main()
     ec_test.main()
     euclid_test.main()
     primes_test.main()
@@ -1,6 +1,7 @@
 import hashlib
 from core import primes
 from core import dh
+from core import util as core_util
 
 from . import sym
 from . import util
@@ -10,9 +11,15 @@ from . import util
 def main():
     test_dh_setup()
     test_generate_p()
+    test_generate_p_workers()
     test_full_protocol()
     test_full_protocol_dh_class()
     test_misc_dh_class()
+    test_g_tables()
+    test_validated_parameters()
+    test_named_groups()
+    test_validate_pub_keys()
+    test_certified_parameters()
     test_hash_injection()
 
 
@@ -54,8 +61,19 @@ def test_generate_p():
 
 def generate_p(q):
     p_bit_len = util.random_range(dh._P_MIN_BIT_LEN, dh._P_MAX_BIT_LEN+1, 1024)
-    _, p = dh._generate_p(q, p_bit_len)
+    n, p = dh._generate_p(q, p_bit_len)
     assert p.bit_length() == p_bit_len
+    assert p == q * n + 1 and n % 2 == 0
+    assert primes.is_prime(p)
+
+
+@util.test_log
+def test_generate_p_workers():
+    q = primes.generate_prime(dh._Q_BIT_LEN)
+    n, p = dh._generate_p(q, dh._P_MIN_BIT_LEN, 2)
+    assert p.bit_length() == dh._P_MIN_BIT_LEN
+    assert p == q * n + 1 and n % 2 == 0
+    assert primes.is_prime(p)
 
 
 @util.test_log
@@ -160,6 +178,7 @@ def test_full_protocol_dh_class():
 
     key_b = dh.make_key(key_params_a)
     assert key_b.public_parameters() == key_params_a
+    assert key_params_a.ctx.n == key_params_a.p
 
     key_pub_b = key_b.public_key()
     ses_key_b = key_b.make_session_key(key_pub_a)
@@ -200,6 +219,195 @@ def test_misc_dh_class():
     assert "parameters2" != params_dict[parameters1]
 
 
+@util.test_log
+def test_g_tables():
+    params = dh.make_parameters()
+    table = params.g_table
+    assert table is not None and table.g == params.g and table.n == params.p
+    assert params.g_table is table, "g_table should be built only once"
+    for _ in range(10):
+        x = util.random_range(1, params.q)
+        assert table.exp(x) == pow(params.g, x, params.p)
+
+    key_a = dh.make_key(params)
+    key_b = dh.make_key(params)
+    assert key_a.make_session_key(key_b.public_key()) == \
+        key_b.make_session_key(key_a.public_key())
+
+    try:
+        # A budget too small for any table, and tables disabled altogether.
+        dh.set_g_tables(True, 0)
+        assert dh.make_parameters().g_table is None
+        dh.set_g_tables(False)
+        assert params.g_table is None
+        key_c = dh.make_key(params)
+        assert key_a.make_session_key(key_c.public_key()) == \
+            key_c.make_session_key(key_a.public_key())
+    finally:
+        dh.set_g_tables()
+
+
+@util.test_log
+def test_validated_parameters():
+    params = dh.make_parameters()
+    assert params.fingerprint == dh.fingerprint(params.q, params.p, params.g)
+    assert params.fingerprint in dh._validated
+
+    # Parameters that show up again are not validated again.
+    dh._validated.clear()
+    q, p, g = params.q, params.p, params.g
+    dh.validate_parameters(q, p, g)
+    assert dh.fingerprint(q, p, g) in dh._validated
+    dh.validate_parameters(q, p, g)
+    dh.generate_keypair(q, p, g)
+
+    # Invalid parameters are never remembered.
+    for _ in range(2):
+        try:
+            dh.validate_parameters(q, p, 1)
+            assert False, "Expected validate_parameters to raise an exception, but it didn't"
+        except Exception as e:
+            assert isinstance(e, ValueError)
+        assert dh.fingerprint(q, p, 1) not in dh._validated
+
+    # Parameters from other parties are tested with Miller-Rabin, whatever the default test.
+    tests = []
+    is_prime = primes.is_prime
+    def recording_is_prime(n, test=None):
+        tests.append(test)
+        return is_prime(n, test)
+    dh._validated.clear()
+    primes.is_prime = recording_is_prime
+    try:
+        dh.validate_parameters(q, p, g)
+    finally:
+        primes.is_prime = is_prime
+    assert tests and all(test == "miller-rabin" for test in tests)
+
+    # The cache is bounded, and the oldest fingerprints are forgotten first.
+    dh._validated.clear()
+    for i in range(dh._VALIDATED_CACHE_MAX):
+        dh._validated[dh.fingerprint(q, p, i)] = None
+    dh.validate_parameters(q, p, g)
+    assert len(dh._validated) == dh._VALIDATED_CACHE_MAX
+    assert dh.fingerprint(q, p, 0) not in dh._validated
+    assert dh.fingerprint(q, p, g) in dh._validated
+    dh._validated.clear()
+
+
+@util.test_log
+def test_named_groups():
+    for name in dh.group_names():
+        params = dh.make_parameters(name=name)
+        assert params.name == name
+        assert dh.make_parameters(name=name) is params, "Named parameters should be shared"
+        assert dh.group_name(params.q, params.p, params.g) == name
+
+        # Check named groups in full, since validate_parameters takes them on trust.
+        assert dh._check_parameters(params.q, params.p, params.g, params.ctx), \
+            f"Named group {name} is invalid"
+        dh.validate_parameters(params.q, params.p, params.g)
+
+        key_a = dh.make_key(params)
+        key_b = dh.make_key(dh.make_parameters(name=name))
+        assert key_a.make_session_key(key_b.public_key()) == \
+            key_b.make_session_key(key_a.public_key())
+
+    assert dh.make_parameters(name="modp2048q256").p.bit_length() == dh._P_MIN_BIT_LEN
+    assert dh.make_parameters(name="modp3072q256").p.bit_length() == dh._P_MAX_BIT_LEN
+    assert dh.make_parameters().name is None
+
+    try:
+        dh.make_parameters(name="bogus")
+        assert False, "Expected make_parameters to raise an exception, but it didn't"
+    except Exception as e:
+        assert isinstance(e, ValueError)
+
+
+@util.test_log
+def test_validate_pub_keys():
+    params = dh.make_parameters(name="modp2048q256")
+    q, p, g = params.q, params.p, params.g
+
+    ys = [dh.generate_keypair(q, p, g, params.ctx, params.g_table)[1]
+          for _ in range(2 * dh._BATCH_MIN_LEN)]
+    assert all(dh.validate_pub_keys(ys, q, p, params.ctx))
+    assert all(dh.validate_pub_keys(ys[:3], q, p))
+    assert dh.validate_pub_keys([], q, p) == []
+
+    # Plant keys that are out of range, and keys outside the subgroup (including keys
+    # whose only defect is a component of order 2, and a pair of such keys whose defects
+    # cancel out in the product of the two).
+    bad = {3: 1, 4: p, 5: 0, 17: p-1, 40: ys[40] * (p-1) % p, 41: ys[41] * (p-1) % p,
+           200: ys[200] * 2 % p, 201: ys[201] * (p-1) % p}
+    ys_bad = list(ys)
+    for i, y in bad.items():
+        ys_bad[i] = y
+
+    results = dh.validate_pub_keys(ys_bad, q, p, params.ctx)
+    assert [i for i, r in enumerate(results) if not r] == sorted(bad)
+
+    for y, r in zip(ys_bad, results):
+        try:
+            dh.validate_pub_key(y, q, p)
+            assert r, "validate_pub_keys rejected a key that validate_pub_key accepts"
+        except ValueError:
+            assert not r, "validate_pub_keys accepted a key that validate_pub_key rejects"
+
+
+@util.test_log
+def test_certified_parameters():
+    for p_bit_len in (dh._P_MIN_BIT_LEN, dh._P_MAX_BIT_LEN):
+        q, p, g, certificate = dh.generate_parameters(p_bit_len, certify=True)
+        ctx = core_util.ModContext(p)
+        assert p.bit_length() == p_bit_len
+        assert dh._check_parameters(q, p, g, ctx), "Certified parameters are invalid"
+        assert dh._check_parameters(q, p, g, ctx, certificate), "Certificate is invalid"
+
+        r, a = certificate
+        assert (p - 1) % (q * r) == 0 and (q * r)**2 > p
+
+        dh._validated.clear()
+        dh.validate_parameters(q, p, g, certificate=certificate)
+        assert dh.fingerprint(q, p, g) in dh._validated
+
+        # Bogus certificates must be rejected.
+        for bogus in ((r, 1), (r, p - 1), (r + 2, a), (1, a), (q, a), (r, a, 0), [r, a]):
+            assert not dh._check_parameters(q, p, g, ctx, bogus), \
+                f"Bogus certificate {bogus} accepted"
+
+        # Neither must a certificate for one prime prove a composite number prime.
+        c = p + 2 * q * r
+        while primes.is_prime(c):
+            c += 2 * q * r
+        assert not dh._check_certificate(q, c, certificate, core_util.ModContext(c))
+
+        dh._validated.clear()
+        try:
+            dh.validate_parameters(q, p, g, certificate=(r + 2, a))
+            assert False, "Expected validate_parameters to raise an exception, but it didn't"
+        except Exception as e:
+            assert isinstance(e, ValueError)
+
+        # Nor may a bogus certificate pass for parameters that have already been validated.
+        dh.validate_parameters(q, p, g, certificate=certificate)
+        assert dh.fingerprint(q, p, g) in dh._validated
+        dh.validate_parameters(q, p, g, certificate=certificate)
+        try:
+            dh.validate_parameters(q, p, g, certificate=(r + 2, a))
+            assert False, "Expected validate_parameters to raise an exception, but it didn't"
+        except Exception as e:
+            assert isinstance(e, ValueError)
+
+    # Or for named groups.
+    params = dh.make_parameters(name=dh.group_names()[0])
+    try:
+        dh.validate_parameters(params.q, params.p, params.g, certificate=(2, 2))
+        assert False, "Expected validate_parameters to raise an exception, but it didn't"
+    except Exception as e:
+        assert isinstance(e, ValueError)
+
+
 @util.test_log
 def test_hash_injection():
     q, p, g = dh.generate_parameters(dh._P_MIN_BIT_LEN)
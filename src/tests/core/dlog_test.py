@@ -0,0 +1,141 @@
+import math
+import random
+
+from core import dh
+from core import dlog
+from core import primes
+from core import util as core_util
+
+from . import util
+
+
+@util.test_log
+def main():
+    test_bsgs()
+    test_pollard_rho()
+    test_pohlig_hellman()
+    test_short_exponent()
+    test_small_subgroup()
+
+
+def toy_group(q_bit_len: int, p_bit_len: int) -> tuple[int, int, int]:
+    # Returns (p, g, q) for a prime p of p_bit_len bits, and g of prime order q of q_bit_len
+    # bits modulo p.
+    q = primes.generate_prime(q_bit_len)
+    while True:
+        k = random.getrandbits(p_bit_len - q_bit_len) | 1 << (p_bit_len - q_bit_len - 1)
+        p = q * (k - k % 2) + 1
+        if primes.is_prime(p):
+            break
+    while True:
+        g = pow(random.randrange(2, p - 1), (p - 1) // q, p)
+        if g != 1:
+            return p, g, q
+
+
+@util.test_log
+def test_bsgs():
+    p, g, q = toy_group(32, 64)
+    for _ in range(10):
+        x = random.randrange(q)
+        assert dlog.bsgs(pow(g, x, p), (p, g, q)) == x, "bsgs failed to find x"
+
+    # A bound below x, a table too small for the square root of the bound, and an h that is
+    # not a power of g.
+    x = random.randrange(2**20, 2**21)
+    assert dlog.bsgs(pow(g, x, p), (p, g, q), 2**20) is None
+    assert dlog.bsgs(pow(g, x, p), (p, g, q), 2**21, max_table_len=64) == x
+    assert dlog.bsgs(p - 1, (p, g, q)) is None
+
+
+@util.test_log
+def test_pollard_rho():
+    p, g, q = toy_group(32, 64)
+    for _ in range(5):
+        x = random.randrange(q)
+        assert dlog.pollard_rho(pow(g, x, p), (p, g, q)) == x, "pollard_rho failed to find x"
+
+    x = random.randrange(q)
+    assert dlog.pollard_rho(pow(g, x, p), (p, g, q), workers=2) == x, \
+        "pollard_rho failed to find x with two workers"
+
+    assert dlog.pollard_rho(1, (p, g, q)) == 0
+    assert dlog.pollard_rho(p - 1, (p, g, q)) is None
+
+
+@util.test_log
+def test_pohlig_hellman():
+    # A generator of the whole group modulo a prime p, where p - 1 has only small factors,
+    # except for one too large for bsgs.
+    while True:
+        factors = [2, 2, 3, 5, 5, 7] + [primes.generate_prime(16) for _ in range(4)]
+        factors += [primes.generate_prime(dlog._BSGS_MAX_ORDER.bit_length() + 3)]
+        p = math.prod(factors) + 1
+        if primes.is_prime(p):
+            break
+    factors.sort()
+    while True:
+        g = random.randrange(2, p - 1)
+        if all(pow(g, (p - 1) // f, p) != 1 for f in set(factors)):
+            break
+
+    for _ in range(5):
+        x = random.randrange(p - 1)
+        assert dlog.pohlig_hellman(pow(g, x, p), (p, g, p - 1), factors) == x, \
+            "pohlig_hellman failed to find x"
+
+    # The factorization is found if it is not supplied, and a prime order is solved directly.
+    x = random.randrange(p - 1)
+    assert dlog.pohlig_hellman(pow(g, x, p), (p, g, p - 1)) == x
+    p, g, q = toy_group(32, 64)
+    x = random.randrange(q)
+    assert dlog.pohlig_hellman(pow(g, x, p), (p, g, q)) == x
+    assert dlog.pohlig_hellman(p - 1, (p, g, q)) is None
+
+
+@util.test_log
+def test_short_exponent():
+    # A private key much shorter than the 256-bit order of a named group is found in about
+    # the square root of the time it would take to try each value below it.
+    params = dh.make_parameters(name="modp2048q256")
+    x = random.randrange(2**31, 2**32)
+    y = core_util.fast_mod_exp(params.g, x, params.p)
+    dh.validate_pub_key(y, params.q, params.p)
+    assert dlog.bsgs(y, params, 2**32) == x, "bsgs failed to find a short private key"
+
+
+@util.test_log
+def test_small_subgroup():
+    # An attacker who sends an element z of small order t in place of a public key, and
+    # learns the resulting session value z^x, learns x mod t. Doing so for several small t
+    # whose product exceeds the order q of g reveals x. This is why public keys must be
+    # checked to lie in the subgroup of order q.
+    while True:
+        small = [random.choice([5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47])
+                 for _ in range(12)]
+        q = primes.generate_prime(24)
+        p = 2 * q * math.prod(small) + 1
+        if len(set(small)) >= 8 and primes.is_prime(p):
+            break
+    x = random.randrange(1, q)
+
+    residue, modulus = 0, 1
+    for t in sorted(set(small)):
+        while True:
+            z = pow(random.randrange(2, p - 1), (p - 1) // t, p)
+            if z != 1:
+                break
+        try:
+            dh.validate_pub_key(z, q, p)
+            assert False, "validate_pub_key accepted an element of small order"
+        except ValueError:
+            pass
+
+        x_t = dlog.pohlig_hellman(pow(z, x, p), (p, z, t))
+        assert x_t == x % t
+        residue = core_util.from_crt(x_t, residue, t, modulus)
+        modulus *= t
+        if modulus > q:
+            break
+
+    assert modulus > q and residue == x, "small subgroup attack failed to find x"
@@ -98,6 +98,7 @@ def main():
     test_validate_curve_params()
     test_point_at()
     test_fast_point_at()
+    test_small_curve_tables()
     test_x_times_pt()
     test_generate_keypair_and_validate_pub_key()
     test_hash_to_int()
@@ -277,6 +278,44 @@ def test_fast_point_at():
         assert ec._fast_point_at(test_curve["curve"].n) == ec._I
 
 
+@util.test_log
+def test_small_curve_tables():
+    for test_curve in test_curves:
+        # The points of the small test curves are tabulated in order of their multiples of G.
+        ec.new_curve(test_curve["curve"], _TEST_CURVE_B_ITERS)
+        pt_group_local = test_curve["pts"]
+        assert ec._TABLE_POINTS == [tuple(ec._I)] + [tuple(pt) for pt in pt_group_local[:-1]]
+        sums = [[ec._add(pt1, pt2) for pt2 in pt_group_local] for pt1 in pt_group_local]
+        products = [[ec._x_times_pt(x, pt) for pt in pt_group_local]
+                    for x in range(1, 2 * len(pt_group_local))]
+
+        # Table lookups agree with the arithmetic used for larger curves.
+        ec._build_tables(None)
+        assert sums == [[ec._add(pt1, pt2) for pt2 in pt_group_local] for pt1 in pt_group_local]
+        assert products == [[ec._x_times_pt(x, pt) for pt in pt_group_local]
+                            for x in range(1, 2 * len(pt_group_local))]
+
+        # As does the unchecked arithmetic, on the current curve or one given explicitly.
+        assert ec.curve() is test_curve["curve"]
+        ec.new_curve(curves.Secp256k1())
+        curve = test_curve["curve"]
+        assert sums == [[ec.add_unchecked(pt1, pt2, curve) for pt2 in pt_group_local]
+                        for pt1 in pt_group_local]
+        assert products == [[ec.mul_unchecked(x, pt, curve) for pt in pt_group_local]
+                            for x in range(1, 2 * len(pt_group_local))]
+        assert ec.mul_unchecked(0, curve.G, curve) == ec._I
+
+        # Points returned from the tables are copies.
+        ec.new_curve(test_curve["curve"], _TEST_CURVE_B_ITERS)
+        pt = ec._add(pt_group_local[0], pt_group_local[0])
+        pt[0] = None
+        assert ec._add(pt_group_local[0], pt_group_local[0]) == pt_group_local[1]
+
+    # Large curves are not tabulated.
+    ec.new_curve(curves.Secp256k1())
+    assert ec._TABLE_POINTS is None and ec._TABLE_INDEX is None
+
+
 @util.test_log
 def test_x_times_pt():
     util.parallelize(x_times_pt, real_curves)
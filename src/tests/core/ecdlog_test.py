@@ -0,0 +1,103 @@
+import random
+
+from core import curves
+from core import ec
+from core import ecdlog
+
+from . import ec_test
+from . import util
+
+# Toy curves y^2 = x^3 + b of prime order, of 32, 40 and 60 bits.
+toy_curve_32 = curves.Curve(
+    p=4040004037, a=0, b=2991880933, Gx=688438530, Gy=1699893146, n=4040094403, h=1)
+toy_curve_40 = curves.Curve(
+    p=817839501763, a=0, b=422506593024, Gx=780276717378, Gy=778570399754, n=817841118859,
+    h=1)
+toy_curve_60 = curves.Curve(
+    p=590813619448296019, a=0, b=179464049082744580, Gx=207379728235747644,
+    Gy=371569654073426658, n=590813620276858963, h=1)
+
+
+@util.test_log
+def main():
+    test_table_log()
+    test_pollard_rho()
+    test_kangaroo()
+    test_discrete_log()
+
+
+def point_at(d: int, curve: curves.Curve) -> list:
+    # Returns the point dG on the curve as a list.
+
+    return ec.mul_unchecked(d, curve.G, curve)
+
+
+@util.test_log
+def test_table_log():
+    # The points of the tiny test curves of ec_test, in order of their multiples of G.
+    for test_curve in ec_test.test_curves:
+        curve = test_curve["curve"]
+        for d, pt in enumerate(test_curve["pts"], 1):
+            assert ecdlog.table_log(pt, curve) == d % curve.n, "table_log failed to find d"
+
+    curve = curves.Curve(p=815533, a=0, b=680438, Gx=1773, Gy=497590, n=814687, h=1)
+    for _ in range(10):
+        d = random.randrange(curve.n)
+        assert ecdlog.table_log(point_at(d, curve), curve) == d
+
+
+@util.test_log
+def test_pollard_rho():
+    for _ in range(3):
+        d = random.randrange(toy_curve_32.n)
+        assert ecdlog.pollard_rho(point_at(d, toy_curve_32), toy_curve_32) == d, \
+            "pollard_rho failed to find d"
+
+    d = random.randrange(toy_curve_32.n)
+    assert ecdlog.pollard_rho(point_at(d, toy_curve_32), toy_curve_32, workers=2) == d, \
+        "pollard_rho failed to find d with two workers"
+
+    assert ecdlog.pollard_rho([None, None], toy_curve_32) == 0
+
+    # A point that is not on the curve.
+    try:
+        ecdlog.pollard_rho([1, 1], toy_curve_32)
+        assert False, "pollard_rho accepted a point that is not on the curve"
+    except AssertionError as e:
+        assert str(e) == ""
+
+
+@util.test_log
+def test_kangaroo():
+    # A key known to lie in a 32-bit interval is found on a 60-bit curve.
+    for _ in range(3):
+        lo = random.randrange(toy_curve_60.n - 2**32)
+        d = lo + random.randrange(2**32)
+        Q = point_at(d, toy_curve_60)
+        assert ecdlog.kangaroo(Q, lo, lo + 2**32, toy_curve_60) == d, \
+            "kangaroo failed to find d"
+
+    # A key outside the interval, and intervals of one and a few keys.
+    d = random.randrange(2**24, 2**25)
+    Q = point_at(d, toy_curve_60)
+    assert ecdlog.kangaroo(Q, 0, 2**24, toy_curve_60) is None
+    assert ecdlog.kangaroo(Q, d, d + 1, toy_curve_60) == d
+    assert ecdlog.kangaroo(Q, d - 3, d + 2, toy_curve_60) == d
+    assert ecdlog.kangaroo([None, None], 0, 2**24, toy_curve_60) == 0
+
+
+@util.test_log
+def test_discrete_log():
+    # A key pair generated on a 40-bit curve is recovered from its public key, which is given
+    # either as a list or as an ec.ECPoint, on the current curve of the ec module.
+    try:
+        ec.new_curve(toy_curve_40, ec_test._TEST_CURVE_B_ITERS)
+        d, Q = ec.generate_keypair()
+        assert ecdlog.discrete_log(Q) == d, "discrete_log failed to find a private key"
+        assert ecdlog.discrete_log(ec.make_point(*Q)) == d
+    finally:
+        ec.new_curve(curves.Secp256k1())
+
+    # Tiny curves are solved by table.
+    curve = ec_test.test_curve_2["curve"]
+    assert ecdlog.discrete_log(ec_test.test_curve_2["pts"][6], curve) == 7
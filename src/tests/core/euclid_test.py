@@ -2,6 +2,8 @@ from core import euclid
 from . import util
 
 import math
+import random
+import time
 
 @util.test_log
 def main():
@@ -9,8 +11,11 @@ def main():
     test__gcd()
     test_gcdx()
     test__gcdx()
+    test_gcdx_algorithms()
     test_lcm()
     test_inverse()
+    test_inverse_engines()
+    test_benchmark_inverse_engines()
 
 
 @util.test_log
@@ -152,6 +157,41 @@ def test__gcdx():
     assert y == -7, f"expected -7, got {y}"
 
 
+@util.test_log
+def test_gcdx_algorithms():
+    # Lehmer's and the half-gcd algorithms return the same x and y as the textbook loop, for
+    # operands of similar and different sizes, with large and small common factors.
+    for bit_len in (euclid._LEHMER_MIN_BIT_LEN, euclid._HGCD_BASE_BIT_LEN * 8):
+        for _ in range(20):
+            a = random.getrandbits(bit_len)
+            b = random.getrandbits(bit_len - random.choice([0, 0, 1, 100, bit_len // 2]))
+            k = random.choice([1, 1, 2**random.randrange(100), random.getrandbits(200)])
+            a, b = a * k, b * k
+            expected = euclid._gcdx_textbook(a, b)
+            assert euclid._gcdx_lehmer(a, b) == expected, f"lehmer failed for {a}, {b}"
+            assert euclid._gcdx_lehmer(b, a) == euclid._gcdx_textbook(b, a)
+            assert euclid._gcdx_hgcd(a, b) == expected, f"half-gcd failed for {a}, {b}"
+
+    # The half-gcd algorithm proper, for operands large enough that gcdx selects it.
+    a = random.getrandbits(euclid._HGCD_MIN_BIT_LEN + 100)
+    b = random.getrandbits(euclid._HGCD_MIN_BIT_LEN)
+    assert euclid.gcdx(a, b) == euclid._gcdx_lehmer(a, b)
+
+    # Each reduction of _hgcd leaves operands above 2^s that differ by at most 2^s, by a
+    # matrix of determinant 1.
+    for _ in range(10):
+        a, b = random.getrandbits(8000), random.getrandbits(8000)
+        (A, B, C, D), a_k, b_k = euclid._hgcd(a, b)
+        s = max(a.bit_length(), b.bit_length()) // 2 + 1
+        assert A * D - B * C == 1 and a == A * a_k + B * b_k and b == C * a_k + D * b_k
+        assert a_k > 2**s and b_k > 2**s and abs(a_k - b_k) <= 2**s
+
+    # Edge cases.
+    for a, b in ((2**3000, 2**3000), (3 * 2**3000, 2**3000), (2**3000 + 1, 1), (2**3000, 0)):
+        assert euclid._gcdx_lehmer(a, b) == euclid._gcdx_textbook(a, b)
+        assert euclid._gcdx_hgcd(a, b) == euclid._gcdx_textbook(a, b)
+
+
 @util.test_log
 def test_lcm():
     assert euclid.lcm(9, 2) == math.lcm(
@@ -207,5 +247,56 @@ def test_inverse():
         assert isinstance(e, ValueError)
 
 
+@util.test_log
+def test_inverse_engines():
+    try:
+        for engine in euclid.inverse_engines():
+            euclid.set_inverse_engine(engine)
+            assert euclid.inverse_engine() == engine
+            assert euclid.inverse(7, 60) == 43
+            assert euclid.inverse(5, 1) == 0
+            for bit_len in (256, euclid._NATIVE_INVERSE_MAX_BIT_LEN):
+                for _ in range(5):
+                    b = random.getrandbits(bit_len) | 1
+                    a = random.randrange(1, b)
+                    if math.gcd(a, b) == 1:
+                        assert euclid.inverse(a, b) == pow(a, -1, b)
+                    else:
+                        try:
+                            euclid.inverse(a, b)
+                            assert False, f"{engine} inverted {a} modulo {b}"
+                        except ValueError:
+                            pass
+            try:
+                euclid.inverse(60, 8)
+                assert False, f"{engine} inverted 60 modulo 8"
+            except ValueError:
+                pass
+    finally:
+        euclid.set_inverse_engine("auto")
+
+    try:
+        euclid.set_inverse_engine("bogus")
+        assert False, "set_inverse_engine accepted an unknown engine"
+    except ValueError:
+        pass
+
+
+@util.test_log
+def test_benchmark_inverse_engines():
+    for bit_len, rounds in ((256, 1000), (2048, 100), (16384, 5)):
+        bs = [random.getrandbits(bit_len) | 1 << (bit_len - 1) | 1 for _ in range(rounds)]
+        as_ = [random.randrange(1, b) for b in bs]
+        for engine in euclid.inverse_engines():
+            t0 = time.time_ns()
+            for a, b in zip(as_, bs):
+                try:
+                    euclid._INVERSE_ENGINES[engine](a, b)
+                except ValueError:
+                    pass
+            t1 = time.time_ns()
+            print(f"  {rounds} rounds of {bit_len}-bit inverse using {engine} took {round((t1-t0)/1000000, 2)} ms")
+
+
 if __name__ == "__main__":
     main()
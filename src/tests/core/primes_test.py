@@ -1,3 +1,7 @@
+import itertools
+import math
+import random
+
 from core import primes
 
 from . import util
@@ -64,6 +68,15 @@ def main():
     test_fermat_factor()
     test_shor_factor()
     test_is_composite_2()
+    test_odd_primes_below()
+    test_primality_tests()
+    test_trial_division()
+    test_deterministic_bases()
+    test_prime_ranges()
+    test_batch_gcd()
+    test_factor()
+    test_ecm()
+    test_siqs()
 
 @util.test_log
 def test_factor_n():
@@ -167,6 +180,21 @@ def test_shor_factor():
         assert p * q == primes._small_primes[i] * primes._small_primes[j],\
             f"product of {primes._small_primes[i]} and {primes._small_primes[i]} should be factorable by shor_factor()"
 
+    # Orders agree with those found by exhaustive search.
+    for n in (15, 21, 3 * 997, 991 * 997):
+        for a in random.sample(range(2, n), min(n - 2, 20)):
+            if math.gcd(a, n) == 1:
+                r = 1
+                while pow(a, r, n) != 1:
+                    r += 1
+                assert primes._order(a, n) == r, f"_order({a}, {n}) should be {r}"
+
+    # Moduli of 64 bits with factors of similar size.
+    for _ in range(5):
+        p, q = primes.generate_prime(32), primes.generate_prime(32)
+        if p != q:
+            assert sorted(primes.shor_factor(p * q)) == sorted([p, q])
+
 @util.test_log
 def test_is_composite_2():
     for n in primes._small_primes:
@@ -189,5 +217,296 @@ def test_is_composite_2():
         assert not primes._is_composite_2(n), f"_is_composite_2 failed to identify {n} as prime"
 
 
+@util.test_log
+def test_odd_primes_below():
+    assert primes._odd_primes_below(1000) == primes._small_primes
+    assert primes._odd_primes_below(997) == primes._small_primes[:-1]
+    for n in range(0, 4):
+        assert primes._odd_primes_below(n) == []
+    assert primes._odd_primes_below(4) == [3]
+    assert len(primes._odd_primes_below(2**16)) == 6541
+
+
+@util.test_log
+def test_primality_tests():
+    assert primes.primality_test() in primes.primality_tests()
+    for test in primes.primality_tests():
+        for n in odd_composites + even_composites + small_carmichaels + large_carmichaels:
+            assert not primes.is_prime(n, test), f"{test} failed to identify {n} as composite"
+        for n in large_primes + primes._small_primes:
+            assert primes.is_prime(n, test), f"{test} failed to identify {n} as prime"
+
+    # Compare against a sieve.
+    odd_primes = set(primes._odd_primes_below(50000))
+    for n in range(3, 50000, 2):
+        assert primes.is_prime(n, "bpsw") == (n in odd_primes), f"bpsw failed for {n}"
+
+    # Strong pseudoprimes to base 2 fail the Lucas test, and strong Lucas pseudoprimes
+    # fail the test to base 2.
+    for n in (2047, 3277, 4033, 4681, 8321, 15841, 29341, 42799, 49141, 52633):
+        assert primes._is_composite_bpsw(n), f"bpsw failed to identify {n} as composite"
+    for n in (5459, 5777, 10877, 16109, 18971, 22499, 24569, 25199, 40309, 58519):
+        assert not primes._is_composite_lucas(n), f"{n} is a strong Lucas pseudoprime"
+        assert primes._is_composite_bpsw(n), f"bpsw failed to identify {n} as composite"
+
+    # Perfect squares have no suitable Lucas parameters.
+    for p in (1009, 2**61 - 1):
+        assert primes._is_composite_bpsw(p * p)
+
+    # The Jacobi symbol agrees with Euler's criterion modulo a prime.
+    for p in (1009, 2**61 - 1):
+        for a in range(-20, 20):
+            e = pow(a, (p - 1) // 2, p)
+            assert primes._jacobi(a, p) == (e if e <= 1 else -1)
+
+    test = primes.primality_test()
+    try:
+        primes.set_primality_test("miller-rabin")
+        assert primes.primality_test() == "miller-rabin"
+        assert primes.is_prime(2**521 - 1) and not primes.is_prime(2**521 + 1)
+        assert primes.generate_prime(256).bit_length() == 256
+        assert primes.generate_prime(256, "bpsw").bit_length() == 256
+    finally:
+        primes.set_primality_test(test)
+
+    for bogus in (lambda: primes.set_primality_test("bogus"),
+                  lambda: primes.is_prime(7, "bogus")):
+        try:
+            bogus()
+            assert False, "Expected an exception, but none was raised"
+        except Exception as e:
+            assert isinstance(e, ValueError)
+
+
+@util.test_log
+def test_trial_division():
+    assert primes.trial_division_bound() == primes._TRIAL_DIVISION_BOUND
+    odd_primes = primes._odd_primes_below(2**17)
+
+    bound = primes.trial_division_bound()
+    try:
+        for b in (primes._SMALL_PRIMES_BOUND, 2**10, 2**17):
+            primes.set_trial_division_bound(b)
+            assert primes.trial_division_bound() == b
+            found = [n for n in range(3, 2**17, 2) if primes.is_prime(n)]
+            assert found == odd_primes, f"is_prime failed with trial division bound {b}"
+
+            # Large multiples of primes just below the bound, which only the second product
+            # catches (and large primes, which it must not).
+            for p in odd_primes[-3:]:
+                if p < b:
+                    assert not primes.is_prime(p * (2**521 - 1))
+            for n in large_primes:
+                assert primes.is_prime(n)
+    finally:
+        primes.set_trial_division_bound(bound)
+
+
+@util.test_log
+def test_deterministic_bases():
+    # Strong pseudoprimes to the first few prime bases, which the smaller base sets would
+    # miss, must be identified as composite.
+    for n in (2047, 1373653, 25326001, 3215031751, 2152302898747, 3474749660383,
+              341550071728321, 3825123056546413051, 318665857834031151167461,
+              3317044064679887385961981):
+        assert not primes.is_prime(n), f"is_prime failed to identify {n} as composite"
+        if n < primes._DETERMINISTIC_BASES[-1][0]:
+            assert primes._is_composite_deterministic(n)
+
+    # Known primes, and products of two primes near the square root of the largest bound.
+    for n in (1000003, 2**31 - 1, 2**61 - 1, 2**64 - 59):
+        assert primes.is_prime(n), f"is_prime failed to identify {n} as prime"
+        assert not primes._is_composite_deterministic(n)
+    for _ in range(100):
+        p = primes.generate_prime(40)
+        q = primes.generate_prime(40)
+        assert not primes._is_composite_deterministic(p)
+        assert primes._is_composite_deterministic(p * q)
+        assert not primes.is_prime(p * q)
+
+
+@util.test_log
+def test_prime_ranges():
+    ps = [2] + primes._odd_primes_below(10**6)
+
+    assert primes.primes_below(1000) == [2] + primes._small_primes
+    assert primes.primes_below(10**6) == ps
+    for n in range(0, 30):
+        assert primes.primes_below(n) == [p for p in ps if p < n]
+
+    # Use small segments, so that ranges span several of them.
+    segment_len = primes._SEGMENT_LEN
+    try:
+        primes._SEGMENT_LEN = 100
+        for lo, hi in ((0, 0), (0, 3), (2, 3), (3, 3), (1, 1000), (997, 1009), (1000, 1009),
+                       (1000, 1010), (12345, 98765), (500000, 500500), (999000, 10**6)):
+            assert primes.primes_in_range(lo, hi) == [p for p in ps if lo <= p < hi], \
+                f"primes_in_range({lo}, {hi}) failed"
+        assert list(itertools.islice(primes.iter_primes(), 10000)) == ps[:10000]
+        assert list(itertools.islice(primes.iter_primes(500), 1000)) == \
+            [p for p in ps if p >= 500][:1000]
+    finally:
+        primes._SEGMENT_LEN = segment_len
+
+    # Check a range far from the origin against is_prime.
+    lo, hi = 10**15, 10**15 + 10**4
+    assert primes.primes_in_range(lo, hi) == [n for n in range(lo, hi) if primes.is_prime(n)]
+
+    # There are 78498 primes below 10^6, and 664579 below 10^7.
+    assert len(ps) == 78498
+    assert sum(1 for _ in primes.iter_primes(0, 10**7)) == 664579
+
+
+@util.test_log
+def test_batch_gcd():
+    ps = [primes.generate_prime(128) for _ in range(300)]
+    moduli = [ps[i] * ps[i + 1] for i in range(0, 200, 2)]
+
+    # Plant moduli that share one factor with another modulus, and one duplicate.
+    moduli += [ps[0] * ps[200], ps[201] * ps[51], ps[202] * ps[203], moduli[7]]
+    random.shuffle(moduli)
+
+    expected = [math.gcd(n, math.prod(moduli[:i] + moduli[i + 1:]))
+                for i, n in enumerate(moduli)]
+    assert sum(g != 1 for g in expected) == 6
+
+    assert primes.batch_gcd(moduli) == expected
+    for chunk_size in (1, 7, 64, len(moduli)):
+        assert primes.batch_gcd(moduli, chunk_size) == expected, \
+            f"batch_gcd failed for chunks of {chunk_size}"
+    assert primes.batch_gcd(moduli, 16, workers=2) == expected
+
+    # Test edge cases
+    assert primes.batch_gcd([]) == []
+    assert primes.batch_gcd([15]) == [1]
+    assert primes.batch_gcd([15, 15]) == [15, 15]
+    assert primes.batch_gcd([15, 21, 22]) == [3, 3, 1]
+
+    # Division of large operands
+    for _ in range(100):
+        b = random.randrange(1, 2**random.randrange(1, 40000))
+        a = random.randrange(0, 2**random.randrange(1, 90000))
+        assert primes._divmod(a, b) == divmod(a, b)
+
+
+@util.test_log
+def test_factor():
+    assert primes.factor(1) == []
+    assert primes.factor(2) == [2]
+    assert primes.factor(12) == [2, 2, 3]
+    assert primes.factor(2**10 * 3**5 * 65537) == [2] * 10 + [3] * 5 + [65537]
+    for n in range(1, 5000):
+        factors = primes.factor(n)
+        assert math.prod(factors) == n and factors == sorted(factors)
+        assert all(primes.is_prime(p) for p in factors), f"factor({n}) failed"
+
+    for _ in range(20):
+        n = random.randrange(1, 2**80)
+        factors = primes.factor(n)
+        assert math.prod(factors) == n and factors == sorted(factors)
+        assert all(primes.is_prime(p) for p in factors), f"factor({n}) failed"
+
+    # Semiprimes, prime powers and products of primes above the trial division bound.
+    for _ in range(5):
+        p, q = primes.generate_prime(30), primes.generate_prime(30)
+        assert primes.factor(p * q) == sorted([p, q])
+        assert primes.factor(p**3 * q**2) == sorted([p] * 3 + [q] * 2)
+    p, q, r = 65537, 65539, 2**61 - 1
+    assert primes.factor(p * q * r) == [p, q, r]
+    assert primes.factor(r**2) == [r, r]
+
+    # A prime p for which p-1 is smooth is found by the p-1 method, however large; and
+    # one for which p-1 has one larger prime factor is found by its stage 2.
+    for last in (1, 50021):
+        while True:
+            p = 2 * last * math.prod(random.sample(primes._small_primes, 30)) + 1
+            if primes.is_prime(p):
+                break
+        q = primes.generate_prime(200)
+        assert primes._pollard_p_minus_1(p * q, primes._P_MINUS_1_B1,
+                                         primes._P_MINUS_1_B2) in (p, q)
+        assert primes.factor(p * q) == sorted([p, q])
+
+    # Brent's rho method
+    for c in (1, 2, 3):
+        p, q = primes.generate_prime(24), primes.generate_prime(24)
+        d = primes._brent_rho(p * q, c)
+        assert d is None or d in (p, q)
+
+    assert primes._iroot(10**30, 3) == 10**10
+    assert primes._iroot(10**30 - 1, 3) == 10**10 - 1
+    assert primes._perfect_power(3**40) == (3, 40)
+    assert primes._perfect_power(6**6 * 5) == (6**6 * 5, 1)
+
+
+@util.test_log
+def test_ecm():
+    # Montgomery curve arithmetic: kP computed by the ladder agrees with kP computed by
+    # repeated addition, modulo a prime.
+    p = primes.generate_prime(64)
+    pt, a24 = (random.randrange(1, p), 1), random.randrange(1, p)
+    multiples = [None, pt, primes._ecm_double(pt, a24, p)]
+    for k in range(3, 50):
+        multiples.append(primes._ecm_add(multiples[k - 1], pt, multiples[k - 2], p))
+    for k in range(1, 50):
+        x, z = primes._ecm_mul(pt, k, a24, p)
+        assert (x * multiples[k][1] - multiples[k][0] * z) % p == 0, f"{k}P is wrong"
+
+    # Find a 40-bit factor of a much larger number, reporting progress.
+    p, q = primes.generate_prime(40), primes.generate_prime(200)
+    reports = []
+    d = primes.ecm(p * q, 2000, curves=200, progress=lambda i, n: reports.append((i, n)))
+    assert d in (p, q), "ecm failed to find a 40-bit factor"
+    assert reports == [(i, 200) for i in range(1, len(reports) + 1)]
+
+    d = primes.ecm(p * q, 2000, curves=200, workers=2)
+    assert d in (p, q), "ecm failed to find a 40-bit factor with two workers"
+
+    # A factor found in stage 2 only; i.e., with a stage 1 bound too low to find it alone.
+    found = [primes._ecm_curve(p * q, 300, 200000, sigma) for sigma in range(6, 500)]
+    assert any(d in (p, q) for d in found)
+    assert all(d in (None, p, q) for d in found)
+
+    # Semiprimes with factors beyond the reach of Brent's rho method in factor.
+    p, q = primes.generate_prime(55), primes.generate_prime(55)
+    assert primes.factor(p * q) == sorted([p, q])
+
+
+@util.test_log
+def test_siqs():
+    # Square roots modulo primes of each residue class modulo 8.
+    for p in (3, 5, 7, 17, 97, 7681, 65537, primes.generate_prime(64)):
+        for a in [random.randrange(1, p) for _ in range(20)]:
+            r = primes._sqrt_mod(a * a, p)
+            assert r in (a, p - a), f"_sqrt_mod failed for {a}^2 mod {p}"
+
+    # Dependencies over GF(2) of random vectors, more of them than coordinates.
+    vectors = [random.getrandbits(40) for _ in range(50)]
+    dependencies = primes._gf2_dependencies(vectors)
+    assert len(dependencies) >= 10
+    for dependency in dependencies:
+        total = 0
+        for i, vector in enumerate(vectors):
+            if dependency >> i & 1:
+                total ^= vector
+        assert dependency != 0 and total == 0
+
+    # Semiprimes with balanced factors, reporting progress.
+    for bit_len in (64, 100, 120):
+        p, q = primes.generate_prime(bit_len // 2), primes.generate_prime(bit_len // 2)
+        reports = []
+        d = primes.siqs(p * q, progress=lambda i, n: reports.append((i, n)))
+        assert d in (p, q), f"siqs failed to factor a {bit_len}-bit semiprime"
+        assert reports and reports[-1][0] == reports[-1][1]
+
+    p, q = primes.generate_prime(50), primes.generate_prime(50)
+    assert primes.siqs(p * q, workers=2) in (p, q), "siqs failed with two workers"
+
+    # Numbers with a factor in the factor base, or that are perfect powers.
+    assert primes.siqs(101 * primes.generate_prime(80)) == 101
+    q = primes.generate_prime(40)
+    assert primes.siqs(q**3) == q
+
+
 if __name__ == "__main__":
     main()
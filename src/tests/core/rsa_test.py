@@ -1,9 +1,11 @@
+import concurrent.futures
 import hashlib
 import random
 
 from core import euclid
 from core import primes
 from core import rsa
+from core import util as core_util
 
 from . import sym
 from . import util
@@ -15,8 +17,12 @@ def main():
     test_generate_rsa_key()
     test_encrypt_decrypt()
     test_sign_verify()
+    test_msg_to_rsa_number()
+    test_verify_many()
+    test_sign_and_decrypt()
     test_full_protocol()
     test_full_protocol_rsa_class()
+    test_sign_and_decrypt_rsa_class()
     test_misc_rsa_class()
     test_hash_injection()
 
@@ -86,6 +92,94 @@ def sign_verify(modulus_bit_len):
     assert rsa.verify(n, m, o)
 
 
+@util.test_log
+def test_msg_to_rsa_number():
+    p, q, n, d_sig, _ = rsa.generate_rsa_key(rsa._MODULUS_MIN_BIT_LEN)
+    ms = [random.randbytes(random.randint(20, 40)) for _ in range(100)]
+
+    # The representative is deterministic, and spans the full range of n.
+    ss = [rsa._msg_to_rsa_number(n, m) for m in ms]
+    assert ss == [rsa._msg_to_rsa_number(n, m) for m in ms]
+    assert all(0 <= s < n for s in ss)
+    assert max(ss).bit_length() > n.bit_length() - 16
+
+    # The mapping is unaffected by concurrent callers.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(lambda m: rsa._msg_to_rsa_number(n, m), ms)) == ss
+
+    # The legacy mapping reproduces that of earlier releases.
+    for m in ms[:10]:
+        random.seed(core_util.digest(m, hashlib.sha256()))
+        xb = random.randbytes((n.bit_length() + 7) // 8)
+        s = core_util.to_int(xb, byteorder="little") % n.bit_length()
+        assert rsa._msg_to_rsa_number(n, m, legacy=True) == s
+
+    o = rsa.sign(d_sig, p, q, ms[0], legacy=True)
+    assert rsa.verify(n, ms[0], o, legacy=True)
+    assert not rsa.verify(n, ms[0], o)
+    assert rsa.verify_many(n, ms[:1], [o], legacy=True) == [True]
+
+
+@util.test_log
+def test_verify_many():
+    util.parallelize(verify_many, util.random_ranges(
+        rsa._MODULUS_MIN_BIT_LEN, rsa._MODULUS_MAX_BIT_LEN+1, 1024))
+
+
+def verify_many(modulus_bit_len):
+    p, q, n, d_sig, _ = rsa.generate_rsa_key(modulus_bit_len)
+    ms = [random.randbytes(random.randint(20, 40)) for _ in range(20)]
+    os = [rsa.sign(d_sig, p, q, m) for m in ms]
+    assert rsa.verify_many(n, ms, os) == [True] * len(ms)
+
+    # Corrupt a few signatures, and make sure exactly those are rejected.
+    bad = set(random.sample(range(len(ms)), 3))
+    for i in bad:
+        os[i] = (int.from_bytes(os[i], byteorder="big") + 1).to_bytes(len(os[i]) + 1, byteorder="big")
+    expected = [i not in bad for i in range(len(ms))]
+    assert rsa.verify_many(n, ms, os) == expected
+    assert expected == [rsa.verify(n, m, o) for m, o in zip(ms, os)]
+
+    # A signature o replaced by n-o differs from it by a factor of order 2, which must not
+    # slip through.
+    os = [rsa.sign(d_sig, p, q, m) for m in ms[:4]]
+    os[0] = core_util.to_bytes(n - core_util.to_int(os[0]))
+    assert not rsa.verify(n, ms[0], os[0])
+    assert rsa.verify_many(n, ms[:4], os) == [False, True, True, True]
+
+    assert rsa.verify_many(n, [], []) == []
+
+
+@util.test_log
+def test_sign_and_decrypt():
+    util.parallelize(sign_and_decrypt, util.random_ranges(
+        rsa._MODULUS_MIN_BIT_LEN, rsa._MODULUS_MAX_BIT_LEN+1, 1024))
+
+
+def sign_and_decrypt(modulus_bit_len):
+    p, q, n, d_sig, d_dec = rsa.generate_rsa_key(modulus_bit_len)
+    m = random.randbytes(random.randint(20, 40))
+    K1, c = rsa.encrypt_key(n)
+    o, K2 = rsa.sign_and_decrypt(d_sig, d_dec, p, q, m, c)
+    assert o == rsa.sign(d_sig, p, q, m), "Batch signature doesn't match"
+    assert rsa.verify(n, m, o)
+    assert K1 == K2, "Keys don't match"
+
+    # Uneven queues of pending requests.
+    ms = [random.randbytes(random.randint(20, 40)) for _ in range(3)]
+    Kcs = [rsa.encrypt_key(n) for _ in range(2)]
+    os, Ks = rsa.sign_and_decrypt_many(d_sig, d_dec, p, q, ms, [c for _, c in Kcs])
+    assert all(rsa.verify(n, m, o) for m, o in zip(ms, os))
+    assert Ks == [K for K, _ in Kcs], "Keys don't match"
+
+    # Signatures that legacy verifiers can check.
+    o, K2 = rsa.sign_and_decrypt(d_sig, d_dec, p, q, m, c, legacy=True)
+    assert o == rsa.sign(d_sig, p, q, m, legacy=True), "Legacy batch signature doesn't match"
+    assert K1 == K2, "Keys don't match"
+    os, _ = rsa.sign_and_decrypt_many(d_sig, d_dec, p, q, ms, [c], legacy=True)
+    assert all(rsa.verify(n, m, o, legacy=True) for m, o in zip(ms, os))
+
+
 @util.test_log
 def test_full_protocol():
     ########################################################################################
@@ -244,6 +338,28 @@ def test_full_protocol_rsa_class():
                                         # Bob knows the contents of the message.
 
 
+@util.test_log
+def test_sign_and_decrypt_rsa_class():
+    key = rsa.make_key(rsa._MODULUS_MIN_BIT_LEN)
+    m = "Sign me!"
+    K1, c = rsa.encrypt_key(key.public_key())
+    o, K2 = key.sign_and_decrypt(m, c)
+    assert rsa.verify(key.public_key(), m, o)
+    assert key.verify(m, o)
+    assert not key.verify(m + "!", o)
+    assert K1 == K2, "Keys don't match"
+
+    K1, c = rsa.encrypt_key(key.public_key(), hashlib.sha1())
+    os, Ks = key.sign_and_decrypt_many([m], [c, c], hashlib.sha1())
+    assert rsa.verify(key.public_key(), m, os[0])
+    assert Ks == [K1, K1], "Keys don't match"
+
+    o, _ = key.sign_and_decrypt(m, c, legacy=True)
+    assert key.verify(m, o, legacy=True)
+    os, _ = key.sign_and_decrypt_many([m], [c], legacy=True)
+    assert key.verify(m, os[0], legacy=True)
+
+
 @util.test_log
 def test_misc_rsa_class():
     key1 = rsa.make_key()
@@ -1,4 +1,5 @@
 import random
+import time
 
 from core import primes
 from core import util as core_util
@@ -7,8 +8,14 @@ from . import util as test_util
 @test_util.test_log
 def main():
     test_crt_conversions()
+    test_crt_context()
     test_fast_mod_exp()
     test_fast_mod_exp_crt()
+    test_mod_exp_engines()
+    test_benchmark_mod_exp_engines()
+    test_mod_context()
+    test_fixed_base_table()
+    test_multi_exp()
 
 
 @test_util.test_log
@@ -34,6 +41,42 @@ def test_crt_conversions():
         assert x == x1, "Conversion mismatch"
 
 
+@test_util.test_log
+def test_crt_context():
+    # Multi-prime moduli, and many small pairwise coprime ones (odd and even in number).
+    moduli_lists = [[primes.generate_prime(512) for _ in range(k)] for k in (1, 2, 3, 5)]
+    moduli_lists.append(list(primes.iter_primes(2, 2000)))
+    moduli_lists.append([2**10, 3**7, 5**4, 7, 11**2, 13, 1])
+    for moduli in moduli_lists:
+        ctx = core_util.CRTContext(moduli)
+        assert ctx.moduli == moduli
+        M = ctx.modulus
+        for _ in range(10):
+            x = random.randrange(M)
+            residues = ctx.to_crt(x)
+            assert residues == [x % m for m in moduli], "Conversion mismatch"
+            assert ctx.from_crt(residues) == x, "Conversion mismatch"
+        xs = [random.randrange(M) for _ in range(10)] + [0, M - 1]
+        assert ctx.from_crt_batch(ctx.to_crt_batch(xs)) == xs, "Batch conversion mismatch"
+
+        # Values beyond the modulus, and residues beyond the moduli, are reduced.
+        x = random.randrange(M, 2 * M)
+        assert ctx.from_crt(ctx.to_crt(x)) == x - M
+        assert ctx.from_crt([r + m for r, m in zip(ctx.to_crt(x), moduli)]) == x - M
+
+    # Two moduli agree with from_crt.
+    p, q = primes.generate_prime(256), primes.generate_prime(256)
+    x = random.randrange(p * q)
+    assert core_util.CRTContext([p, q]).from_crt([x % p, x % q]) == \
+        core_util.from_crt(x % p, x % q, p, q)
+
+    try:
+        core_util.CRTContext([3, 5, 7, 9, 11])
+        assert False, "CRTContext accepted moduli that are not coprime"
+    except ValueError:
+        pass
+
+
 @test_util.test_log
 def test_fast_mod_exp():
     for _ in range(100):
@@ -74,5 +117,156 @@ def test_fast_mod_exp_crt():
                 assert core_util.fast_mod_exp_crt(b, e, p, q) == b**e % (p * q)
 
 
+@test_util.test_log
+def test_mod_exp_engines():
+    assert core_util.mod_exp_engine() == "native"
+    try:
+        for engine in core_util.mod_exp_engines():
+            core_util.set_mod_exp_engine(engine)
+            assert core_util.mod_exp_engine() == engine
+            test_fast_mod_exp()
+    finally:
+        core_util.set_mod_exp_engine("native")
+
+    try:
+        core_util.set_mod_exp_engine("bogus")
+        assert False, "Expected set_mod_exp_engine to raise an exception, but it didn't"
+    except Exception as e:
+        assert isinstance(e, ValueError)
+
+
+@test_util.test_log
+def test_benchmark_mod_exp_engines():
+    bs = [random.randrange(0, 2**2048) for _ in range(10)]
+    es = [random.randrange(0, 2**2048) for _ in range(10)]
+    ns = [random.randrange(1, 2**2048) for _ in range(10)]
+    try:
+        for engine in core_util.mod_exp_engines():
+            core_util.set_mod_exp_engine(engine)
+            t0 = time.time_ns()
+            for b, e, n in zip(bs, es, ns):
+                core_util.fast_mod_exp(b, e, n)
+            t1 = time.time_ns()
+            print(f"  {len(bs)} rounds of 2048-bit fast_mod_exp using {engine} took {round((t1-t0)/1000000, 2)} ms")
+    finally:
+        core_util.set_mod_exp_engine("native")
+
+
+@test_util.test_log
+def test_mod_context():
+    try:
+        for engine in core_util.mod_exp_engines():
+            core_util.set_mod_exp_engine(engine)
+            for _ in range(100):
+                n = random.randrange(1, 2**1024)
+                ctx = core_util.ModContext(n)
+                assert ctx.n == n
+                for _ in range(5):
+                    a = random.randrange(0, n)
+                    b = random.randrange(0, n)
+                    e = random.randrange(0, 2**256)
+                    assert ctx.mul(a, b) == a * b % n, f"mul({a}, {b}) mod {n} failed"
+                    assert ctx.square(a) == a * a % n, f"square({a}) mod {n} failed"
+                    assert ctx.exp(a, e) == pow(a, e, n), f"exp({a}, {e}) mod {n} failed"
+                    x = random.randrange(0, n**3)
+                    assert ctx.reduce(x) == x % n, f"reduce({x}) mod {n} failed"
+
+            # Test edge cases
+            for n in range(1, 10):
+                ctx = core_util.ModContext(n)
+                for a in range(0, 10):
+                    for e in range(0, 10):
+                        assert ctx.exp(a, e) == a**e % n
+
+        # The context honours the selected engine; sliding windows need fewer
+        # multiplications than square-and-multiply.
+        n = random.randrange(2**1023, 2**1024) | 1
+        e = random.randrange(2**1023, 2**1024)
+        counts = {}
+        for engine in ("window", "square-and-multiply"):
+            core_util.set_mod_exp_engine(engine)
+            ctx = core_util.ModContext(n)
+            ctx.exp(2, 3)
+            montgomery_mul = ctx._montgomery_mul
+            count = [0]
+            def counting_mul(a, b):
+                count[0] += 1
+                return montgomery_mul(a, b)
+            ctx._montgomery_mul = counting_mul
+            assert ctx.exp(3, e) == pow(3, e, n)
+            counts[engine] = count[0]
+        assert counts["window"] < counts["square-and-multiply"] * 0.9
+    finally:
+        core_util.set_mod_exp_engine("native")
+
+
+@test_util.test_log
+def test_fixed_base_table():
+    for w in range(1, 9):
+        n = random.randrange(1, 2**1024)
+        g = random.randrange(0, 2**1024)
+        e_bit_len = random.randrange(1, 300)
+        table = core_util.FixedBaseTable(g, n, e_bit_len, w)
+        assert table.g == g and table.n == n
+        for _ in range(10):
+            e = random.randrange(0, 2**e_bit_len)
+            assert table.exp(e) == pow(g, e, n), f"exp({e}) failed for window {w}"
+        assert table.exp(0) == 1 % n
+        assert table.exp(2**e_bit_len - 1) == pow(g, 2**e_bit_len - 1, n)
+
+    # Test edge cases
+    for n in range(1, 10):
+        for g in range(0, 10):
+            table = core_util.FixedBaseTable(g, n, 4, 3)
+            for e in range(0, 16):
+                assert table.exp(e) == g**e % n
+
+
+@test_util.test_log
+def test_multi_exp():
+    for k in (1, 2, 3, 10, 50, 500):
+        n = random.randrange(1, 2**1024)
+        bs = [random.randrange(0, 2**1024) for _ in range(k)]
+        es = [random.randrange(0, 2**random.randrange(1, 300)) for _ in range(k)]
+        expected = 1 % n
+        for b, e in zip(bs, es):
+            expected = expected * pow(b, e, n) % n
+        assert core_util.multi_exp(bs, es, n) == expected, f"multi_exp failed for {k} bases"
+
+        # Test both methods for a range of window sizes, whichever multi_exp would pick.
+        pairs = [(b % n, e) for b, e in zip(bs, es) if e]
+        e_bit_len = max(e.bit_length() for _, e in pairs)
+        for w in range(1, 7):
+            assert core_util._multi_exp_straus(pairs, e_bit_len, w, n) == expected, \
+                f"Straus failed for {k} bases and window {w}"
+            assert core_util._multi_exp_pippenger(pairs, e_bit_len, w, n) == expected, \
+                f"Pippenger failed for {k} bases and window {w}"
+
+    # Replacing a base b by n-b multiplies the product by -1 (which has order 2) for each
+    # odd exponent. Batch tests built on multi_exp (see dh.validate_pub_keys) depend on this
+    # sign surviving whenever the exponent of the replaced base is 1.
+    n = primes.generate_prime(512) * primes.generate_prime(512)
+    bs = [random.randrange(2, n) for _ in range(20)]
+    for _ in range(50):
+        es = [random.randrange(0, 2) for _ in bs]
+        i = random.randrange(len(bs))
+        forged = bs[:i] + [n - bs[i]] + bs[i+1:]
+        expected = core_util.multi_exp(bs, es, n)
+        assert core_util.multi_exp(forged, es, n) == (n - expected if es[i] else expected)
+        for w in range(1, 4):
+            pairs = [(b, e) for b, e in zip(forged, es) if e]
+            if pairs:
+                assert core_util._multi_exp_straus(pairs, 1, w, n) == \
+                    core_util._multi_exp_pippenger(pairs, 1, w, n)
+
+    # Test edge cases
+    assert core_util.multi_exp([], [], 7) == 1
+    assert core_util.multi_exp([5, 6], [0, 0], 7) == 1
+    assert core_util.multi_exp([5, 6], [1, 2], 1) == 0
+    for n in range(1, 10):
+        for b in range(0, 10):
+            for e in range(0, 10):
+                assert core_util.multi_exp([b, 2], [e, 3], n) == b**e * 8 % n
+
 if __name__ == "__main__":
     main()